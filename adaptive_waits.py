@@ -0,0 +1,270 @@
+"""
+Self-Tuning Wait Timeouts
+Records how long each named wait takes per URL pattern and derives the next
+timeout (p99 x margin) and an exponential poll schedule from that history
+"""
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from driver_factory import percentile
+from dom_waits import DomCondition, DomWait, async_until
+from trace_timeline import tracer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+import asyncio
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# History location (override with WAIT_HISTORY_PATH)
+WAIT_HISTORY_PATH = Path(os.environ.get(
+    "WAIT_HISTORY_PATH",
+    Path(__file__).resolve().parent / "waits" / "wait_history.json"
+))
+
+MAX_SAMPLES = 200       # Most recent samples kept per key
+MIN_SAMPLES = 5         # Below this the caller's default timeout is used
+TIMEOUT_PERCENTILE = 99
+TIMEOUT_MARGIN = 1.5    # Timeout = p99 x margin
+MIN_TIMEOUT = 1.0       # Seconds
+MIN_TIMEOUT_FRACTION = 0.25  # Learned timeouts stay above this share of the caller's default
+MAX_TIMEOUT = 60.0      # Seconds
+MIN_POLL = 0.05         # First poll interval bounds (seconds)
+MAX_POLL = 1.0
+POLL_BACKOFF = 1.5      # Each poll interval is this much longer than the last
+FLUSH_EVERY = 20        # Persist after this many new samples
+
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{8,}|[0-9a-f-]{32,36})$", re.IGNORECASE)
+
+
+def url_pattern(url: str) -> str:
+    """Host + path with numeric/hash segments collapsed; query and fragment dropped."""
+    parsed = urlparse(url or "")
+    segments = ["{id}" if _ID_SEGMENT.match(s) else s for s in parsed.path.split("/")]
+    return f"{parsed.netloc}{'/'.join(segments) or '/'}"
+
+
+class WaitHistory:
+    """Persisted wait durations, keyed by "<url pattern>::<wait name>".
+
+    Timed-out waits are recorded at the time spent, so a key that keeps
+    timing out grows its timeout by TIMEOUT_MARGIN each time (up to
+    MAX_TIMEOUT). Several processes may share the file: flush() merges
+    new samples into whatever is on disk.
+    """
+
+    def __init__(self, path: Path = WAIT_HISTORY_PATH, max_samples: int = MAX_SAMPLES):
+        self.path = Path(path)
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = self._load()
+        self._pending: Dict[str, List[float]] = {}
+        self._pending_count = 0
+
+    def _load(self) -> Dict[str, List[float]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def samples(self, key: str) -> List[float]:
+        with self._lock:
+            return list(self._samples.get(key, []))
+
+    def record(self, key: str, seconds: float, timed_out: bool = False):
+        seconds = round(seconds, 3)
+        with self._lock:
+            self._samples.setdefault(key, []).append(seconds)
+            del self._samples[key][:-self.max_samples]
+            self._pending.setdefault(key, []).append(seconds)
+            self._pending_count += 1
+            flush = self._pending_count >= FLUSH_EVERY
+        if timed_out:
+            logger.debug(f"Wait '{key}' timed out after {seconds}s")
+        if flush:
+            self.flush()
+
+    def timeout_for(self, key: str, default: float, floor: float = MIN_TIMEOUT) -> float:
+        """p99 x margin of the recorded durations (at least floor), or default without enough history."""
+        samples = self.samples(key)
+        if len(samples) < MIN_SAMPLES:
+            return default
+        timeout = percentile(samples, TIMEOUT_PERCENTILE) * TIMEOUT_MARGIN
+        return min(max(timeout, floor, MIN_TIMEOUT), MAX_TIMEOUT)
+
+    def poll_schedule(self, key: str) -> Iterator[float]:
+        """Poll intervals: start near a quarter of the median, then back off."""
+        samples = self.samples(key)
+        interval = percentile(samples, 50) / 4 if len(samples) >= MIN_SAMPLES else MIN_POLL * 2
+        interval = min(max(interval, MIN_POLL), MAX_POLL)
+        while True:
+            yield interval
+            interval = min(interval * POLL_BACKOFF, MAX_POLL)
+
+    def stats(self, key: str) -> Dict:
+        samples = self.samples(key)
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+        }
+
+    def flush(self):
+        """Merge new samples into the file on disk (atomic replace)."""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending, self._pending_count = self._pending, {}, 0
+            merged = self._load()
+            for key, values in pending.items():
+                merged[key] = (merged.get(key, []) + values)[-self.max_samples:]
+            self._samples = merged
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(merged, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"Could not save wait history: {e}")
+
+
+# Process-wide history, flushed at exit
+wait_history = WaitHistory()
+atexit.register(wait_history.flush)
+
+
+class AdaptiveWait:
+    """A named wait whose timeout and polling come from its own history.
+
+    DomConditions are event-driven (dom_waits), so only the timeout is
+    tuned for them; other callables are polled on the backoff schedule,
+    ignoring NoSuchElementException like WebDriverWait. url defaults to
+    the driver's current URL when the wait starts.
+
+    The learned timeout never drops below MIN_TIMEOUT_FRACTION of
+    default_timeout, and a wait that misses a learned timeout shorter
+    than the default is retried once with what is left of the default
+    before it raises, so the worst case stays at default_timeout.
+    Waits with different typical durations (a first page load vs. a
+    scroll) should use different names.
+    """
+
+    def __init__(self, driver, name: str, default_timeout: float = 10,
+                 url: Optional[str] = None, history: Optional[WaitHistory] = None):
+        self.driver = driver
+        self.name = name
+        self.default_timeout = default_timeout
+        self.url = url
+        self.history = history or wait_history
+        self.floor = default_timeout * MIN_TIMEOUT_FRACTION
+
+    def _key(self, url: str) -> str:
+        return f"{url_pattern(url)}::{self.name}"
+
+    def _timeouts(self, key: str) -> List[float]:
+        """The learned timeout, then the default as the overall budget of one retry if it is longer."""
+        timeout = self.history.timeout_for(key, self.default_timeout, self.floor)
+        return [timeout, self.default_timeout] if timeout < self.default_timeout else [timeout]
+
+    def _budget(self, timeouts: List[float], attempt: int, start: float) -> float:
+        """Seconds for this attempt: the retry only gets what is left of timeouts[attempt]."""
+        if attempt == 0:
+            return timeouts[0]
+        return max(timeouts[attempt] - (time.monotonic() - start), 0.0)
+
+    def _missed(self, key: str, timeouts: List[float], attempt: int, start: float, span: Dict) -> bool:
+        """After a timeout: True to retry, False to give up."""
+        if attempt + 1 >= len(timeouts):
+            return False
+        remaining = self._budget(timeouts, attempt + 1, start)
+        if remaining <= 0:
+            return False
+        span["retried"] = True
+        logger.debug(f"Wait '{key}' missed its learned {timeouts[0]:.1f}s timeout, "
+                     f"retrying for the remaining {remaining:.1f}s")
+        return True
+
+    def _finish(self, key: str, start: float, timed_out: bool):
+        self.history.record(key, time.monotonic() - start, timed_out)
+
+    def until(self, condition, message: str = ""):
+        key = self._key(self.url or self.driver.current_url)
+        timeouts = self._timeouts(key)
+        start = time.monotonic()
+        with tracer.span(self.name, "wait", key=key, timeout=round(timeouts[0], 2),
+                         polls=0, retried=False) as span:
+            for attempt in range(len(timeouts)):
+                timeout = self._budget(timeouts, attempt, start)
+                try:
+                    if isinstance(condition, DomCondition):
+                        value = DomWait(self.driver, timeout).until(condition, message)
+                    else:
+                        value = self._poll(condition, key, time.monotonic() + timeout, message, span)
+                    break
+                except TimeoutException:
+                    if not self._missed(key, timeouts, attempt, start, span):
+                        self._finish(key, start, True)
+                        raise
+        self._finish(key, start, False)
+        return value
+
+    def _poll(self, condition, key: str, deadline: float, message: str, span: Dict):
+        for interval in self.history.poll_schedule(key):
+            span["polls"] += 1
+            try:
+                value = condition(self.driver)
+                if value:
+                    return value
+            except NoSuchElementException:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(message)
+            time.sleep(min(interval, remaining))
+
+    async def until_async(self, condition, message: str = ""):
+        """until() for an AsyncDriver (condition is a DomCondition or an async callable)."""
+        key = self._key(self.url or await self.driver.current_url)
+        timeouts = self._timeouts(key)
+        start = time.monotonic()
+        with tracer.span(self.name, "wait", key=key, timeout=round(timeouts[0], 2),
+                         polls=0, retried=False) as span:
+            for attempt in range(len(timeouts)):
+                timeout = self._budget(timeouts, attempt, start)
+                try:
+                    if isinstance(condition, DomCondition):
+                        value = await async_until(self.driver, condition, timeout, message=message)
+                    else:
+                        value = await self._poll_async(condition, key, time.monotonic() + timeout,
+                                                       message, span)
+                    break
+                except TimeoutException:
+                    if not self._missed(key, timeouts, attempt, start, span):
+                        self._finish(key, start, True)
+                        raise
+        self._finish(key, start, False)
+        return value
+
+    async def _poll_async(self, condition, key: str, deadline: float, message: str, span: Dict):
+        for interval in self.history.poll_schedule(key):
+            span["polls"] += 1
+            try:
+                value = await condition(self.driver)
+                if value:
+                    return value
+            except NoSuchElementException:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(message)
+            await asyncio.sleep(min(interval, remaining))
@@ -2,40 +2,21 @@
 Advanced Interactions with Selenium Stealth
 Demonstrates mouse movements, drag & drop, keyboard shortcuts, and complex actions
 """
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium_stealth import stealth
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_factory import build_chrome_options, create_driver, checkout, release
 import time
 
 
 def setup_stealth_driver():
-    """Setup Chrome driver with stealth settings"""
-    options = webdriver.ChromeOptions()
-    options.add_argument("start-maximized")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_argument('--log-level=3')
-    
-    s = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=s, options=options)
-    
-    stealth(driver,
-            languages=["en-US", "en"],
-            vendor="Google Inc.",
-            platform="Win32",
-            webgl_vendor="Intel Inc.",
-            renderer="Intel Iris OpenGL Engine",
-            fix_hairline=True,
+    """Borrow a warm stealth Chrome driver from the shared pool"""
+    return checkout(
+        "stealth",
+        lambda: create_driver(build_chrome_options()),
     )
-    
-    return driver
 
 
 def mouse_hover_example():
@@ -69,7 +50,7 @@ def mouse_hover_example():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def drag_and_drop_example():
@@ -118,7 +99,7 @@ def drag_and_drop_example():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def keyboard_shortcuts_example():
@@ -167,7 +148,7 @@ def keyboard_shortcuts_example():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def double_click_example():
@@ -194,7 +175,7 @@ def double_click_example():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def right_click_context_menu():
@@ -220,7 +201,7 @@ def right_click_context_menu():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def scroll_into_view_example():
@@ -255,7 +236,7 @@ def scroll_into_view_example():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def chain_multiple_actions():
@@ -289,7 +270,7 @@ def chain_multiple_actions():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def simulate_human_typing():
@@ -322,7 +303,7 @@ def simulate_human_typing():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def handle_frames_and_windows():
@@ -358,7 +339,7 @@ def handle_frames_and_windows():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,294 @@
+"""
+Native asyncio WebDriver Facade
+Talks W3C WebDriver to an existing chromedriver session over asyncio streams,
+so many page waits can share one event loop instead of one thread per browser
+"""
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.errorhandler import ErrorHandler
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import asyncio
+import base64
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+ELEMENT_KEY = "element-6066-11e4-a52f-4f4b3e7bd8d7"
+
+_error_handler = ErrorHandler()
+
+
+def _to_w3c_locator(by: str, value: str) -> Tuple[str, str]:
+    """Map Selenium locators onto the W3C strategies, as WebDriver.find_element does."""
+    if by == By.ID:
+        return By.CSS_SELECTOR, f'[id="{value}"]'
+    if by == By.CLASS_NAME:
+        return By.CSS_SELECTOR, f".{value}"
+    if by == By.NAME:
+        return By.CSS_SELECTOR, f'[name="{value}"]'
+    if by == By.TAG_NAME:
+        return By.CSS_SELECTOR, value
+    return by, value
+
+
+def _executor_url(driver) -> str:
+    executor = driver.command_executor
+    url = getattr(executor, '_url', None)
+    if url is None:
+        url = executor._client_config.remote_server_addr
+    return url
+
+
+class AsyncElement:
+    """Awaitable counterpart of WebElement."""
+
+    def __init__(self, driver: 'AsyncDriver', element_id: str):
+        self._driver = driver
+        self.id = element_id
+
+    def to_json(self) -> Dict:
+        return {ELEMENT_KEY: self.id}
+
+    async def _command(self, method: str, path: str, payload: Optional[Dict] = None):
+        return await self._driver.command(method, f"/element/{self.id}{path}", payload)
+
+    @property
+    async def text(self) -> str:
+        return await self._command("GET", "/text")
+
+    async def get_attribute(self, name: str) -> Optional[str]:
+        # Same semantics as WebElement.get_attribute (property, then attribute)
+        return await self._driver.execute_script(
+            "var e = arguments[0], n = arguments[1];"
+            "var v = e[n]; if (v === undefined || v === null || typeof v === 'object') "
+            "{ v = e.getAttribute(n); } return v === null ? null : String(v);",
+            self, name
+        )
+
+    async def click(self):
+        await self._command("POST", "/click", {})
+
+    async def send_keys(self, text: str):
+        await self._command("POST", "/value", {"text": text})
+
+    async def is_displayed(self) -> bool:
+        return await self._driver.execute_script(
+            "var r = arguments[0].getClientRects();"
+            "return !!(r.length && getComputedStyle(arguments[0]).visibility !== 'hidden');",
+            self
+        )
+
+    async def find_element(self, by: str = By.ID, value: str = None) -> 'AsyncElement':
+        by, value = _to_w3c_locator(by, value)
+        result = await self._command("POST", "/element", {"using": by, "value": value})
+        return self._driver._wrap(result)
+
+    async def find_elements(self, by: str = By.ID, value: str = None) -> List['AsyncElement']:
+        by, value = _to_w3c_locator(by, value)
+        result = await self._command("POST", "/elements", {"using": by, "value": value})
+        return self._driver._wrap(result)
+
+
+class AsyncDriver:
+    """asyncio facade over a running (synchronous) Selenium Chrome session.
+
+    The sync driver still owns the session (launch, stealth, quit); this class
+    only issues commands. Commands on one driver are serialized because a
+    WebDriver session handles one command at a time. The wrapped driver can be
+    a RecyclingSession: the session id and endpoint are read per command, so
+    commands follow a recycled browser.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._lock = asyncio.Lock()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._endpoint: Optional[Tuple[str, int]] = None
+
+    async def _connect(self, host: str, port: int):
+        if self._writer is None or self._endpoint != (host, port) or self._writer.is_closing():
+            self._disconnect()
+            self._reader, self._writer = await asyncio.open_connection(host, port)
+            self._endpoint = (host, port)
+
+    def _disconnect(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _read_response(self) -> Tuple[int, bytes, bool]:
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("chromedriver closed the connection")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await self._reader.readline()).strip(), 16)
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                body += await self._reader.readexactly(size)
+                await self._reader.readline()
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", 0)))
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        return status, body, keep_alive
+
+    async def command(self, method: str, path: str, payload: Optional[Dict] = None) -> Any:
+        """Send one W3C command for the current session and return its value."""
+        url = urlparse(_executor_url(self.driver))
+        full_path = f"{url.path.rstrip('/')}/session/{self.driver.session_id}{path}"
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        request = (
+            f"{method} {full_path} HTTP/1.1\r\n"
+            f"Host: {url.hostname}:{url.port}\r\n"
+            "Content-Type: application/json;charset=UTF-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("latin-1") + body
+
+        async with self._lock:
+            try:
+                await self._connect(url.hostname, url.port)
+                self._writer.write(request)
+                await self._writer.drain()
+                status, raw, keep_alive = await self._read_response()
+            except BaseException:
+                # A cancelled or failed exchange leaves the stream mid-response
+                self._disconnect()
+                raise
+            if not keep_alive:
+                self._disconnect()
+
+        text = raw.decode("utf-8")
+        if status >= 400:
+            _error_handler.check_response({"status": status, "value": text})
+        data = json.loads(text) if text else {}
+        value = data.get("value") if isinstance(data, dict) else data
+        if isinstance(value, dict) and "error" in value:
+            _error_handler.check_response({"status": status, "value": text})
+        return value
+
+    def _wrap(self, value: Any) -> Any:
+        """Turn W3C element references in a response into AsyncElements."""
+        if isinstance(value, list):
+            return [self._wrap(v) for v in value]
+        if isinstance(value, dict):
+            if ELEMENT_KEY in value:
+                return AsyncElement(self, value[ELEMENT_KEY])
+            return {k: self._wrap(v) for k, v in value.items()}
+        return value
+
+    def _unwrap(self, value: Any) -> Any:
+        if isinstance(value, AsyncElement):
+            return value.to_json()
+        if isinstance(value, (list, tuple)):
+            return [self._unwrap(v) for v in value]
+        if isinstance(value, dict):
+            return {k: self._unwrap(v) for k, v in value.items()}
+        return value
+
+    async def navigate(self, url: str):
+        await self.command("POST", "/url", {"url": url})
+
+    get = navigate
+
+    async def refresh(self):
+        await self.command("POST", "/refresh", {})
+
+    @property
+    async def title(self) -> str:
+        return await self.command("GET", "/title")
+
+    @property
+    async def current_url(self) -> str:
+        return await self.command("GET", "/url")
+
+    @property
+    async def page_source(self) -> str:
+        return await self.command("GET", "/source")
+
+    async def find_element(self, by: str = By.ID, value: str = None) -> AsyncElement:
+        by, value = _to_w3c_locator(by, value)
+        return self._wrap(await self.command("POST", "/element", {"using": by, "value": value}))
+
+    async def find_elements(self, by: str = By.ID, value: str = None) -> List[AsyncElement]:
+        by, value = _to_w3c_locator(by, value)
+        return self._wrap(await self.command("POST", "/elements", {"using": by, "value": value}))
+
+    async def execute_script(self, script: str, *args) -> Any:
+        result = await self.command(
+            "POST", "/execute/sync", {"script": script, "args": self._unwrap(list(args))}
+        )
+        return self._wrap(result)
+
+    async def execute_async_script(self, script: str, *args) -> Any:
+        result = await self.command(
+            "POST", "/execute/async", {"script": script, "args": self._unwrap(list(args))}
+        )
+        return self._wrap(result)
+
+    async def get_log(self, log_type: str) -> List[Dict]:
+        return await self.command("POST", "/se/log", {"type": log_type})
+
+    async def save_screenshot(self, filename: str) -> bool:
+        png = await self.command("GET", "/screenshot")
+        with open(filename, "wb") as f:
+            f.write(base64.b64decode(png))
+        return True
+
+    async def wait(self, condition: Callable[['AsyncDriver'], Awaitable[Any]],
+                   timeout: float = 10, poll_frequency: float = 0.5,
+                   ignored_exceptions=(NoSuchElementException, StaleElementReferenceException),
+                   message: str = "") -> Any:
+        """Async WebDriverWait.until(): await condition(self) until it is truthy."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                value = await condition(self)
+                if value:
+                    return value
+            except ignored_exceptions:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutException(message)
+            await asyncio.sleep(poll_frequency)
+
+    async def aclose(self):
+        """Close the HTTP connection (the browser session is left running)."""
+        async with self._lock:
+            self._disconnect()
+
+
+async def gather_bounded(coroutine_factories: List[Callable[[], Awaitable[Any]]],
+                         limit: int, return_exceptions: bool = False) -> List[Any]:
+    """Run coroutines with at most limit in flight, preserving result order."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(factory):
+        async with semaphore:
+            return await factory()
+
+    return await asyncio.gather(
+        *(run(factory) for factory in coroutine_factories),
+        return_exceptions=return_exceptions
+    )
@@ -0,0 +1,253 @@
+"""
+Chrome Launch Profile Benchmark
+Runs the same local fixture workload under each driver_factory.LAUNCH_PROFILES
+entry and reports pages/sec, CPU seconds and peak RSS of the browser process tree
+"""
+from selenium.webdriver.common.by import By
+from driver_factory import LAUNCH_PROFILES, FETCH_PROFILES, build_chrome_options, create_driver
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # CPU and RSS columns are left empty without psutil
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_CARDS = 60       # Cards per fixture page
+FIXTURE_IMAGES = 12      # Images per fixture page
+SAMPLE_INTERVAL = 0.2    # Seconds between resource samples
+
+FIXTURE_CSS = """
+body { font-family: Georgia, serif; margin: 0; padding: 24px; background: #fafafa; }
+.grid { display: grid; grid-template-columns: repeat(4, 1fr); gap: 12px; }
+.card { background: #fff; border-radius: 8px; box-shadow: 0 1px 4px rgba(0,0,0,.2); padding: 12px; }
+.card img { width: 100%; height: 80px; }
+.card .title { font-weight: bold; }
+"""
+
+FIXTURE_SCRIPT = """
+document.addEventListener('DOMContentLoaded', function () {
+  var grid = document.querySelector('.grid');
+  for (var i = 0; i < 20; i++) {
+    var card = document.createElement('div');
+    card.className = 'card';
+    card.innerHTML = '<div class="title">Dynamic ' + i + '</div><div class="body">Rendered by script</div>';
+    grid.appendChild(card);
+  }
+});
+"""
+
+FIXTURE_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="200" height="80">'
+    '<rect width="200" height="80" fill="#{color}"/>'
+    '<circle cx="40" cy="40" r="30" fill="#fff"/></svg>'
+)
+
+
+def write_fixture(directory: str, pages: int):
+    """Write pages of cards, images, CSS and a DOM-building script to directory."""
+    with open(os.path.join(directory, "style.css"), "w", encoding="utf-8") as f:
+        f.write(FIXTURE_CSS)
+    with open(os.path.join(directory, "app.js"), "w", encoding="utf-8") as f:
+        f.write(FIXTURE_SCRIPT)
+    for i in range(FIXTURE_IMAGES):
+        with open(os.path.join(directory, f"img{i}.svg"), "w", encoding="utf-8") as f:
+            f.write(FIXTURE_SVG.format(color=f"{(i * 1234567) % 0xFFFFFF:06x}"))
+
+    for page in range(pages):
+        cards = []
+        for i in range(FIXTURE_CARDS):
+            cards.append(
+                f'<div class="card"><img src="img{(page + i) % FIXTURE_IMAGES}.svg">'
+                f'<div class="title">Item {page}-{i}</div>'
+                f'<div class="body">{"Lorem ipsum dolor sit amet. " * 6}</div></div>'
+            )
+        html = (
+            '<!DOCTYPE html><html><head><title>Fixture page {page}</title>'
+            '<link rel="stylesheet" href="style.css"><script src="app.js"></script></head>'
+            '<body><h1>Fixture page {page}</h1><div class="grid">{cards}</div></body></html>'
+        ).format(page=page, cards="".join(cards))
+        with open(os.path.join(directory, f"page{page}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class ResourceSampler:
+    """Samples CPU time and RSS of a process tree in a background thread.
+
+    CPU time is tracked per pid, so renderers that exit mid-run still count.
+    """
+
+    def __init__(self, root_pid: int, interval: float = SAMPLE_INTERVAL):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self._baseline: Dict[int, float] = {}
+        self._cpu: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self) -> Dict[int, float]:
+        cpu = {}
+        rss = 0
+        try:
+            root = psutil.Process(self.root_pid)
+            procs = [root] + root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return cpu
+        for proc in procs:
+            try:
+                with proc.oneshot():
+                    times = proc.cpu_times()
+                    cpu[proc.pid] = times.user + times.system
+                    rss += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        self.peak_rss_mb = max(self.peak_rss_mb, rss / (1024 * 1024))
+        return cpu
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._cpu.update(self._sample())
+
+    def start(self):
+        if psutil is None:
+            return
+        self._baseline = self._sample()
+        self._cpu = dict(self._baseline)
+        self._thread.start()
+
+    def stop(self):
+        if psutil is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._cpu.update(self._sample())
+
+    @property
+    def cpu_seconds(self) -> Optional[float]:
+        if psutil is None:
+            return None
+        return sum(total - self._baseline.get(pid, 0.0) for pid, total in self._cpu.items())
+
+
+def run_workload(driver, base_url: str, pages: int) -> int:
+    """Load every fixture page, wait for the script-built cards and read them."""
+    loaded = 0
+    for page in range(pages):
+        driver.get(f"{base_url}/page{page}.html")
+        driver.find_element(By.CSS_SELECTOR, ".grid .card:nth-child(80)")
+        cards = driver.execute_script(
+            "window.scrollTo(0, document.body.scrollHeight);"
+            "return Array.from(document.querySelectorAll('.card .title'), e => e.textContent);"
+        )
+        if len(cards) >= FIXTURE_CARDS:
+            loaded += 1
+    return loaded
+
+
+def benchmark_profile(launch_profile: str, base_url: str, pages: int,
+                      fetch_profile: Optional[str] = None) -> Dict:
+    """Launch a fresh driver with launch_profile and time the fixture workload."""
+    result = {"launch_profile": launch_profile, "fetch_profile": fetch_profile}
+    launch_start = time.perf_counter()
+    driver = create_driver(
+        build_chrome_options(launch_profile, fetch_profile=fetch_profile),
+        fetch_profile=fetch_profile,
+        label=f"benchmark:{launch_profile}",
+    )
+    result["launch_seconds"] = round(time.perf_counter() - launch_start, 3)
+
+    try:
+        driver.implicitly_wait(10)
+        sampler = ResourceSampler(driver.service.process.pid)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            loaded = run_workload(driver, base_url, pages)
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+    finally:
+        driver.quit()
+
+    result.update({
+        "pages": loaded,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(loaded / elapsed, 2) if elapsed else None,
+        "cpu_seconds": round(sampler.cpu_seconds, 2) if sampler.cpu_seconds is not None else None,
+        "peak_rss_mb": round(sampler.peak_rss_mb, 1) if psutil is not None else None,
+    })
+    return result
+
+
+def print_results(results: List[Dict]):
+    print(f"\n{'Profile':<22}{'Launch s':>10}{'Pages/s':>10}{'CPU s':>10}{'Peak RSS MB':>14}")
+    print("-" * 66)
+    for r in results:
+        if "error" in r:
+            print(f"{r['launch_profile']:<22}  failed: {r['error']}")
+            continue
+        cpu = f"{r['cpu_seconds']:.2f}" if r['cpu_seconds'] is not None else "n/a"
+        rss = f"{r['peak_rss_mb']:.1f}" if r['peak_rss_mb'] is not None else "n/a"
+        print(f"{r['launch_profile']:<22}{r['launch_seconds']:>10.2f}"
+              f"{r['pages_per_sec']:>10.2f}{cpu:>10}{rss:>14}")
+    if psutil is None:
+        print("\nInstall psutil to measure CPU seconds and peak RSS.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Chrome launch profiles on a local fixture")
+    parser.add_argument("--profiles", nargs="+", default=list(LAUNCH_PROFILES),
+                        choices=list(LAUNCH_PROFILES), help="Launch profiles to run")
+    parser.add_argument("--pages", type=int, default=30, help="Fixture pages per profile")
+    parser.add_argument("--fetch-profile", choices=list(FETCH_PROFILES), default=None,
+                        help="Also apply a fetch profile (resource blocking)")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    with tempfile.TemporaryDirectory(prefix="launch_fixture_") as fixture_dir:
+        write_fixture(fixture_dir, args.pages)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=fixture_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        results = []
+        try:
+            for launch_profile in args.profiles:
+                logger.info(f"Benchmarking launch profile '{launch_profile}' ({args.pages} pages)")
+                try:
+                    results.append(benchmark_profile(launch_profile, base_url, args.pages,
+                                                     args.fetch_profile))
+                except Exception as e:
+                    # e.g. the headed profiles on a machine without a display
+                    logger.error(f"Profile '{launch_profile}' failed: {e}")
+                    results.append({"launch_profile": launch_profile, "error": (str(e).splitlines() or [repr(e)])[0]})
+        finally:
+            server.shutdown()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Page-State Probe Benchmark
+Compares the cost of the old page_source.lower() keyword scan with one
+page_probe.PageProbe check on local fixture pages of growing size
+"""
+from benchmark_launch_profiles import QuietHandler
+from driver_factory import build_chrome_options, create_driver, percentile
+from page_probe import PageProbe
+from functools import partial
+from http.server import ThreadingHTTPServer
+from typing import Callable, Dict, List
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZES = [100, 1000, 5000, 20000]  # Cards per fixture page
+KEYWORDS = ['checking your browser', 'cloudflare', 'security check']  # The old scan
+
+CHALLENGE_PAGE = (
+    '<!DOCTYPE html><html><head><title>Just a moment...</title></head><body>'
+    '<div id="cf-wrapper"><h1>Checking your browser before accessing the site.</h1>'
+    '<form id="challenge-form" action="/cdn-cgi/challenge"></form></div></body></html>'
+)
+
+
+def write_fixture(directory: str, sizes: List[int]):
+    """One feed-like page per size, plus a Cloudflare-style challenge page."""
+    for size in sizes:
+        cards = "".join(
+            f'<div class="card" data-id="{i}"><img src="data:," alt="">'
+            f'<div class="advertiser">Advertiser {i}</div>'
+            f'<div class="text">{"Sponsored copy for the ad library feed. " * 5}</div>'
+            f'<div role="button">Learn more</div></div>'
+            for i in range(size)
+        )
+        html = (f'<!DOCTYPE html><html><head><title>Feed {size}</title></head>'
+                f'<body><div class="feed">{cards}</div></body></html>')
+        with open(os.path.join(directory, f"feed{size}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+    with open(os.path.join(directory, "challenge.html"), "w", encoding="utf-8") as f:
+        f.write(CHALLENGE_PAGE)
+
+
+def page_source_check(driver) -> Dict:
+    page_source = driver.page_source.lower()
+    return {"blocked": any(keyword in page_source for keyword in KEYWORDS),
+            "bytes": len(page_source.encode("utf-8"))}
+
+
+def probe_check(probe: PageProbe) -> Callable:
+    def check(driver) -> Dict:
+        state = probe.check(driver)
+        return {"blocked": state.blocked, "bytes": len(json.dumps(state._asdict()).encode("utf-8"))}
+    return check
+
+
+def time_check(driver, check: Callable, iterations: int) -> Dict:
+    check(driver)  # Warm-up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = check(driver)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "bytes": result["bytes"],
+        "blocked": result["blocked"],
+    }
+
+
+def run_benchmark(driver, base_url: str, sizes: List[int], iterations: int) -> List[Dict]:
+    methods = {"page_source": page_source_check, "probe": probe_check(PageProbe())}
+    results = []
+    for page in [f"feed{size}" for size in sizes] + ["challenge"]:
+        driver.get(f"{base_url}/{page}.html")
+        row = {"page": page}
+        for name, check in methods.items():
+            row[name] = time_check(driver, check, iterations)
+        logger.info(f"{page}: page_source p50 {row['page_source']['p50_ms']}ms, "
+                    f"probe p50 {row['probe']['p50_ms']}ms")
+        results.append(row)
+    return results
+
+
+def print_results(results: List[Dict]):
+    print(f"\n{'Page':<14}{'Source p50':>12}{'Source p95':>12}{'Source KB':>11}"
+          f"{'Probe p50':>11}{'Probe p95':>11}{'Probe B':>9}{'Speedup':>9}  Blocked")
+    print("-" * 101)
+    for r in results:
+        source, probe = r["page_source"], r["probe"]
+        speedup = source["p50_ms"] / probe["p50_ms"] if probe["p50_ms"] else float("inf")
+        print(f"{r['page']:<14}{source['p50_ms']:>12.2f}{source['p95_ms']:>12.2f}"
+              f"{source['bytes'] / 1024:>11.0f}{probe['p50_ms']:>11.2f}{probe['p95_ms']:>11.2f}"
+              f"{probe['bytes']:>9}{speedup:>8.1f}x  {source['blocked']}/{probe['blocked']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare page_source scanning with the page-state probe")
+    parser.add_argument("--sizes", type=int, nargs="+", default=PAGE_SIZES, help="Cards per fixture page")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed checks per page and method")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    with tempfile.TemporaryDirectory(prefix="probe_fixture_") as fixture_dir:
+        write_fixture(fixture_dir, args.sizes)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=fixture_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        driver = create_driver(build_chrome_options("throughput"), label="benchmark:page_probe")
+        try:
+            results = run_benchmark(driver, base_url, args.sizes, args.iterations)
+        finally:
+            driver.quit()
+            server.shutdown()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
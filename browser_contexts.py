@@ -0,0 +1,177 @@
+"""
+Browser-Context Multiplexing for Selenium Stealth
+Runs many isolated workers (separate cookies, cache and proxy) inside a single
+Chrome process using CDP Target.createBrowserContext
+"""
+from selenium import webdriver
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.mobile import Mobile
+from selenium.webdriver.remote.switch_to import SwitchTo
+from selenium_stealth import stealth
+from driver_factory import STEALTH_SETTINGS
+from typing import Callable, Optional
+import copy
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_PAGE_LOAD_TIMEOUT = 30  # Seconds to wait for document.readyState in get()
+CONTEXT_SCRIPT_BLOCK = 0.25  # Max seconds a dom_waits wait holds the shared session per command
+
+
+class ContextDriver(webdriver.Chrome):
+    """A webdriver.Chrome view of one browser context in a shared browser.
+
+    It reuses the host session (same chromedriver, same Chrome process) but
+    switches to its own window before every command, so scrape code can use
+    it exactly like a dedicated driver. quit() only disposes the context.
+    """
+
+    # dom_waits splits long in-page waits so other contexts get the session
+    max_script_block = CONTEXT_SCRIPT_BLOCK
+
+    def execute(self, driver_command, params=None):
+        with self._host.lock:
+            self._host.activate(self._handle)
+            response = super().execute(driver_command, params)
+            if driver_command == Command.SWITCH_TO_WINDOW:
+                self._handle = params.get('handle', self._handle)
+                self._host.active_handle = self._handle
+            return response
+
+    def get(self, url: str):
+        """Navigate without holding the shared lock for the whole page load."""
+        self.execute_script("window.__ctx_stale = true;")
+        self.execute_cdp_cmd("Page.navigate", {"url": url})
+
+        deadline = time.time() + CONTEXT_PAGE_LOAD_TIMEOUT
+        while time.time() < deadline:
+            try:
+                if self.execute_script(
+                    "return !window.__ctx_stale && document.readyState === 'complete';"
+                ):
+                    return
+            except Exception:
+                pass
+            time.sleep(0.1)
+        logger.debug(f"[context {self.context_id}] Page load timed out: {url}")
+
+    def close(self):
+        self.quit()
+
+    def quit(self):
+        """Close this context's windows and dispose the browser context."""
+        self._host.dispose(self)
+
+
+class BrowserContextHost:
+    """One Chrome process that hands out isolated ContextDrivers.
+
+    At most max_contexts are open at once; new_context() blocks until a
+    slot frees up. The browser is launched lazily on first use.
+    """
+
+    def __init__(self, factory: Callable[[], webdriver.Chrome], max_contexts: int = 5):
+        self.factory = factory
+        self.max_contexts = max_contexts
+        self.lock = threading.RLock()
+        self.driver: Optional[webdriver.Chrome] = None
+        self.default_handle: Optional[str] = None
+        self.active_handle: Optional[str] = None
+        self._slots = threading.BoundedSemaphore(max_contexts)
+        self._contexts = {}
+
+    def _ensure_browser(self):
+        if self.driver is None:
+            self.driver = self.factory()
+            self.default_handle = self.driver.current_window_handle
+            self.active_handle = self.default_handle
+            logger.info(f"Context host browser started (max {self.max_contexts} contexts)")
+
+    def activate(self, handle: str):
+        """Point the shared session at handle. Caller holds the lock."""
+        if self.active_handle != handle:
+            self.driver.switch_to.window(handle)
+            self.active_handle = handle
+
+    def new_context(self, proxy: str = "", user_agent: str = "",
+                    timeout: Optional[float] = None) -> ContextDriver:
+        """Open an isolated browser context and return a driver bound to it."""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No free browser context slot")
+
+        try:
+            with self.lock:
+                self._ensure_browser()
+                self.activate(self.default_handle)
+
+                params = {}
+                if proxy:
+                    params["proxyServer"] = f"http://{proxy}"
+                context_id = self.driver.execute_cdp_cmd(
+                    "Target.createBrowserContext", params
+                )["browserContextId"]
+                target_id = self.driver.execute_cdp_cmd(
+                    "Target.createTarget",
+                    {"url": "about:blank", "browserContextId": context_id}
+                )["targetId"]
+
+                context = copy.copy(self.driver)
+                context.__class__ = ContextDriver
+                # Drop per-instance hooks (first_get timer, profile slot release)
+                # so ContextDriver.get/quit apply
+                context.__dict__.pop("get", None)
+                context.__dict__.pop("_first_get_record", None)
+                context.__dict__.pop("quit", None)
+                context._switch_to = SwitchTo(context)
+                context._mobile = Mobile(context)
+                context._host = self
+                context._handle = target_id
+                context.context_id = context_id
+                self._contexts[context_id] = context
+
+            stealth(context, **STEALTH_SETTINGS)
+            if user_agent:
+                context.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": user_agent})
+
+            logger.debug(f"Opened browser context {context_id} (proxy: {proxy or 'none'})")
+            return context
+        except Exception:
+            self._slots.release()
+            raise
+
+    def dispose(self, context: ContextDriver):
+        """Close a context's windows and free its slot."""
+        with self.lock:
+            if self._contexts.pop(context.context_id, None) is None:
+                return
+            try:
+                self.activate(self.default_handle)
+                self.driver.execute_cdp_cmd(
+                    "Target.disposeBrowserContext", {"browserContextId": context.context_id}
+                )
+            except Exception as e:
+                logger.debug(f"Failed to dispose context {context.context_id}: {e}")
+            finally:
+                self.active_handle = None
+                try:
+                    self.activate(self.default_handle)
+                except Exception:
+                    pass
+        self._slots.release()
+
+    def close(self):
+        """Dispose every open context and quit the host browser."""
+        with self.lock:
+            contexts = list(self._contexts.values())
+        for context in contexts:
+            context.quit()
+        with self.lock:
+            if self.driver is not None:
+                try:
+                    self.driver.quit()
+                except Exception:
+                    pass
+                self.driver = None
@@ -0,0 +1,489 @@
+"""
+Event-Driven DOM Waits
+Waits that run inside the page: a MutationObserver re-checks the condition on
+every DOM change and resolves execute_async_script the moment it holds, so a
+wait is one WebDriver command instead of a 0.5s HTTP polling loop
+"""
+from selenium.common.exceptions import (
+    JavascriptException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.support.ui import WebDriverWait
+from trace_timeline import tracer
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MAX_SCRIPT_WAIT = 25      # Seconds per execute_async_script (chromedriver's default script timeout is 30)
+FALLBACK_POLL = 0.1       # In-page re-check for changes no mutation reports (CSS, layout)
+
+COMPOSITE_TYPES = ("all", "any", "first")
+
+# Shared in-page helpers: locate, visibility and the condition table
+_LIBRARY = r"""
+function find(loc) {
+  var by = loc[0], value = loc[1];
+  if (by === 'xpath') {
+    var snap = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var out = [];
+    for (var i = 0; i < snap.snapshotLength; i++) out.push(snap.snapshotItem(i));
+    return out;
+  }
+  if (by === 'link text' || by === 'partial link text') {
+    return Array.prototype.filter.call(document.querySelectorAll('a'), function (a) {
+      var t = (a.innerText || '').trim();
+      return by === 'link text' ? t === value : t.indexOf(value) !== -1;
+    });
+  }
+  var css = value;
+  if (by === 'id') css = '[id="' + value + '"]';
+  else if (by === 'class name') css = '.' + value;
+  else if (by === 'name') css = '[name="' + value + '"]';
+  return Array.prototype.slice.call(document.querySelectorAll(css));
+}
+function target(c) { return c.element || find(c.locator)[0]; }
+function visible(el) {
+  if (!el || !el.isConnected) return false;
+  if (el.checkVisibility) {
+    if (!el.checkVisibility({checkOpacity: true, checkVisibilityCSS: true})) return false;
+  } else {
+    var s = getComputedStyle(el);
+    if (s.display === 'none' || s.visibility === 'hidden' || s.opacity === '0') return false;
+  }
+  var r = el.getBoundingClientRect();
+  return r.width > 0 && r.height > 0;
+}
+function enabled(el) { return !el.matches(':disabled'); }
+function selected(el) { return !!(el.checked || el.selected); }
+function met(value) { return {value: value}; }
+var conditions = {
+  presence: function (c) { var e = target(c); return e ? met(e) : null; },
+  presence_all: function (c) { var e = find(c.locator); return e.length ? met(e) : null; },
+  minimum_elements: function (c) { var e = find(c.locator); return e.length >= c.minimum ? met(e) : null; },
+  visibility: function (c) { var e = target(c); return visible(e) ? met(e) : null; },
+  visibility_all: function (c) {
+    var e = find(c.locator);
+    return e.length && e.every(visible) ? met(e) : null;
+  },
+  visibility_any: function (c) { var e = find(c.locator).filter(visible); return e.length ? met(e) : null; },
+  invisibility: function (c) { var e = target(c); return !e || !visible(e) ? met(true) : null; },
+  clickable: function (c) { var e = target(c); return visible(e) && enabled(e) ? met(e) : null; },
+  text: function (c) {
+    var e = target(c);
+    return e && (e.innerText || '').indexOf(c.text) !== -1 ? met(true) : null;
+  },
+  text_value: function (c) {
+    var e = target(c);
+    return e && String(e.value || '').indexOf(c.text) !== -1 ? met(true) : null;
+  },
+  text_attribute: function (c) {
+    var e = target(c);
+    return e && (e.getAttribute(c.attribute) || '').indexOf(c.text) !== -1 ? met(true) : null;
+  },
+  attribute_includes: function (c) { var e = target(c); return e && e.hasAttribute(c.attribute) ? met(true) : null; },
+  selection_state: function (c) { var e = target(c); return e && selected(e) === c.selected ? met(true) : null; },
+  staleness: function (c) { return !c.element.isConnected ? met(true) : null; },
+  title_is: function (c) { return document.title === c.title ? met(true) : null; },
+  title_contains: function (c) { return document.title.indexOf(c.title) !== -1 ? met(true) : null; },
+  url_to_be: function (c) { return location.href === c.url ? met(true) : null; },
+  url_contains: function (c) { return location.href.indexOf(c.url) !== -1 ? met(true) : null; },
+  url_matches: function (c) { return new RegExp(c.pattern).test(location.href) ? met(true) : null; },
+  url_changes: function (c) { return location.href !== c.url ? met(true) : null; },
+  ready_state: function (c) { return document.readyState === c.state ? met(true) : null; },
+  all: function (c) {
+    var rs = c.conditions.map(evaluate);
+    return rs.every(Boolean) ? met(composite(rs, 0, rs.length)) : null;
+  },
+  any: function (c) {
+    var rs = c.conditions.map(evaluate), i = rs.findIndex(Boolean);
+    return i !== -1 ? met(composite(rs, i, rs.length)) : null;
+  },
+  first: function (c) {
+    var rs = [];
+    for (var i = 0; i < c.conditions.length; i++) {
+      rs.push(evaluate(c.conditions[i]));
+      if (rs[i]) return met(composite(rs, i, c.conditions.length));
+    }
+    return null;
+  },
+  none: function (c) { return c.conditions.map(evaluate).some(Boolean) ? null : met(true); }
+};
+function composite(rs, index, size) {
+  while (rs.length < size) rs.push(null);  // first_of skips the rest
+  return {
+    index: index,
+    matched: rs.map(Boolean),
+    values: rs.map(function (r) { return r ? r.value : null; })
+  };
+}
+function unmet(c) {
+  return c.conditions ? c.conditions.map(function (x) { return !evaluate(x); }) : null;
+}
+function evaluate(c) {
+  var fn = conditions[c.type];
+  if (!fn) throw new Error('Unknown DOM condition: ' + c.type);
+  return fn(c);
+}
+"""
+
+# One evaluation (for WebDriverWait compatibility): arguments = [spec]
+EVALUATE_SCRIPT = _LIBRARY + r"""
+var r = evaluate(arguments[0]);
+return r ? {met: true, value: r.value} : {met: false};
+"""
+
+# Resolve when the condition holds: arguments = [spec, timeoutMs, pollMs, callback]
+WAIT_SCRIPT = _LIBRARY + r"""
+var spec = arguments[0], timeoutMs = arguments[1], pollMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var finished = false, observer = null, timer = null, poller = null;
+function finish(result) {
+  if (finished) return;
+  finished = true;
+  if (observer) observer.disconnect();
+  clearTimeout(timer);
+  clearInterval(poller);
+  done(result);
+}
+function check() {
+  if (finished) return;
+  try {
+    var r = evaluate(spec);
+    if (r) finish({met: true, value: r.value});
+  } catch (e) {
+    finish({error: String(e && e.message || e)});
+  }
+}
+check();
+if (!finished) {
+  observer = new MutationObserver(check);
+  observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+  poller = setInterval(check, pollMs);
+  timer = setTimeout(function () {
+    var u = null;
+    try { u = unmet(spec); } catch (e) {}
+    finish({met: false, unmet: u});
+  }, timeoutMs);
+}
+"""
+
+
+class DomCondition:
+    """A condition evaluated in the page; build one with the factories below.
+
+    Calling it with a driver evaluates it once, so it also works with a plain
+    WebDriverWait. DomWait.until() runs it event-driven instead.
+    """
+
+    def __init__(self, kind: str, **params):
+        self.spec: Dict[str, Any] = dict(params, type=kind)
+
+    def __call__(self, driver):
+        try:
+            result = driver.execute_script(EVALUATE_SCRIPT, self.spec)
+        except StaleElementReferenceException:
+            if self.spec["type"] == "staleness":
+                return True
+            raise
+        return _result_value(self, result.get("value", True)) if result.get("met") else False
+
+    def __repr__(self):
+        if "conditions" in self.spec:
+            return f"DomCondition({self.spec['type']}: {', '.join(c['type'] for c in self.spec['conditions'])})"
+        return f"DomCondition({self.spec['type']})"
+
+
+class CompositeResult(list):
+    """Values of a composite wait, one per condition (None where unmet).
+
+    matched holds each condition's outcome and index the condition that
+    satisfied any_of/first_of (0 for all_of). For all_of it unpacks like
+    the list selenium's EC.all_of returns.
+    """
+
+    def __init__(self, values: List[Any], matched: List[bool], index: int):
+        super().__init__(values)
+        self.matched = matched
+        self.index = index
+
+    @property
+    def value(self) -> Any:
+        """The value of the condition at index."""
+        return self[self.index]
+
+
+def _result_value(condition: DomCondition, value: Any) -> Any:
+    return _wrap_composite(condition.spec, value)
+
+
+def _wrap_composite(spec: Dict[str, Any], value: Any) -> Any:
+    """Turn (possibly nested) composite results into CompositeResults."""
+    if spec["type"] not in COMPOSITE_TYPES or not isinstance(value, dict):
+        return value
+    values = [
+        _wrap_composite(child, child_value)
+        for child, child_value in zip(spec["conditions"], value["values"])
+    ]
+    return CompositeResult(values, value["matched"], value["index"])
+
+
+def _target(mark) -> Dict[str, Any]:
+    """A locator tuple or an already-found element."""
+    if isinstance(mark, (tuple, list)):
+        return {"locator": list(mark)}
+    return {"element": mark}
+
+
+# Factories named after selenium.webdriver.support.expected_conditions
+
+def presence_of_element_located(locator: Tuple[str, str]) -> DomCondition:
+    return DomCondition("presence", **_target(locator))
+
+
+def presence_of_all_elements_located(locator: Tuple[str, str]) -> DomCondition:
+    return DomCondition("presence_all", locator=list(locator))
+
+
+def minimum_elements_present(locator: Tuple[str, str], minimum: int) -> DomCondition:
+    """At least minimum elements match; returns them all."""
+    return DomCondition("minimum_elements", locator=list(locator), minimum=minimum)
+
+
+def visibility_of_element_located(locator: Tuple[str, str]) -> DomCondition:
+    return DomCondition("visibility", **_target(locator))
+
+
+def visibility_of(element) -> DomCondition:
+    return DomCondition("visibility", **_target(element))
+
+
+def visibility_of_all_elements_located(locator: Tuple[str, str]) -> DomCondition:
+    return DomCondition("visibility_all", locator=list(locator))
+
+
+def visibility_of_any_elements_located(locator: Tuple[str, str]) -> DomCondition:
+    return DomCondition("visibility_any", locator=list(locator))
+
+
+def invisibility_of_element_located(mark) -> DomCondition:
+    return DomCondition("invisibility", **_target(mark))
+
+
+invisibility_of_element = invisibility_of_element_located
+
+
+def element_to_be_clickable(mark) -> DomCondition:
+    return DomCondition("clickable", **_target(mark))
+
+
+def text_to_be_present_in_element(locator: Tuple[str, str], text_: str) -> DomCondition:
+    return DomCondition("text", **_target(locator), text=text_)
+
+
+def text_to_be_present_in_element_value(locator: Tuple[str, str], text_: str) -> DomCondition:
+    return DomCondition("text_value", **_target(locator), text=text_)
+
+
+def text_to_be_present_in_element_attribute(locator: Tuple[str, str], attribute_: str,
+                                            text_: str) -> DomCondition:
+    return DomCondition("text_attribute", **_target(locator), attribute=attribute_, text=text_)
+
+
+def element_attribute_to_include(locator: Tuple[str, str], attribute_: str) -> DomCondition:
+    return DomCondition("attribute_includes", **_target(locator), attribute=attribute_)
+
+
+def element_to_be_selected(element) -> DomCondition:
+    return DomCondition("selection_state", **_target(element), selected=True)
+
+
+def element_located_to_be_selected(locator: Tuple[str, str]) -> DomCondition:
+    return DomCondition("selection_state", **_target(locator), selected=True)
+
+
+def element_selection_state_to_be(element, is_selected: bool) -> DomCondition:
+    return DomCondition("selection_state", **_target(element), selected=is_selected)
+
+
+def element_located_selection_state_to_be(locator: Tuple[str, str], is_selected: bool) -> DomCondition:
+    return DomCondition("selection_state", **_target(locator), selected=is_selected)
+
+
+def staleness_of(element) -> DomCondition:
+    return DomCondition("staleness", element=element)
+
+
+def title_is(title: str) -> DomCondition:
+    return DomCondition("title_is", title=title)
+
+
+def title_contains(title: str) -> DomCondition:
+    return DomCondition("title_contains", title=title)
+
+
+def url_to_be(url: str) -> DomCondition:
+    return DomCondition("url_to_be", url=url)
+
+
+def url_contains(url: str) -> DomCondition:
+    return DomCondition("url_contains", url=url)
+
+
+def url_matches(pattern: str) -> DomCondition:
+    return DomCondition("url_matches", pattern=pattern)
+
+
+def url_changes(url: str) -> DomCondition:
+    return DomCondition("url_changes", url=url)
+
+
+def document_ready(state: str = "complete") -> DomCondition:
+    return DomCondition("ready_state", state=state)
+
+
+# Composites: every child is checked in the same in-page evaluation
+
+def all_of(*conditions: DomCondition) -> DomCondition:
+    """All conditions hold at once; returns a CompositeResult of their values."""
+    return DomCondition("all", conditions=[c.spec for c in conditions])
+
+
+def any_of(*conditions: DomCondition) -> DomCondition:
+    """At least one holds; returns every condition's value (None where unmet)."""
+    return DomCondition("any", conditions=[c.spec for c in conditions])
+
+
+def first_of(*conditions: DomCondition) -> DomCondition:
+    """The earliest listed condition that holds wins; later ones aren't evaluated."""
+    return DomCondition("first", conditions=[c.spec for c in conditions])
+
+
+def none_of(*conditions: DomCondition) -> DomCondition:
+    return DomCondition("none", conditions=[c.spec for c in conditions])
+
+
+def _script_budget(driver, remaining: float) -> float:
+    # ContextDrivers hold a shared browser lock per command, so they cap this
+    return min(remaining, getattr(driver, "max_script_block", MAX_SCRIPT_WAIT))
+
+
+def _handle_result(condition: DomCondition, result: Optional[Dict]):
+    """Return (done, value) for one WAIT_SCRIPT result."""
+    result = result or {}
+    if result.get("error"):
+        raise WebDriverException(f"{condition!r} failed in page: {result['error']}")
+    if result.get("met"):
+        return True, _result_value(condition, result.get("value", True))
+    return False, result.get("unmet")
+
+
+def _timeout_message(condition: DomCondition, message: str, unmet: Optional[List[bool]]) -> str:
+    """Name the composite children that were still unmet at the deadline."""
+    if not unmet:
+        return message
+    names = [c["type"] for c, failed in zip(condition.spec["conditions"], unmet) if failed]
+    return f"{message} (unmet: {', '.join(names)})".strip()
+
+
+def _navigated_away(error: Exception) -> bool:
+    # A navigation mid-wait unloads the document that was running the observer
+    return "unloaded" in str(error) or "navigat" in str(error)
+
+
+class DomWait:
+    """Event-driven replacement for WebDriverWait(driver, timeout).until().
+
+    DomConditions resolve inside the page within milliseconds of the DOM
+    change. Any other callable (e.g. an expected_conditions object that has
+    no DOM equivalent, like alert_is_present) falls back to WebDriverWait
+    with poll_frequency.
+    """
+
+    def __init__(self, driver, timeout: float = 10, poll_frequency: float = FALLBACK_POLL,
+                 ignored_exceptions=None):
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self.ignored_exceptions = ignored_exceptions
+
+    def until(self, condition, message: str = ""):
+        if not isinstance(condition, DomCondition):
+            return WebDriverWait(
+                self.driver, self.timeout, poll_frequency=self.poll_frequency,
+                ignored_exceptions=self.ignored_exceptions
+            ).until(condition, message)
+
+        with tracer.span("DomWait", "wait", condition=repr(condition), polls=0) as span:
+            return self._until(condition, message, span)
+
+    def _until(self, condition: DomCondition, message: str, span: Dict):
+        deadline = time.monotonic() + self.timeout
+        unmet = None
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(_timeout_message(condition, message, unmet))
+            span["polls"] += 1
+            try:
+                result = self.driver.execute_async_script(
+                    WAIT_SCRIPT, condition.spec,
+                    int(_script_budget(self.driver, remaining) * 1000),
+                    int(self.poll_frequency * 1000),
+                )
+            except StaleElementReferenceException:
+                if condition.spec["type"] == "staleness":
+                    return True
+                raise
+            except JavascriptException as e:
+                if not _navigated_away(e):
+                    raise
+                logger.debug(f"{condition!r} restarted after navigation")
+                continue
+
+            done, value = _handle_result(condition, result)
+            if done:
+                return value
+            unmet = value
+
+
+async def async_until(driver, condition: DomCondition, timeout: float = 10,
+                      poll_frequency: float = FALLBACK_POLL, message: str = ""):
+    """DomWait.until() for an AsyncDriver."""
+    with tracer.span("DomWait", "wait", condition=repr(condition), polls=0) as span:
+        return await _async_until(driver, condition, timeout, poll_frequency, message, span)
+
+
+async def _async_until(driver, condition: DomCondition, timeout: float, poll_frequency: float,
+                       message: str, span: Dict):
+    deadline = time.monotonic() + timeout
+    unmet = None
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutException(_timeout_message(condition, message, unmet))
+        span["polls"] += 1
+        try:
+            result = await driver.execute_async_script(
+                WAIT_SCRIPT, condition.spec,
+                int(_script_budget(driver.driver, remaining) * 1000),
+                int(poll_frequency * 1000),
+            )
+        except StaleElementReferenceException:
+            if condition.spec["type"] == "staleness":
+                return True
+            raise
+        except JavascriptException as e:
+            if not _navigated_away(e):
+                raise
+            await asyncio.sleep(0)
+            continue
+
+        done, value = _handle_result(condition, result)
+        if done:
+            return value
+        unmet = value
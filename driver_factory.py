@@ -0,0 +1,680 @@
+"""
+Shared Chrome Driver Factory with Selenium Stealth
+Builds stealth-configured Chrome drivers and keeps a bounded pool of warm
+sessions so example tasks don't pay a full browser launch every time
+"""
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium_stealth import stealth
+from driver_resolver import resolve_chromedriver
+from profile_slots import ProfileSlot, profile_slots
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+import atexit
+import copy
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Default stealth fingerprint used by every example
+STEALTH_SETTINGS = {
+    "languages": ["en-US", "en"],
+    "vendor": "Google Inc.",
+    "platform": "Win32",
+    "webgl_vendor": "Intel Inc.",
+    "renderer": "Intel Iris OpenGL Engine",
+    "fix_hairline": True,
+}
+
+# Resource patterns for Network.setBlockedURLs ('*' is a wildcard)
+IMAGE_PATTERNS = ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.avif*"]
+FONT_PATTERNS = ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"]
+MEDIA_PATTERNS = ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*"]
+TRACKER_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*connect.facebook.net*", "*hotjar.com*", "*scorecardresearch.com*",
+]
+STYLESHEET_PATTERNS = ["*.css*"]
+
+# Named fetch profiles. Scrapers that only read text and attributes don't
+# need pixels, fonts or video; img src attributes are still in the DOM.
+# Everything is blocked through Network.setBlockedURLs (not Chrome's image
+# content setting), so each blocked request shows up in FetchStats.
+FETCH_PROFILES = {
+    "full": {
+        "blocked_urls": [],
+    },
+    "scrape": {
+        "blocked_urls": IMAGE_PATTERNS + FONT_PATTERNS + MEDIA_PATTERNS + TRACKER_PATTERNS,
+    },
+    # Stylesheets also affect what .text considers visible, so opt in per job
+    "scrape-no-css": {
+        "blocked_urls": IMAGE_PATTERNS + FONT_PATTERNS + MEDIA_PATTERNS + TRACKER_PATTERNS
+                        + STYLESHEET_PATTERNS,
+    },
+}
+
+# Fallback size per resource type when estimating bytes saved (bytes)
+AVERAGE_RESOURCE_BYTES = {
+    "Image": 40000,
+    "Font": 30000,
+    "Media": 400000,
+    "Script": 25000,
+    "Stylesheet": 15000,
+    "Other": 5000,
+}
+
+# Named launch profiles (Chrome flags). Compare them on your machine with
+# benchmark_launch_profiles.py before changing a profile.
+LAUNCH_PROFILES = {
+    # Headless bulk scraping: no GPU, extensions or background work
+    "throughput": [
+        "--headless=new",
+        "--window-size=1920,1080",
+        "--disable-gpu",
+        "--disable-dev-shm-usage",
+        "--no-sandbox",
+        "--disable-setuid-sandbox",
+        "--disable-extensions",
+        "--disable-software-rasterizer",
+        "--disable-background-networking",
+        "--disable-background-timer-throttling",
+        "--disable-renderer-backgrounding",
+        "--disable-backgrounding-occluded-windows",
+        "--mute-audio",
+        "--disable-logging",
+        "--log-level=3",
+    ],
+    # Headless captures that should match a headed browser pixel for pixel
+    "screenshot-fidelity": [
+        "--headless=new",
+        "--window-size=1920,1080",
+        "--force-device-scale-factor=1",
+        "--hide-scrollbars",
+        "--font-render-hinting=none",
+        "--log-level=3",
+    ],
+    # Visible browser, quiet console (the default)
+    "headed": [
+        "start-maximized",
+        "--log-level=3",
+    ],
+    # Visible browser with verbose Chrome logging, for debugging a script
+    "debug": [
+        "start-maximized",
+        "--log-level=0",
+    ],
+}
+
+# Pool defaults
+POOL_MAX_SIZE = 2         # Max concurrent sessions per pool
+POOL_MAX_USES = 20        # Recycle a session after this many checkouts
+POOL_IDLE_TIMEOUT = 300   # Quit sessions idle longer than this (seconds)
+
+
+def build_chrome_options(launch_profile: str = "headed",
+                         arguments: Iterable[str] = (),
+                         prefs: Optional[Dict] = None,
+                         fetch_profile: Optional[str] = None) -> webdriver.ChromeOptions:
+    """Build ChromeOptions from a named launch profile plus the common stealth flags."""
+    if launch_profile not in LAUNCH_PROFILES:
+        raise ValueError(f"Unknown launch profile: {launch_profile}")
+    options = webdriver.ChromeOptions()
+
+    for argument in LAUNCH_PROFILES[launch_profile]:
+        options.add_argument(argument)
+
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument('--disable-blink-features=AutomationControlled')
+
+    for argument in arguments:
+        options.add_argument(argument)
+
+    if prefs:
+        options.add_experimental_option("prefs", prefs)
+
+    if fetch_profile:
+        apply_fetch_profile_options(options, fetch_profile)
+
+    return options
+
+
+class StartupTimings:
+    """Collects per-phase timing spans for every driver creation.
+
+    Phases: resolve_driver, profile_slot, chromedriver_spawn, chrome_launch,
+    stealth, fetch_profile and first_get (the driver's first navigation).
+    """
+
+    PHASES = ("resolve_driver", "profile_slot", "chromedriver_spawn", "chrome_launch",
+              "stealth", "fetch_profile", "first_get")
+
+    def __init__(self):
+        self._records: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def start(self, label: str) -> Dict:
+        record = {"label": label, "started_at": time.time(), "spans": {}}
+        with self._lock:
+            self._records.append(record)
+        return record
+
+    def span(self, record: Dict, phase: str, seconds: float):
+        record["spans"][phase] = round(seconds, 4)
+        logger.debug(json.dumps({"event": "driver_startup_span", "label": record["label"],
+                                 "phase": phase, "seconds": record["spans"][phase]}))
+
+    def reset(self):
+        with self._lock:
+            self._records = []
+
+    def records(self) -> List[Dict]:
+        with self._lock:
+            return [dict(r, spans=dict(r["spans"])) for r in self._records]
+
+    def report(self) -> Dict:
+        """p50/p95/max per phase (and in total) across recorded creations."""
+        records = self.records()
+        phases = {}
+        for phase in self.PHASES + ("total",):
+            if phase == "total":
+                values = [sum(v for k, v in r["spans"].items() if k != "first_get") for r in records]
+            else:
+                values = [r["spans"][phase] for r in records if phase in r["spans"]]
+            if values:
+                phases[phase] = {
+                    "count": len(values),
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "max": round(max(values), 4),
+                }
+        return {"drivers_created": len(records), "phases": phases, "records": records}
+
+    def write_report(self, path) -> Dict:
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return round(ordered[int(rank) - 1], 4)
+
+
+# Process-wide startup timings; reset() at the start of a run
+startup_timings = StartupTimings()
+
+
+def _time_first_get(driver: webdriver.Chrome, record: Dict):
+    """Record the first driver.get() as the first_get span, then unhook."""
+    original_get = driver.get
+
+    def timed_get(url):
+        with first_get_span(driver):
+            return original_get(url)
+
+    driver.get = timed_get
+    driver._first_get_record = record
+
+
+@contextmanager
+def first_get_span(driver: webdriver.Chrome):
+    """Time a navigation as the driver's first_get span if it is still pending.
+
+    driver.get() is hooked already; wrap navigations that bypass it (an
+    AsyncDriver over the same session) in this. Later navigations aren't timed.
+    """
+    record = driver.__dict__.pop("_first_get_record", None)
+    driver.__dict__.pop("get", None)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if record is not None:
+            startup_timings.span(record, "first_get", time.perf_counter() - start)
+
+
+def _release_slot_on_quit(driver: webdriver.Chrome, slot: ProfileSlot):
+    """Hand the profile slot back once the browser has quit."""
+    original_quit = driver.quit
+
+    def quit():
+        try:
+            return original_quit()
+        finally:
+            driver.__dict__.pop("quit", None)
+            profile_slots.release(slot)
+
+    driver.quit = quit
+
+
+def create_driver(options: webdriver.ChromeOptions,
+                  use_driver_manager: bool = True,
+                  fetch_profile: Optional[str] = None,
+                  label: str = "driver",
+                  profile_slot: Optional[str] = None) -> webdriver.Chrome:
+    """Launch Chrome with the given options and apply stealth settings.
+
+    The chromedriver path comes from the pinned manifest in driver_resolver.
+    With use_driver_manager=False chromedriver is located by Selenium Manager.
+    profile_slot names a profile_slots namespace: the driver runs on a locked,
+    persistent user-data-dir (warm disk cache) until it quits.
+    Each phase is recorded in startup_timings.
+    """
+    record = startup_timings.start(label)
+
+    slot = None
+    if profile_slot:
+        start = time.perf_counter()
+        slot = profile_slots.acquire(profile_slot)
+        if slot is not None:
+            options = slot.apply(copy.deepcopy(options), profile_slots.max_slot_mb * 0.8)
+        startup_timings.span(record, "profile_slot", time.perf_counter() - start)
+
+    if use_driver_manager:
+        start = time.perf_counter()
+        service = Service(resolve_chromedriver())
+        startup_timings.span(record, "resolve_driver", time.perf_counter() - start)
+    else:
+        service = Service()
+
+    # Time the chromedriver spawn separately from the session (Chrome) start
+    spawn = {}
+    original_start = service.start
+
+    def timed_start(*args, **kwargs):
+        spawn_start = time.perf_counter()
+        try:
+            return original_start(*args, **kwargs)
+        finally:
+            spawn["seconds"] = time.perf_counter() - spawn_start
+
+    service.start = timed_start
+    start = time.perf_counter()
+    try:
+        driver = webdriver.Chrome(service=service, options=options)
+    except Exception:
+        if slot is not None:
+            profile_slots.release(slot)
+        raise
+    launch_seconds = time.perf_counter() - start
+    startup_timings.span(record, "chromedriver_spawn", spawn.get("seconds", 0.0))
+    startup_timings.span(record, "chrome_launch", launch_seconds - spawn.get("seconds", 0.0))
+
+    start = time.perf_counter()
+    stealth(driver, **STEALTH_SETTINGS)
+    startup_timings.span(record, "stealth", time.perf_counter() - start)
+
+    if fetch_profile:
+        start = time.perf_counter()
+        apply_fetch_profile(driver, fetch_profile)
+        startup_timings.span(record, "fetch_profile", time.perf_counter() - start)
+
+    if slot is not None:
+        _release_slot_on_quit(driver, slot)
+    _time_first_get(driver, record)
+    return driver
+
+
+def apply_fetch_profile_options(options: webdriver.ChromeOptions, profile: str):
+    """Launch-time part of a fetch profile: network logging (blocking is per target)."""
+    if profile not in FETCH_PROFILES:
+        raise ValueError(f"Unknown fetch profile: {profile}")
+    # Network events in the performance log feed FetchStats
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def apply_fetch_profile(driver: webdriver.Chrome, profile: str,
+                        extra_patterns: Iterable[str] = ()):
+    """Block a profile's URL patterns (plus any per-job extras) in the current page target."""
+    patterns = FETCH_PROFILES[profile]["blocked_urls"] + list(extra_patterns)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    logger.debug(f"Fetch profile '{profile}' blocking {len(patterns)} URL patterns")
+
+
+class FetchStats:
+    """Tallies requests and bytes from Chrome's performance log.
+
+    Blocked requests never transfer, so their size is estimated from the
+    average size of same-type requests that did load in this run, falling
+    back to AVERAGE_RESOURCE_BYTES. Only requests Chrome attempted are
+    counted: the estimate covers Network.setBlockedURLs blocking (every
+    fetch profile), not resources a page never asked for.
+    """
+
+    def __init__(self):
+        self.requests_loaded = 0
+        self.bytes_transferred = 0
+        self.requests_blocked = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self._loaded_bytes_by_type: Dict[str, List[int]] = {}
+        self._request_types: Dict[str, str] = {}
+
+    def update(self, driver: webdriver.Chrome):
+        """Drain the driver's performance log into the counters."""
+        try:
+            entries = driver.get_log('performance')
+        except Exception:
+            return
+        self.add_entries(entries)
+
+    def add_entries(self, entries: List[Dict]):
+        """Count Network events from raw performance log entries."""
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method == 'Network.requestWillBeSent':
+                self._request_types[params.get('requestId')] = params.get('type', 'Other')
+            elif method == 'Network.loadingFinished':
+                size = int(params.get('encodedDataLength', 0))
+                resource_type = self._request_types.pop(params.get('requestId'), 'Other')
+                self.requests_loaded += 1
+                self.bytes_transferred += size
+                self._loaded_bytes_by_type.setdefault(resource_type, []).append(size)
+            elif method == 'Network.loadingFailed':
+                resource_type = self._request_types.pop(params.get('requestId'), None) \
+                    or params.get('type', 'Other')
+                if params.get('blockedReason'):
+                    self.requests_blocked += 1
+                    self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+
+    def estimated_bytes_saved(self) -> int:
+        total = 0
+        for resource_type, count in self.blocked_by_type.items():
+            sizes = self._loaded_bytes_by_type.get(resource_type)
+            if sizes:
+                average = sum(sizes) / len(sizes)
+            else:
+                average = AVERAGE_RESOURCE_BYTES.get(resource_type, AVERAGE_RESOURCE_BYTES["Other"])
+            total += average * count
+        return int(total)
+
+    def summary(self) -> Dict:
+        return {
+            'requests_loaded': self.requests_loaded,
+            'bytes_transferred': self.bytes_transferred,
+            'requests_blocked': self.requests_blocked,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'estimated_bytes_saved': self.estimated_bytes_saved(),
+        }
+
+
+class PooledDriver:
+    """Bookkeeping for a single pooled browser session."""
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.window_size = None
+
+
+class DriverPool:
+    """Bounded pool of warm Chrome sessions.
+
+    Sessions are handed out with checkout() and returned with checkin().
+    Returned sessions are reset (cookies and storage for every origin, extra
+    windows) before the next borrower gets them. Sessions are quit once they reach max_uses or
+    have been idle longer than idle_timeout.
+    """
+
+    def __init__(self, factory: Callable[[], webdriver.Chrome],
+                 max_size: int = POOL_MAX_SIZE,
+                 max_uses: int = POOL_MAX_USES,
+                 idle_timeout: float = POOL_IDLE_TIMEOUT,
+                 name: str = "default"):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.name = name
+        self._idle: List[PooledDriver] = []
+        self._busy: Dict[int, PooledDriver] = {}
+        self._launching = 0
+        self._lock = threading.Condition()
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._busy) + self._launching
+
+    def warm(self, count: int = 1):
+        """Pre-launch sessions so the first checkouts are instant."""
+        count = min(count, self.max_size - self.size)
+        for _ in range(max(count, 0)):
+            entry = self._launch()
+            with self._lock:
+                self._idle.append(entry)
+                self._lock.notify()
+
+    def checkout(self, timeout: Optional[float] = None) -> webdriver.Chrome:
+        """Borrow a session, launching one if the pool has room."""
+        deadline = None if timeout is None else time.time() + timeout
+
+        # Quit expired sessions outside the lock; a Chrome shutdown takes a while
+        with self._lock:
+            expired = self._evict_idle()
+        for driver in expired:
+            self._quit(driver)
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"Driver pool '{self.name}' is closed")
+
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self.size < self.max_size:
+                    entry = None
+                    # Reserve the slot while Chrome starts outside the lock
+                    self._launching += 1
+                    break
+
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No driver available in pool '{self.name}'")
+                self._lock.wait(remaining)
+
+        if entry is None:
+            try:
+                entry = self._launch()
+            finally:
+                with self._lock:
+                    self._launching -= 1
+                    self._lock.notify()
+
+        entry.uses += 1
+        entry.last_used = time.time()
+        with self._lock:
+            self._busy[id(entry.driver)] = entry
+        logger.debug(f"[{self.name}] Checked out driver (use {entry.uses}/{self.max_uses})")
+        return entry.driver
+
+    def checkin(self, driver: webdriver.Chrome):
+        """Return a borrowed session to the pool."""
+        with self._lock:
+            entry = self._busy.pop(id(driver), None)
+
+        if entry is None:
+            logger.warning(f"[{self.name}] Driver was not checked out from this pool, quitting it")
+            self._quit(driver)
+            return
+
+        if self._closed or entry.uses >= self.max_uses or not self._reset(entry):
+            self._quit(entry.driver)
+            with self._lock:
+                self._lock.notify()
+            return
+
+        entry.last_used = time.time()
+        with self._lock:
+            self._idle.append(entry)
+            self._lock.notify()
+
+    def discard(self, driver: webdriver.Chrome):
+        """Quit a borrowed session instead of returning it (e.g. after a crash)."""
+        with self._lock:
+            self._busy.pop(id(driver), None)
+            self._lock.notify()
+        self._quit(driver)
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = None):
+        """Context manager around checkout()/checkin()."""
+        driver = self.checkout(timeout)
+        try:
+            yield driver
+        finally:
+            self.checkin(driver)
+
+    def close(self):
+        """Quit every idle session; busy ones are quit when checked in."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+        for entry in idle:
+            self._quit(entry.driver)
+
+    def _launch(self) -> PooledDriver:
+        start = time.time()
+        entry = PooledDriver(self.factory())
+        try:
+            entry.window_size = entry.driver.get_window_size()
+        except Exception:
+            pass
+        logger.info(f"[{self.name}] Launched driver in {time.time() - start:.2f}s")
+        return entry
+
+    def _evict_idle(self) -> List[webdriver.Chrome]:
+        """Drop sessions idle past idle_timeout and return them for the caller
+        to quit once it has released the lock. Caller holds the lock."""
+        now = time.time()
+        expired = [e for e in self._idle if now - e.last_used > self.idle_timeout]
+        for entry in expired:
+            self._idle.remove(entry)
+            logger.debug(f"[{self.name}] Evicting driver idle for {now - entry.last_used:.0f}s")
+        return [entry.driver for entry in expired]
+
+    def _reset(self, entry: PooledDriver) -> bool:
+        """Clear state left by the previous borrower."""
+        driver = entry.driver
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+
+            driver.implicitly_wait(0)
+            origins = self._visited_origins(driver)
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            for origin in origins:
+                # Local/session storage, IndexedDB, caches and service workers
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin",
+                                       {"origin": origin, "storageTypes": "all"})
+            driver.get("about:blank")
+            try:
+                # Drop network events so the next borrower's FetchStats start clean
+                driver.get_log('performance')
+            except Exception:
+                pass
+
+            if entry.window_size:
+                driver.set_window_size(entry.window_size['width'], entry.window_size['height'])
+            return True
+        except Exception as e:
+            logger.warning(f"[{self.name}] Failed to reset driver, discarding it: {e}")
+            return False
+
+    def _visited_origins(self, driver: webdriver.Chrome) -> List[str]:
+        """Origins the previous borrower left state in: every cookie domain plus the current page.
+
+        CDP has no clear-all for origin storage, so each origin is cleared in turn.
+        """
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+        origins = {f"{scheme}://{cookie['domain'].lstrip('.')}"
+                   for cookie in cookies for scheme in ("https", "http")}
+        try:
+            current = driver.execute_script("return window.location.origin")
+        except Exception:
+            current = None
+        if current and current != "null":
+            origins.add(current)
+        return sorted(origins)
+
+    def _quit(self, driver: Optional[webdriver.Chrome]):
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+# Registry of named pools shared across modules
+_pools: Dict[str, DriverPool] = {}
+_pools_lock = threading.Lock()
+_owners: Dict[int, DriverPool] = {}
+
+
+def get_pool(name: str, factory: Callable[[], webdriver.Chrome], **kwargs) -> DriverPool:
+    """Return the shared pool registered under name, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None or pool._closed:
+            pool = DriverPool(factory, name=name, **kwargs)
+            _pools[name] = pool
+        return pool
+
+
+def checkout(name: str, factory: Callable[[], webdriver.Chrome], **kwargs) -> webdriver.Chrome:
+    """Borrow a driver from the named shared pool."""
+    pool = get_pool(name, factory, **kwargs)
+    driver = pool.checkout()
+    with _pools_lock:
+        _owners[id(driver)] = pool
+    return driver
+
+
+def release(driver: webdriver.Chrome, discard: bool = False):
+    """Return a driver obtained from checkout() to its pool."""
+    with _pools_lock:
+        pool = _owners.pop(id(driver), None)
+
+    if pool is None:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    elif discard:
+        pool.discard(driver)
+    else:
+        pool.checkin(driver)
+
+
+def shutdown_pools():
+    """Quit every pooled driver. Registered to run at interpreter exit."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(shutdown_pools)
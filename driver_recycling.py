@@ -0,0 +1,184 @@
+"""
+Memory-Aware Driver Recycling
+Watches Chrome's process-tree RSS and JS heap for long-running sessions and
+transparently restarts the browser (restoring URL and cookies) when limits are hit
+"""
+from selenium import webdriver
+from typing import Callable, Dict, Optional
+import logging
+import time
+
+try:
+    import psutil
+except ImportError:  # RSS sampling is skipped without psutil
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Cookie fields accepted by CDP Network.setCookies
+COOKIE_PARAM_KEYS = (
+    "name", "value", "domain", "path", "secure", "httpOnly",
+    "sameSite", "expires", "priority", "sourceScheme", "sourcePort",
+)
+
+
+class RecyclePolicy:
+    """Limits that trigger a browser restart. Use None to disable a limit."""
+
+    def __init__(self, max_rss_mb: Optional[float] = 1500,
+                 max_js_heap_mb: Optional[float] = 512,
+                 max_navigations: Optional[int] = 200,
+                 sample_every: int = 5):
+        self.max_rss_mb = max_rss_mb
+        self.max_js_heap_mb = max_js_heap_mb
+        self.max_navigations = max_navigations
+        self.sample_every = max(sample_every, 1)
+
+
+def process_tree_rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of pid and all its descendants, in MB."""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(pid)
+        total = 0
+        for proc in [root] + root.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total / (1024 * 1024)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+
+def sample_memory(driver: webdriver.Chrome) -> Dict[str, Optional[float]]:
+    """Sample the browser's process-tree RSS and the page's JS heap (MB)."""
+    rss_mb = None
+    try:
+        # chromedriver is the parent of Chrome and its renderer/GPU processes
+        rss_mb = process_tree_rss_mb(driver.service.process.pid)
+    except AttributeError:
+        pass
+
+    js_heap_mb = None
+    try:
+        used = driver.execute_script(
+            "return performance.memory ? performance.memory.usedJSHeapSize : null;"
+        )
+        if used is not None:
+            js_heap_mb = used / (1024 * 1024)
+    except Exception:
+        pass
+
+    return {'rss_mb': rss_mb, 'js_heap_mb': js_heap_mb}
+
+
+def capture_state(driver: webdriver.Chrome) -> Dict:
+    """Capture the current URL and all cookies (every domain) via CDP."""
+    state = {'url': driver.current_url, 'cookies': []}
+    try:
+        state['cookies'] = driver.execute_cdp_cmd("Network.getAllCookies", {}).get('cookies', [])
+    except Exception as e:
+        logger.debug(f"Could not read cookies before recycle: {e}")
+    return state
+
+
+def restore_state(driver: webdriver.Chrome, state: Dict):
+    """Restore cookies captured by capture_state() and reopen the URL."""
+    cookies = []
+    for cookie in state.get('cookies', []):
+        param = {k: cookie[k] for k in COOKIE_PARAM_KEYS if k in cookie}
+        if cookie.get('session'):
+            param.pop('expires', None)
+        cookies.append(param)
+
+    if cookies:
+        try:
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        except Exception as e:
+            logger.warning(f"Could not restore cookies after recycle: {e}")
+
+    url = state.get('url')
+    if url and not url.startswith(('data:', 'about:', 'chrome:')):
+        driver.get(url)
+
+
+class RecyclingSession:
+    """Wraps a driver and restarts it when a RecyclePolicy limit is crossed.
+
+    Navigation methods (get/refresh) are counted, and check() can be called
+    from loops that don't navigate (e.g. infinite scroll). Every other
+    attribute is forwarded to the current driver, so the session can be
+    passed anywhere a webdriver.Chrome is expected.
+    """
+
+    def __init__(self, factory: Callable[[], webdriver.Chrome],
+                 policy: Optional[RecyclePolicy] = None,
+                 closer: Optional[Callable[[webdriver.Chrome], None]] = None,
+                 name: str = "session"):
+        self._factory = factory
+        self._closer = closer or (lambda d: d.quit())
+        self.policy = policy or RecyclePolicy()
+        self.name = name
+        self.driver = factory()
+        self.navigations = 0
+        self.recycles = 0
+        self.last_sample: Dict[str, Optional[float]] = {}
+        self._ticks = 0
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def get(self, url: str):
+        self.driver.get(url)
+        self.navigations += 1
+        self.check()
+
+    def refresh(self):
+        self.driver.refresh()
+        self.navigations += 1
+        self.check()
+
+    def check(self) -> bool:
+        """Recycle the driver if a limit is crossed. Returns True if recycled."""
+        policy = self.policy
+        reason = None
+
+        if policy.max_navigations and self.navigations >= policy.max_navigations:
+            reason = f"{self.navigations} navigations"
+        else:
+            self._ticks += 1
+            if self._ticks % policy.sample_every == 0:
+                self.last_sample = sample_memory(self.driver)
+                rss_mb = self.last_sample.get('rss_mb')
+                js_heap_mb = self.last_sample.get('js_heap_mb')
+                if policy.max_rss_mb and rss_mb and rss_mb > policy.max_rss_mb:
+                    reason = f"RSS {rss_mb:.0f}MB > {policy.max_rss_mb}MB"
+                elif policy.max_js_heap_mb and js_heap_mb and js_heap_mb > policy.max_js_heap_mb:
+                    reason = f"JS heap {js_heap_mb:.0f}MB > {policy.max_js_heap_mb}MB"
+
+        if reason:
+            self.recycle(reason)
+            return True
+        return False
+
+    def recycle(self, reason: str = "manual"):
+        """Restart the browser and restore URL and cookies."""
+        start = time.time()
+        state = capture_state(self.driver)
+        try:
+            self._closer(self.driver)
+        except Exception:
+            pass
+
+        self.driver = self._factory()
+        restore_state(self.driver, state)
+
+        self.navigations = 0
+        self._ticks = 0
+        self.recycles += 1
+        logger.info(f"[{self.name}] Recycled driver ({reason}) in {time.time() - start:.2f}s")
+
+    def quit(self):
+        self._closer(self.driver)
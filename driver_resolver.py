@@ -0,0 +1,188 @@
+"""
+Offline ChromeDriver Resolution
+Pins the chromedriver path and version in a local manifest so drivers can be
+built without ChromeDriverManager probing versions (or the network) on every launch
+"""
+from webdriver_manager.chrome import ChromeDriverManager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Manifest location (override with CHROMEDRIVER_MANIFEST)
+MANIFEST_PATH = Path(os.environ.get(
+    "CHROMEDRIVER_MANIFEST",
+    Path(__file__).resolve().parent / "drivers" / "chromedriver_manifest.json"
+))
+
+# Candidate Chrome binaries for local version detection
+CHROME_BINARIES = [
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "chrome",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+WINDOWS_VERSION_KEYS = [
+    r"HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon",
+    r"HKEY_LOCAL_MACHINE\Software\Google\Chrome\BLBeacon",
+    r"HKEY_LOCAL_MACHINE\Software\WOW6432Node\Google\Chrome\BLBeacon",
+]
+
+VERSION_PATTERN = re.compile(r"(\d+)\.(\d+)\.(\d+)\.(\d+)")
+
+_resolved_path: Optional[str] = None
+_env_refresh_done = False  # CHROMEDRIVER_REFRESH applies to the first resolve per process only
+_lock = threading.Lock()
+
+
+def _run_version_command(command) -> Optional[str]:
+    """Run a --version style command and pull out the dotted version."""
+    try:
+        output = subprocess.run(
+            command, capture_output=True, text=True, timeout=10
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION_PATTERN.search(output or "")
+    return match.group(0) if match else None
+
+
+def detect_chrome_version() -> Optional[str]:
+    """Detect the installed Chrome version without touching the network."""
+    if sys.platform.startswith("win"):
+        for key in WINDOWS_VERSION_KEYS:
+            version = _run_version_command(["reg", "query", key, "/v", "version"])
+            if version:
+                return version
+        return None
+
+    for binary in CHROME_BINARIES:
+        path = shutil.which(binary) or (binary if os.path.isfile(binary) else None)
+        if path:
+            version = _run_version_command([path, "--version"])
+            if version:
+                return version
+    return None
+
+
+def detect_driver_version(driver_path: str) -> Optional[str]:
+    """Return the version reported by a chromedriver binary."""
+    return _run_version_command([driver_path, "--version"])
+
+
+def major_version(version: Optional[str]) -> Optional[str]:
+    return version.split(".")[0] if version else None
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Dict:
+    """Load the pinned driver manifest, or an empty dict if missing/corrupt."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: Dict, path: Path = MANIFEST_PATH):
+    """Write the manifest atomically so concurrent workers never read half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _manifest_is_valid(manifest: Dict, chrome_version: Optional[str]) -> bool:
+    driver_path = manifest.get("driver_path")
+    if not driver_path or not os.path.isfile(driver_path):
+        return False
+    # If Chrome can't be detected locally, trust the pin rather than go online
+    if chrome_version is None:
+        return True
+    return major_version(manifest.get("driver_version")) == major_version(chrome_version)
+
+
+def _install_driver(chrome_version: Optional[str], path: Path) -> str:
+    """Download/locate chromedriver via webdriver-manager and pin it."""
+    driver_path = ChromeDriverManager().install()
+    manifest = {
+        "driver_path": driver_path,
+        "driver_version": detect_driver_version(driver_path),
+        "chrome_version": chrome_version,
+        "resolved_at": datetime.now().isoformat(),
+        "source": "webdriver-manager",
+    }
+    save_manifest(manifest, path)
+    logger.info(f"Pinned chromedriver {manifest['driver_version']} at {driver_path}")
+    return driver_path
+
+
+def resolve_chromedriver(refresh: bool = False, path: Path = MANIFEST_PATH) -> str:
+    """Return a chromedriver path, consulting the network only when needed.
+
+    Resolution order:
+      1. CHROMEDRIVER_PATH environment variable
+      2. The pinned manifest, if its driver exists and matches Chrome's major version
+      3. ChromeDriverManager().install(), pinned into the manifest
+      4. A stale pin or chromedriver on PATH if the install fails (e.g. offline)
+
+    Set refresh=True to force step 3. CHROMEDRIVER_REFRESH=1 forces it once
+    per process; later launches reuse the freshly pinned driver.
+    """
+    global _resolved_path, _env_refresh_done
+
+    override = os.environ.get("CHROMEDRIVER_PATH")
+    if override:
+        return override
+
+    with _lock:
+        if not _env_refresh_done:
+            _env_refresh_done = True
+            refresh = refresh or os.environ.get("CHROMEDRIVER_REFRESH") == "1"
+
+        if _resolved_path and not refresh:
+            return _resolved_path
+
+        manifest = load_manifest(path)
+        chrome_version = detect_chrome_version()
+
+        if not refresh and _manifest_is_valid(manifest, chrome_version):
+            _resolved_path = manifest["driver_path"]
+            return _resolved_path
+
+        if manifest and not refresh:
+            logger.info(
+                f"Pinned chromedriver {manifest.get('driver_version')} does not match "
+                f"Chrome {chrome_version}, re-resolving"
+            )
+
+        try:
+            _resolved_path = _install_driver(chrome_version, path)
+            return _resolved_path
+        except Exception as e:
+            logger.warning(f"ChromeDriverManager install failed: {e}")
+
+        fallback = manifest.get("driver_path")
+        if not (fallback and os.path.isfile(fallback)):
+            fallback = shutil.which("chromedriver")
+        if fallback:
+            logger.warning(f"Using fallback chromedriver: {fallback}")
+            _resolved_path = fallback
+            return _resolved_path
+
+        raise RuntimeError(
+            "No chromedriver available offline. Set CHROMEDRIVER_PATH or run once "
+            "with network access to pin a driver."
+        )
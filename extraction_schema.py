@@ -0,0 +1,303 @@
+"""
+Declarative Extraction Schemas
+JSON-friendly record schemas (selectors, text vs attribute, list vs scalar,
+post-processing) compiled once into a single in-page extractor script
+
+Schema format:
+    {
+        "item": {"xpath": "//div[@class='card']"},
+        "fields": {
+            "title": {"css": "h2", "post": ["strip"]},
+            "images": {"tag": "img", "attribute": "src", "many": true,
+                       "post": ["http_only"], "enabled_by": "media_urls"}
+        }
+    }
+
+Selector keys: xpath, css, class, tag, id, name (one per item/field).
+A field is left out when "enabled" is false, or when every toggle named in
+"enabled_by" is false in the toggles passed to load_schema().
+
+Union XPaths like //div[contains(@class, "a") or contains(@class, "b")] are
+run as one native CSS selector list (div[class*="a"], div[class*="b"]),
+which keeps union semantics and document order. SelectorStats (one per
+scrape session) counts hits per selector and which union branch matched.
+"""
+from selenium.webdriver.common.by import By
+from html_parsing import POST_PROCESSORS, Field, RecordSpec, finish_record, to_xpath
+from typing import Callable, Dict, List, Optional, Tuple
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+SELECTOR_KEYS = {
+    "xpath": By.XPATH,
+    "css": By.CSS_SELECTOR,
+    "class": By.CLASS_NAME,
+    "tag": By.TAG_NAME,
+    "id": By.ID,
+    "name": By.NAME,
+}
+
+_SIMPLE_NAME = re.compile(r"^[A-Za-z_][\w-]*$")
+_UNION_XPATH = re.compile(r"^(\.?//)([A-Za-z][\w-]*|\*)\[(.+)\]$")
+_CONDITIONS = [
+    (re.compile(r"""^contains\(@([\w-]+),\s*["']([^"'\\]*)["']\)$"""), '[{0}*="{1}"]'),
+    (re.compile(r"""^@([\w-]+)\s*=\s*["']([^"'\\]*)["']$"""), '[{0}="{1}"]'),
+]
+
+# arguments[0] = attribute marking items to skip (optional), arguments[1] = max records
+_EXTRACTOR_TEMPLATE = r"""
+var plan = %s, mark = arguments[0], limit = arguments[1];
+var stats = [];
+function compile(kind, selector, many) {
+  if (kind === 'css') {
+    return many
+      ? function (ctx) { return Array.prototype.slice.call(ctx.querySelectorAll(selector)); }
+      : function (ctx) { var n = ctx.querySelector(selector); return n ? [n] : []; };
+  }
+  var expr = document.createExpression(selector, null);
+  if (!many) {
+    return function (ctx) {
+      var n = expr.evaluate(ctx, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+      return n ? [n] : [];
+    };
+  }
+  return function (ctx) {
+    var r = expr.evaluate(ctx, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null), out = [];
+    for (var i = 0; i < r.snapshotLength; i++) out.push(r.snapshotItem(i));
+    return out;
+  };
+}
+function read(node, attribute) {
+  if (!attribute) {
+    var text = node.innerText !== undefined ? node.innerText : node.textContent;
+    return (text || '').trim();
+  }
+  var value = node[attribute];  // property first, like WebElement.get_attribute
+  if (typeof value === 'string') return value;
+  return node.getAttribute(attribute) || '';
+}
+function counted(index, selector, many) {
+  var find = compile(selector[0], selector[1], many), branches = selector[2];
+  var row = stats[index] = [0, 0, branches.map(function () { return 0; })];
+  return function (ctx) {
+    var found = find(ctx);
+    row[found.length ? 0 : 1]++;
+    for (var n = 0; n < found.length && branches.length; n++) {
+      for (var k = 0; k < branches.length; k++) {
+        if (found[n].matches(branches[k])) { row[2][k]++; break; }
+      }
+    }
+    return found;
+  };
+}
+var items = counted(0, plan.item, true)(document);
+var fields = plan.fields.map(function (f, i) {
+  return {name: f[0], find: counted(i + 1, f[1], f[3]), attribute: f[2], many: f[3]};
+});
+var records = [], taken = [];
+for (var i = 0; i < items.length; i++) {
+  if (limit && records.length >= limit) break;
+  var item = items[i];
+  if (mark && item.hasAttribute(mark)) continue;
+  taken.push(item);
+  var record = {};
+  for (var j = 0; j < fields.length; j++) {
+    var f = fields[j], values = f.find(item).map(function (n) { return read(n, f.attribute); });
+    record[f.name] = f.many ? values : (values.length ? values[0] : '');
+  }
+  records.push(record);
+}
+return {records: records, items: mark ? taken : [], stats: stats};
+"""
+
+# arguments[0] = attribute, arguments[1:] = elements to tag with it
+MARK_SCRIPT = r"""
+var mark = arguments[0];
+for (var i = 1; i < arguments.length; i++) arguments[i].setAttribute(mark, '1');
+"""
+
+
+def _locator(definition: Dict) -> Tuple[str, str]:
+    for key, by in SELECTOR_KEYS.items():
+        if key in definition:
+            return by, definition[key]
+    raise ValueError(f"No selector ({', '.join(SELECTOR_KEYS)}) in {definition}")
+
+
+def _enabled(definition: Dict, toggles: Optional[Dict[str, bool]]) -> bool:
+    if not definition.get("enabled", True):
+        return False
+    enabled_by = definition.get("enabled_by")
+    if toggles is None or not enabled_by:
+        return True
+    keys = [enabled_by] if isinstance(enabled_by, str) else enabled_by
+    return any(toggles.get(key, True) for key in keys)
+
+
+def load_schema(schema: Dict, toggles: Optional[Dict[str, bool]] = None) -> RecordSpec:
+    """Build a RecordSpec from a schema dict, dropping disabled fields."""
+    fields = {}
+    for name, definition in schema["fields"].items():
+        if not _enabled(definition, toggles):
+            logger.debug(f"Field '{name}' disabled")
+            continue
+        post = tuple(definition.get("post", ()))
+        unknown = [p for p in post if p not in POST_PROCESSORS]
+        if unknown:
+            raise ValueError(f"Unknown post-processing for '{name}': {', '.join(unknown)}")
+        by, value = _locator(definition)
+        fields[name] = Field(by, value, bool(definition.get("many", False)),
+                             definition.get("attribute"), post)
+    return RecordSpec(_locator(schema["item"]), fields)
+
+
+def union_alternatives(xpath: str) -> Optional[List[str]]:
+    """CSS selectors for each branch of a simple union XPath, or None.
+
+    Handles tag[cond or cond ...] where each cond is contains(@attr, "v")
+    or @attr="v"; contains() maps to CSS *= (same substring semantics).
+    """
+    match = _UNION_XPATH.match(xpath.strip())
+    if not match:
+        return None
+    tag = "" if match.group(2) == "*" else match.group(2)
+    alternatives = []
+    for condition in re.split(r"\s+or\s+", match.group(3)):
+        for pattern, css in _CONDITIONS:
+            cond = pattern.match(condition.strip())
+            if cond:
+                alternatives.append(tag + css.format(*cond.groups()))
+                break
+        else:
+            return None
+    return alternatives
+
+
+def _selector(by: str, value: str) -> Tuple[str, str, List[str]]:
+    """In-page (kind, selector, union branches) for a locator, CSS where one exists."""
+    if by == By.CSS_SELECTOR:
+        return "css", value, []
+    if by in (By.CLASS_NAME, By.TAG_NAME, By.ID) and _SIMPLE_NAME.match(value):
+        prefix = {By.CLASS_NAME: ".", By.TAG_NAME: "", By.ID: "#"}[by]
+        return "css", prefix + value, []
+    xpath = to_xpath(by, value)
+    branches = union_alternatives(xpath) if by == By.XPATH else None
+    if branches:
+        return "css", ", ".join(branches), branches if len(branches) > 1 else []
+    return "xpath", xpath, []
+
+
+class SelectorStats:
+    """Hit counts per selector of an extractor, and which union branch matched.
+
+    Keep one per scrape session; a branch whose count drops to zero is a
+    class name the site has stopped using.
+    """
+
+    def __init__(self, extractor: 'CompiledExtractor'):
+        self.labels = ["item"] + list(extractor.spec.fields)
+        self.selectors = extractor.selectors
+        self.hits = [0] * len(self.labels)
+        self.misses = [0] * len(self.labels)
+        self.branches = [[0] * len(selector[2]) for selector in self.selectors]
+
+    def update(self, stats: List[Optional[List]]):
+        for index, row in enumerate(stats[:len(self.labels)]):
+            if not row:
+                continue
+            self.hits[index] += row[0]
+            self.misses[index] += row[1]
+            for branch, count in enumerate(row[2][:len(self.branches[index])]):
+                self.branches[index][branch] += count
+
+    def report(self) -> Dict[str, Dict]:
+        """Selector, hit rate and union branch matches per label (misses include legitimately empty fields)."""
+        report = {}
+        for index, label in enumerate(self.labels):
+            lookups = self.hits[index] + self.misses[index]
+            report[label] = {
+                "selector": self.selectors[index][1],
+                "hits": self.hits[index],
+                "misses": self.misses[index],
+                "hit_rate": round(self.hits[index] / lookups, 3) if lookups else None,
+                "branches": dict(zip(self.selectors[index][2], self.branches[index])),
+            }
+        return report
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{label} {row['hit_rate']:.0%}" if row['hit_rate'] is not None else f"{label} -"
+            for label, row in self.report().items()
+        )
+
+
+class CompiledExtractor:
+    """A RecordSpec turned into one execute_script that returns every record.
+
+    Selectors are compiled once per call in the page and run through
+    querySelectorAll where a CSS form exists, and only enabled fields are
+    read, so a page costs one round trip however many items and fields it
+    has (plus one to tag the items read, with mark). Post-processing runs
+    in Python on the result.
+    """
+
+    def __init__(self, spec: RecordSpec):
+        self.spec = spec
+        self.selectors = [_selector(*spec.item)] + [
+            _selector(field.by, field.value) for field in spec.fields.values()
+        ]
+        plan = {
+            "item": self.selectors[0],
+            "fields": [
+                [name, selector, field.attribute, field.many]
+                for (name, field), selector in zip(spec.fields.items(), self.selectors[1:])
+            ],
+        }
+        self.script = _EXTRACTOR_TEMPLATE % json.dumps(plan)
+        self.stats = SelectorStats(self)
+
+    def _finish(self, result, stats: SelectorStats,
+                 accept: Optional[Callable[[Dict], bool]]) -> Tuple[List[Dict], List]:
+        """Records, and the items to tag: those whose record accept passes."""
+        result = result or {}
+        stats.update(result.get("stats") or [])
+        records = [finish_record(record, self.spec) for record in result.get("records") or []]
+        items = [item for item, record in zip(result.get("items") or [], records)
+                 if accept is None or accept(record)]
+        return records, items
+
+    def run(self, driver, mark: Optional[str] = None, limit: Optional[int] = None,
+            stats: Optional[SelectorStats] = None,
+            accept: Optional[Callable[[Dict], bool]] = None) -> List[Dict]:
+        """Extract records from the current page.
+
+        With mark, items carrying that attribute are skipped, and the ones
+        read are tagged if accept (default: any record) passes their record,
+        so repeated calls return only new items while a rejected item, such
+        as a placeholder still loading, is read again. stats defaults to the
+        extractor's own (shared by every caller).
+        """
+        records, items = self._finish(driver.execute_script(self.script, mark, limit),
+                                      stats or self.stats, accept)
+        if items:
+            driver.execute_script(MARK_SCRIPT, mark, *items)
+        return records
+
+    async def run_async(self, driver, mark: Optional[str] = None, limit: Optional[int] = None,
+                        stats: Optional[SelectorStats] = None,
+                        accept: Optional[Callable[[Dict], bool]] = None) -> List[Dict]:
+        """run() for an AsyncDriver."""
+        records, items = self._finish(await driver.execute_script(self.script, mark, limit),
+                                      stats or self.stats, accept)
+        if items:
+            await driver.execute_script(MARK_SCRIPT, mark, *items)
+        return records
+
+
+def compile_extractor(schema, toggles: Optional[Dict[str, bool]] = None) -> CompiledExtractor:
+    """Compile a schema dict (or a ready RecordSpec) into a CompiledExtractor."""
+    spec = schema if isinstance(schema, RecordSpec) else load_schema(schema, toggles)
+    return CompiledExtractor(spec)
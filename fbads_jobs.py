@@ -0,0 +1,446 @@
+"""
+Sharded Job Runner for the Facebook Ads Scraper
+Splits the search_terms x country_codes matrix from fb_ads_config.json into
+jobs on a shared queue and runs them in worker processes on one or more hosts
+
+Usage:
+    python fbads_jobs.py enqueue --queue sqlite:///jobs/fbads.db
+    python fbads_jobs.py work    --queue sqlite:///jobs/fbads.db --processes 4
+    python fbads_jobs.py status  --queue sqlite:///jobs/fbads.db
+
+For several hosts, point every host's workers at a queue on shared storage
+(e.g. dir:///mnt/shared/fbads-queue) or register a networked backend.
+"""
+from abc import ABC, abstractmethod
+from contextlib import closing, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path("fb_ads_config.json")
+DEFAULT_QUEUE = "sqlite:///jobs/fbads_jobs.db"
+LEASE_SECONDS = 3600  # A claimed job is handed out again if its worker goes silent this long
+LEASE_RENEW_EVERY = LEASE_SECONDS / 4  # Running workers renew their lease this often (seconds)
+MAX_ATTEMPTS = 3  # Give up on a job after this many failed attempts
+
+
+def load_job_matrix(config_path: Path = CONFIG_FILE) -> List[Dict]:
+    """Build one job per (search_term, country_code) pair listed in the config."""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    examples = config.get('examples', {})
+    search_terms = examples.get('search_terms') or [config['scraper_config'].get('search_term', '')]
+    country_codes = examples.get('country_codes') or [config['scraper_config'].get('country_code', '')]
+
+    return [
+        {'search_term': term, 'country_code': country}
+        for term, country in itertools.product(search_terms, country_codes)
+    ]
+
+
+def job_key(job: Dict) -> str:
+    return f"{job['search_term'] or '*'}|{job['country_code'] or '*'}"
+
+
+class JobQueue(ABC):
+    """Interface for queue backends shared by workers.
+
+    claim() must be atomic across processes (and hosts, for backends that
+    support them) so no two workers run the same job.
+    """
+
+    @abstractmethod
+    def put(self, jobs: List[Dict]) -> int:
+        """Add jobs; jobs already on the queue (same key) are skipped."""
+
+    @abstractmethod
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """Take the next pending (or lease-expired) job, or None when drained.
+
+        Lease-expired jobs that used up MAX_ATTEMPTS are marked failed instead.
+        """
+
+    @abstractmethod
+    def renew(self, job: Dict) -> bool:
+        """Extend a claimed job's lease; False if the lease was lost to another worker."""
+
+    @abstractmethod
+    def complete(self, job: Dict, result: Dict):
+        """Mark a claimed job done (skipped, with a warning, if its lease was lost)."""
+
+    @abstractmethod
+    def fail(self, job: Dict, error: str):
+        """Requeue a claimed job, or mark it failed after MAX_ATTEMPTS (skipped if its lease was lost)."""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Jobs per status."""
+
+
+class SQLiteJobQueue(JobQueue):
+    """Queue in a local SQLite file; safe across processes on one host."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_expires REAL,
+                    result TEXT,
+                    error TEXT,
+                    updated_at TEXT
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def put(self, jobs: List[Dict]) -> int:
+        with closing(self._connect()) as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (key, payload, updated_at) VALUES (?, ?, ?)",
+                [(job_key(job), json.dumps(job), datetime.now().isoformat()) for job in jobs]
+            )
+            return conn.total_changes - before
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock, making select+update atomic
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """UPDATE jobs SET status = 'failed', error = 'Lease expired on the last attempt',
+                   updated_at = ? WHERE status = 'running' AND lease_expires < ? AND attempts >= ?""",
+                (datetime.now().isoformat(), time.time(), MAX_ATTEMPTS)
+            )
+            row = conn.execute(
+                """SELECT key, payload, attempts FROM jobs
+                   WHERE (status = 'pending')
+                      OR (status = 'running' AND lease_expires < ? AND attempts < ?)
+                   ORDER BY attempts, key LIMIT 1""",
+                (time.time(), MAX_ATTEMPTS)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            key, payload, attempts = row
+            conn.execute(
+                """UPDATE jobs SET status = 'running', worker = ?, attempts = ?,
+                   lease_expires = ?, updated_at = ? WHERE key = ?""",
+                (worker_id, attempts + 1, time.time() + LEASE_SECONDS,
+                 datetime.now().isoformat(), key)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        job = json.loads(payload)
+        job['key'] = key
+        job['attempt'] = attempts + 1
+        job['worker'] = worker_id
+        return job
+
+    def _update_owned(self, job: Dict, assignments: str, values: tuple) -> bool:
+        """Update the job only while this worker's claim still holds it."""
+        with closing(self._connect()) as conn:
+            changed = conn.execute(
+                f"""UPDATE jobs SET {assignments}, updated_at = ?
+                    WHERE key = ? AND status = 'running' AND worker = ? AND attempts = ?""",
+                values + (datetime.now().isoformat(), job['key'], job['worker'], job['attempt'])
+            ).rowcount
+        if not changed:
+            logger.warning(f"Lost the lease on job {job['key']} (attempt {job['attempt']})")
+        return bool(changed)
+
+    def renew(self, job: Dict) -> bool:
+        return self._update_owned(job, "lease_expires = ?", (time.time() + LEASE_SECONDS,))
+
+    def complete(self, job: Dict, result: Dict):
+        self._update_owned(job, "status = 'done', result = ?", (json.dumps(result, default=str),))
+
+    def fail(self, job: Dict, error: str):
+        status = 'failed' if job.get('attempt', 1) >= MAX_ATTEMPTS else 'pending'
+        self._update_owned(job, "status = ?, error = ?", (status, error[:1000]))
+
+    def counts(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class DirectoryJobQueue(JobQueue):
+    """Queue as files in pending/running/done/failed folders.
+
+    Claiming is an atomic rename, so it also works on a shared filesystem
+    mounted by several hosts.
+    """
+
+    STATES = ('pending', 'running', 'done', 'failed')
+
+    def __init__(self, path: str):
+        self.root = Path(path)
+        for state in self.STATES:
+            (self.root / state).mkdir(parents=True, exist_ok=True)
+
+    def _filename(self, job: Dict) -> str:
+        safe = "".join(c if c.isalnum() else "_" for c in job_key(job))
+        return f"{safe}.json"
+
+    def _write(self, path: Path, data: Dict):
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def put(self, jobs: List[Dict]) -> int:
+        added = 0
+        for job in jobs:
+            name = self._filename(job)
+            if any((self.root / state / name).exists() for state in self.STATES):
+                continue
+            self._write(self.root / 'pending' / name, {**job, 'attempts': 0})
+            added += 1
+        return added
+
+    def _read(self, path: Path) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _requeue_expired(self):
+        """Requeue jobs whose lease (the running file's mtime) expired; fail them after MAX_ATTEMPTS."""
+        now = time.time()
+        for path in (self.root / 'running').glob('*.json'):
+            try:
+                if now - path.stat().st_mtime <= LEASE_SECONDS:
+                    continue
+                data = self._read(path) or {}
+                if data.get('attempts', 0) >= MAX_ATTEMPTS:
+                    target = self.root / 'failed' / path.name
+                    os.rename(path, target)
+                    self._write(target, {**data, 'error': 'Lease expired on the last attempt',
+                                         'updated_at': datetime.now().isoformat()})
+                else:
+                    os.rename(path, self.root / 'pending' / path.name)
+            except OSError:
+                pass  # Finished or requeued by another worker meanwhile
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        self._requeue_expired()
+        for path in sorted((self.root / 'pending').glob('*.json')):
+            target = self.root / 'running' / path.name
+            try:
+                os.rename(path, target)  # Only one worker wins the rename
+            except OSError:
+                continue
+            os.utime(target)  # Start the lease
+            job = self._read(target)
+            if job is None:
+                continue
+            job['attempts'] = job.get('attempts', 0) + 1
+            job['worker'] = worker_id
+            self._write(target, job)
+            job['key'] = path.name
+            job['attempt'] = job['attempts']
+            return job
+        return None
+
+    def _owned(self, job: Dict) -> bool:
+        """True while running/<key> is still this worker's claim (not requeued or reclaimed)."""
+        data = self._read(self.root / 'running' / job['key'])
+        owned = data is not None and data.get('worker') == job['worker'] \
+            and data.get('attempts') == job['attempts']
+        if not owned:
+            logger.warning(f"Lost the lease on job {job['key']} (attempt {job['attempt']})")
+        return owned
+
+    def renew(self, job: Dict) -> bool:
+        if not self._owned(job):
+            return False
+        try:
+            os.utime(self.root / 'running' / job['key'])
+        except OSError:
+            return False
+        return True
+
+    def _finish(self, job: Dict, state: str, **fields):
+        if not self._owned(job):
+            return
+        source = self.root / 'running' / job['key']
+        data = {k: v for k, v in job.items() if k not in ('key', 'attempt')}
+        data.update(fields, updated_at=datetime.now().isoformat())
+        self._write(source, data)
+        os.replace(source, self.root / state / job['key'])
+
+    def complete(self, job: Dict, result: Dict):
+        self._finish(job, 'done', result=result)
+
+    def fail(self, job: Dict, error: str):
+        state = 'failed' if job.get('attempt', 1) >= MAX_ATTEMPTS else 'pending'
+        self._finish(job, state, error=error[:1000])
+
+    def counts(self) -> Dict[str, int]:
+        return {state: len(list((self.root / state).glob('*.json'))) for state in self.STATES}
+
+
+# Queue backends by URL scheme; register networked backends (Redis, SQS, ...) here
+QUEUE_BACKENDS: Dict[str, Callable[[str], JobQueue]] = {
+    'sqlite': SQLiteJobQueue,
+    'dir': DirectoryJobQueue,
+}
+
+
+def queue_location(url: str) -> Tuple[str, str]:
+    """Split a queue URL into (scheme, path).
+
+    sqlite URLs follow SQLAlchemy: three slashes for a relative file, four
+    for an absolute one. dir URLs follow file://, so dir:///mnt/queue is the
+    absolute directory every host mounts and dir://queue is relative.
+
+    >>> queue_location("sqlite:///jobs/fbads.db")
+    ('sqlite', 'jobs/fbads.db')
+    >>> queue_location("sqlite:////var/jobs/fbads.db")
+    ('sqlite', '/var/jobs/fbads.db')
+    >>> queue_location("dir:///mnt/shared/fbads-queue")
+    ('dir', '/mnt/shared/fbads-queue')
+    >>> queue_location("dir://queue")
+    ('dir', 'queue')
+    """
+    scheme, sep, location = url.partition('://')
+    if not sep or scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown queue URL '{url}' (backends: {', '.join(QUEUE_BACKENDS)})")
+    if scheme == 'sqlite' and location.startswith('/'):
+        location = location[1:]
+    return scheme, location
+
+
+def open_queue(url: str) -> JobQueue:
+    """Open a queue from a URL such as sqlite:///jobs/fbads.db or dir:///mnt/queue (see queue_location)."""
+    scheme, location = queue_location(url)
+    return QUEUE_BACKENDS[scheme](location)
+
+
+@contextmanager
+def keep_lease(queue: JobQueue, job: Dict, interval: float = LEASE_RENEW_EVERY):
+    """Renew the job's lease every interval seconds while the block runs."""
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(interval):
+            if not queue.renew(job):
+                return  # Another worker has the job now; its result will win
+
+    thread = threading.Thread(target=renew, name=f"lease-{job['key']}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def worker_loop(queue_url: str, worker_id: str) -> int:
+    """Claim and run jobs until the queue is drained. Returns jobs completed."""
+    # Imported here so each worker process gets its own browsers, pools and stats
+    import fbads_scrapy
+
+    queue = open_queue(queue_url)
+    completed = 0
+
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            logger.info(f"[{worker_id}] Queue drained after {completed} jobs")
+            return completed
+
+        logger.info(f"[{worker_id}] Running job {job['key']} (attempt {job['attempt']})")
+        try:
+            with keep_lease(queue, job):
+                summary = fbads_scrapy.main(job['search_term'], job['country_code'])
+            if summary is None:
+                queue.fail(job, "No working proxies")
+            else:
+                queue.complete(job, summary)
+                completed += 1
+        except Exception as e:
+            logger.error(f"[{worker_id}] Job {job['key']} failed: {e}")
+            queue.fail(job, str(e))
+
+
+def _worker_process(queue_url: str, worker_id: str):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        worker_loop(queue_url, worker_id)
+    except KeyboardInterrupt:
+        pass
+
+
+def run_workers(queue_url: str, processes: int):
+    """Run worker processes on this host until the queue is drained."""
+    host = socket.gethostname()
+    workers = [
+        multiprocessing.Process(
+            target=_worker_process,
+            args=(queue_url, f"{host}-{os.getpid()}-{n}"),
+            name=f"fbads-worker-{n}"
+        )
+        for n in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Sharded Facebook Ads scrape runner")
+    parser.add_argument('command', choices=['enqueue', 'work', 'status'])
+    parser.add_argument('--queue', default=DEFAULT_QUEUE, help="Queue URL (sqlite:///relative.db, sqlite:////abs.db or dir:///abs/dir)")
+    parser.add_argument('--config', default=str(CONFIG_FILE), help="Config with examples.search_terms/country_codes")
+    parser.add_argument('--processes', type=int, default=max(1, multiprocessing.cpu_count() // 2),
+                        help="Worker processes on this host")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'enqueue':
+        jobs = load_job_matrix(Path(args.config))
+        added = open_queue(args.queue).put(jobs)
+        logger.info(f"Enqueued {added} new jobs ({len(jobs)} in matrix)")
+    elif args.command == 'work':
+        run_workers(args.queue, args.processes)
+        logger.info(f"Queue status: {open_queue(args.queue).counts()}")
+    else:
+        print(json.dumps(open_queue(args.queue).counts(), indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
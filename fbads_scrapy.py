@@ -1,12 +1,22 @@
 import concurrent.futures
 import asyncio
 from selenium import webdriver
-from selenium_stealth import stealth
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
+from driver_factory import build_chrome_options, create_driver, release, apply_fetch_profile, FetchStats, first_get_span, startup_timings
+from browser_contexts import BrowserContextHost
+from driver_recycling import RecyclingSession, RecyclePolicy
+from async_driver import AsyncDriver, AsyncElement, gather_bounded
+from dom_waits import presence_of_all_elements_located
+from adaptive_waits import AdaptiveWait
+from network_idle import NetworkTracker
+from page_probe import PageProbe
+from sleep_audit import current_auditor
+from trace_timeline import tracer
+from extraction_schema import MARK_SCRIPT, CompiledExtractor, SelectorStats, compile_extractor
+from html_parsing import async_read_fields, read_fields, to_xpath
+from record_dedup import Deduplicator
+from seen_index import SeenIndex
+from selenium.common.exceptions import TimeoutException
 import requests
 import random
 import time
@@ -15,8 +25,9 @@ import csv
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import sys
+import functools
 
 # Configuration
 MAX_WORKERS = 5  # Number of parallel browsers
@@ -25,6 +36,22 @@ SEARCH_TERM = ""  # Leave empty to scrape all recent ads
 COUNTRY_CODE = ""  # Leave empty to search all countries
 HEADLESS_MODE = True  # Set to False for debugging
 SCROLL_ATTEMPTS = 10  # How many times to scroll for more ads
+CONTEXT_MODE = False  # Run workers as isolated browser contexts inside one Chrome
+CONTEXTS_PER_BROWSER = 5  # Max concurrent contexts in the shared browser
+MAX_BROWSER_RSS_MB = 1500  # Restart a browser whose process tree exceeds this
+MAX_JS_HEAP_MB = 512  # Restart when the page's JS heap exceeds this
+FETCH_PROFILE = "scrape"  # driver_factory.FETCH_PROFILES entry ("full" disables blocking)
+NETWORK_QUIET_WINDOW = 1.0  # Seconds without feed requests before the page counts as loaded
+PAGE_SETTLE_TIMEOUT = 15  # Max seconds to wait for the network to go idle after navigation
+PROFILE_SLOT = "fbads"  # Persistent profile_slots namespace (warm disk cache); None = temp profile
+TRACE_TIMELINE = True  # Write a chrome://tracing / Perfetto timeline (trace_*.json) per run
+BULK_EXTRACTION = True  # One execute_script per scroll for all cards (False = find_element per field)
+DEDUP_FIELDS = ("advertiser", "text", "media")  # Fingerprinted (normalized) to spot duplicate ads
+DEDUP_MODE = "exact"  # "bloom" keeps memory flat for millions of ads (record_dedup)
+DEDUP_CAPACITY = 5_000_000  # Ads the Bloom filter is sized for
+DEDUP_ERROR_RATE = 0.001  # Bloom false-positive rate (new ads dropped as duplicates)
+SEEN_INDEX = True  # Skip ads saved by earlier runs (seen_index SQLite file, SEEN_INDEX_PATH)
+CONFIG_FILE = Path("fb_ads_config.json")  # data_to_scrape toggles, optional extraction_schema
 LOG_DIR = Path("logs")
 OUTPUT_DIR = Path("output")
 
@@ -53,6 +80,48 @@ USER_AGENTS = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
 ]
 
+# Ad card schema (extraction_schema format). Union XPaths cover the old and new
+# class names; enabled_by names the data_to_scrape toggles in fb_ads_config.json,
+# whose optional "extraction_schema" section replaces this default.
+AD_SCHEMA = {
+    "item": {"xpath": '//div[contains(@class, "_7jyr") or contains(@class, "x1yc453h") or contains(@data-testid, "ad-card")]'},
+    "fields": {
+        "advertiser": {"xpath": './/div[contains(@class, "_7jwu") or contains(@class, "x1lliihq")]',
+                       "enabled_by": "advertiser_name"},
+        "text": {"xpath": './/div[contains(@class, "_7jyu") or contains(@class, "x1iorvi4")]',
+                 "enabled_by": "ad_text_content"},
+        "media": {"tag": "img", "attribute": "src", "many": True, "post": ["http_only"],
+                  "enabled_by": ["media_urls", "media_count"]},
+        "cta_text": {"xpath": './/div[contains(@class, "_7jyr") or contains(@role, "button")]',
+                     "enabled_by": "call_to_action"},
+        "sponsor_info": {"xpath": './/div[contains(@class, "_7jys")]',
+                         "enabled_by": "sponsor_information"},
+    },
+}
+# Interstitial checks (Cloudflare, security check, 403/429/503) run in-page each scroll
+PAGE_PROBE = PageProbe()
+
+# Cards the feed wait watches for (the old and new card class names)
+AD_CARD_LOCATOR = (By.XPATH, '//div[contains(@class, "_7jyr") or contains(@class, "x1yc453h")]')
+
+# Cards already extracted are tagged in the page, so each scroll only reads the new ones
+SEEN_ATTRIBUTE = 'data-fbads-seen'
+
+def load_extraction(config_path: Path = CONFIG_FILE) -> Tuple[CompiledExtractor, Dict[str, bool]]:
+    """Compile the ad schema with the config's data_to_scrape toggles (all on without a config)."""
+    config = {}
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    toggles = config.get('data_to_scrape', {})
+    return compile_extractor(config.get('extraction_schema', AD_SCHEMA), toggles), toggles
+
+AD_EXTRACTOR, DATA_TO_SCRAPE = load_extraction()
+
+def new_card_xpath() -> str:
+    """XPath for ad cards not tagged with SEEN_ATTRIBUTE yet."""
+    return f"{to_xpath(*AD_EXTRACTOR.spec.item)}[not(@{SEEN_ATTRIBUTE})]"
+
 # Statistics tracker
 class ScraperStats:
     def __init__(self):
@@ -62,6 +131,9 @@ class ScraperStats:
         self.cloudflare_blocks = 0
         self.start_time = time.time()
         self.proxy_results = {}
+        self.requests_blocked = 0
+        self.bytes_transferred = 0
+        self.bytes_saved = 0
     
     def add_result(self, proxy: str, ads_count: int, status: str):
         self.proxy_results[proxy] = {'ads': ads_count, 'status': status}
@@ -74,6 +146,11 @@ class ScraperStats:
         else:
             self.failed_proxies += 1
     
+    def add_fetch_stats(self, fetch_summary: Dict):
+        self.requests_blocked += fetch_summary['requests_blocked']
+        self.bytes_transferred += fetch_summary['bytes_transferred']
+        self.bytes_saved += fetch_summary['estimated_bytes_saved']
+    
     def get_summary(self) -> str:
         duration = time.time() - self.start_time
         return f"""
@@ -84,11 +161,15 @@ class ScraperStats:
 ║ Successful Proxies:  {self.successful_proxies:>35} ║
 ║ Failed Proxies:      {self.failed_proxies:>35} ║
 ║ Cloudflare Blocks:   {self.cloudflare_blocks:>35} ║
+║ Requests Blocked:    {self.requests_blocked:>35} ║
+║ MB Transferred:      {self.bytes_transferred / 1048576:>35.1f} ║
+║ MB Saved (est.):     {self.bytes_saved / 1048576:>35.1f} ║
 ║ Duration:            {duration:>32.2f}s ║
 ╚═══════════════════════════════════════════════════════════╝
 """
 
 stats = ScraperStats()
+seen_index: Optional[SeenIndex] = None  # Opened per run by main() when SEEN_INDEX is set
 
 
 def get_proxies() -> List[str]:
@@ -130,75 +211,258 @@ def test_proxy(proxy: str) -> bool:
 
 
 
-def init_driver(proxy: str) -> webdriver.Chrome:
+def init_driver(proxy: str, fetch_profile: str = FETCH_PROFILE) -> webdriver.Chrome:
     """Initialize Chrome driver with stealth settings."""
-    chrome_options = Options()
+    arguments = [f'user-agent={random.choice(USER_AGENTS)}', "--disable-web-security"]
+    if proxy:
+        arguments.append(f'--proxy-server=http://{proxy}')
+
+    chrome_options = build_chrome_options(
+        "throughput" if HEADLESS_MODE else "headed", arguments, fetch_profile=fetch_profile
+    )
     
-    # Headless configuration
-    if HEADLESS_MODE:
-        chrome_options.add_argument("--headless=new")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--disable-gpu")
+    try:
+        driver = create_driver(
+            chrome_options, use_driver_manager=False, fetch_profile=fetch_profile,
+            label=proxy or "context-host", profile_slot=PROFILE_SLOT
+        )
+        logger.debug(f"Driver initialized with proxy: {proxy}")
+        return driver
+    except Exception as e:
+        logger.error(f"Failed to initialize driver: {e}")
+        raise
+
+
+
+context_host = BrowserContextHost(lambda: init_driver(""), max_contexts=CONTEXTS_PER_BROWSER)
+
+def acquire_driver(proxy: str, fetch_profile: str = FETCH_PROFILE) -> webdriver.Chrome:
+    """Get a driver for one scrape job (its own browser or a shared-browser context).
+    
+    Chrome takes --proxy-server at launch, so a browser can't be reused for
+    another proxy and each proxy is scraped once per run: outside
+    CONTEXT_MODE every job launches its own browser, and release() quits it.
+    """
+    if CONTEXT_MODE:
+        driver = context_host.new_context(proxy=proxy, user_agent=random.choice(USER_AGENTS))
+        if fetch_profile:
+            apply_fetch_profile(driver, fetch_profile)
+        return driver
+    return init_driver(proxy, fetch_profile)
+
+
+
+def extract_ad_data(ad_element, proxy: str) -> Optional[Dict]:
+    """Extract data from a single ad element (find_elements per enabled field)."""
+    try:
+        return ad_record(read_fields(ad_element, AD_EXTRACTOR.spec), proxy)
+    except Exception as e:
+        logger.debug(f"Failed to extract ad data: {e}")
+        return None
+
+def ad_record(fields: Dict, proxy: str) -> Optional[Dict]:
+    """Add scrape metadata to extracted fields; None without advertiser or text."""
+    ad_data = dict(fields)
+    if DATA_TO_SCRAPE.get('scrape_timestamp', True):
+        ad_data['date_scraped'] = datetime.now().isoformat()
+    if DATA_TO_SCRAPE.get('proxy_used', True):
+        ad_data['proxy'] = proxy
+    if DATA_TO_SCRAPE.get('scrape_timestamp', True):
+        ad_data['timestamp'] = int(time.time())
+    
+    # Only keep ads with meaningful data
+    return ad_data if has_content(fields) else None
+
+def has_content(fields: Dict) -> bool:
+    """True if a card has an advertiser or text (any field if neither is extracted)."""
+    required = [name for name in ('advertiser', 'text') if name in fields] or list(fields)
+    return any(fields.get(name) for name in required)
+
+def extract_ads_bulk(driver, proxy: str, selector_stats: Optional[SelectorStats] = None) -> List[Dict]:
+    """Extract every not-yet-seen ad card with a single execute_script call.
     
-    # Proxy settings
-    if proxy:
-        chrome_options.add_argument(f'--proxy-server=http://{proxy}')
+    Cards that yield an ad are tagged seen; empty ones (still hydrating) are read again next scroll.
     
-    # Random User-Agent
-    user_agent = random.choice(USER_AGENTS)
-    chrome_options.add_argument(f'user-agent={user_agent}')
+    selector_stats collects the session's selector hit counts (see extraction_schema).
+    """
+    records = AD_EXTRACTOR.run(driver, mark=SEEN_ATTRIBUTE, stats=selector_stats,
+                               accept=has_content)
+    return [ad for ad in (ad_record(fields, proxy) for fields in records) if ad]
+
+def dedup_fields() -> List[str]:
+    """DEDUP_FIELDS that are extracted, or every extracted field if none of them are."""
+    fields = [name for name in DEDUP_FIELDS if name in AD_EXTRACTOR.spec.fields]
+    return fields or list(AD_EXTRACTOR.spec.fields)
+
+def new_dedup(mode: str = "exact") -> Deduplicator:
+    """Ad deduplicator over dedup_fields(); per-session ones stay exact (at most MAX_ADS_PER_PROXY)."""
+    return Deduplicator(dedup_fields(), mode, DEDUP_CAPACITY, DEDUP_ERROR_RATE)
+
+def add_page_ads(ads_data: List[Dict], seen_ads: Deduplicator, page_ads: List[Optional[Dict]], proxy: str) -> int:
+    """Append a scroll's ads up to MAX_ADS_PER_PROXY, skipping empty ones, duplicates
+    (same fingerprint, see record_dedup) and, with SEEN_INDEX, ads saved by earlier runs.
+    
+    Returns how many ads were new to this session, index hits included, so
+    a re-scrape of a feed earlier runs already saved keeps scrolling.
+    """
+    fresh = []
+    for ad_data in page_ads:
+        if ad_data:
+            fingerprint = seen_ads.fingerprint(ad_data)
+            if seen_ads.add_fingerprint(fingerprint):
+                fresh.append((fingerprint, ad_data))
+    session_new = len(fresh)
+    if seen_index is not None and fresh:
+        # One index lookup per scroll; known ads only get their last_seen bumped
+        known = seen_index.known([fingerprint for fingerprint, _ in fresh])
+        if known:
+            logger.info(f"[{proxy}] Skipping {len(known)} ads saved by earlier runs")
+            fresh = [(fingerprint, ad_data) for fingerprint, ad_data in fresh if fingerprint not in known]
+    for _, ad_data in fresh[:max(0, MAX_ADS_PER_PROXY - len(ads_data))]:
+        ads_data.append(ad_data)
+        logger.debug(f"[{proxy}] Extracted ad from: {ad_data.get('advertiser', 'Unknown')}")
+    return session_new
+
+
+
+def open_session(proxy: str, fetch_profile: str = FETCH_PROFILE) -> RecyclingSession:
+    """Acquire a driver for one scrape job, wrapped in the memory recycling policy."""
+    return RecyclingSession(
+        lambda: acquire_driver(proxy, fetch_profile),
+        RecyclePolicy(
+            # Context mode shares one browser, so only the per-page heap applies
+            max_rss_mb=None if CONTEXT_MODE else MAX_BROWSER_RSS_MB,
+            max_js_heap_mb=MAX_JS_HEAP_MB,
+            max_navigations=None,
+            sample_every=2
+        ),
+        closer=lambda d: release(d, discard=True),
+        name=proxy
+    )
+
+def build_search_url(proxy: str) -> str:
+    """Build the Ad Library search URL for the configured term and country."""
+    base_url = "https://www.facebook.com/ads/library/"
+    params = []
     
-    # Stealth settings
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if SEARCH_TERM:
+        params.append(f"q={SEARCH_TERM}")
+        logger.info(f"[{proxy}] Searching for: {SEARCH_TERM}")
     
-    # Performance settings
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-setuid-sandbox")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-logging")
-    chrome_options.add_argument("--log-level=3")
+    if COUNTRY_CODE:
+        params.append(f"country={COUNTRY_CODE}")
+        logger.info(f"[{proxy}] Country filter: {COUNTRY_CODE}")
     
-    # Memory optimization
-    chrome_options.add_argument("--disable-software-rasterizer")
-    chrome_options.add_argument("--disable-web-security")
+    params.append("active_status=active")
+    params.append("ad_type=all")
     
+    return base_url + "?" + "&".join(params) if params else base_url
+
+
+
+def uses_network_idle(fetch_profile: str) -> bool:
+    """Network idle needs the performance log, which contexts share with each other."""
+    return bool(fetch_profile) and not CONTEXT_MODE
+
+def settle_page(driver, proxy: str, network: NetworkTracker, fetch_stats: FetchStats):
+    """Wait for the feed's XHR/fetch traffic to go quiet after navigation."""
     try:
-        driver = webdriver.Chrome(options=chrome_options)
-        
-        # Apply stealth
-        stealth(driver,
-                languages=["en-US", "en"],
-                vendor="Google Inc.",
-                platform="Win32",
-                webgl_vendor="Intel Inc.",
-                renderer="Intel Iris OpenGL Engine",
-                fix_hairline=True)
+        waited = network.wait_for_idle(
+            driver, quiet_window=NETWORK_QUIET_WINDOW, timeout=PAGE_SETTLE_TIMEOUT,
+            sink=fetch_stats.add_entries
+        )
+        logger.info(f"[{proxy}] Network idle after {waited:.1f}s ({network.requests_seen} requests)")
+    except TimeoutException as e:
+        logger.info(f"[{proxy}] {e.msg}, continuing")
+
+async def async_settle_page(driver: AsyncDriver, proxy: str, network: NetworkTracker,
+                            fetch_stats: FetchStats):
+    """Async version of settle_page."""
+    try:
+        waited = await network.async_wait_for_idle(
+            driver, quiet_window=NETWORK_QUIET_WINDOW, timeout=PAGE_SETTLE_TIMEOUT,
+            sink=fetch_stats.add_entries
+        )
+        logger.info(f"[{proxy}] Network idle after {waited:.1f}s ({network.requests_seen} requests)")
+    except TimeoutException as e:
+        logger.info(f"[{proxy}] {e.msg}, continuing")
+
+
+
+def save_to_json(ads: List[Dict], filename: str):
+    """Save ads data to JSON file."""
+    filepath = OUTPUT_DIR / filename
+    with tracer.span("save_json", "io", path=str(filepath), rows=len(ads)), \
+            open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(ads, f, ensure_ascii=False, indent=2)
+    logger.info(f"JSON saved: {filepath}")
+    return filepath
+
+def save_to_csv(ads: List[Dict], filename: str):
+    """Save ads data to CSV file."""
+    if not ads:
+        logger.warning("No ads to save to CSV")
+        return None
+    
+    filepath = OUTPUT_DIR / filename
+    
+    # Define CSV columns
+    fieldnames = [
+        'advertiser', 'text', 'cta_text', 'sponsor_info', 
+        'media_count', 'media_urls', 'date_scraped', 'proxy', 'timestamp'
+    ]
+    
+    with tracer.span("save_csv", "io", path=str(filepath), rows=len(ads)), \
+            open(filepath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
         
-        logger.debug(f"Driver initialized with proxy: {proxy}")
-        return driver
-    except Exception as e:
-        logger.error(f"Failed to initialize driver: {e}")
-        raise
+        for ad in ads:
+            row = {
+                'advertiser': ad.get('advertiser', ''),
+                'text': ad.get('text', '').replace('\n', ' '),
+                'cta_text': ad.get('cta_text', ''),
+                'sponsor_info': ad.get('sponsor_info', ''),
+                'media_count': len(ad.get('media', [])),
+                'media_urls': ' | '.join(ad.get('media', [])),
+                'date_scraped': ad.get('date_scraped', ''),
+                'proxy': ad.get('proxy', ''),
+                'timestamp': ad.get('timestamp', '')
+            }
+            writer.writerow(row)
+    
+    logger.info(f"CSV saved: {filepath}")
+    return filepath
 
+async def async_extract_ad_data(ad_element: AsyncElement, proxy: str) -> Optional[Dict]:
+    """Async version of extract_ad_data()."""
+    try:
+        return ad_record(await async_read_fields(ad_element, AD_EXTRACTOR.spec), proxy)
+    except Exception as e:
+        logger.debug(f"Failed to extract ad data: {e}")
+        return None
 
+async def async_extract_ads_bulk(driver: AsyncDriver, proxy: str,
+                                 selector_stats: Optional[SelectorStats] = None) -> List[Dict]:
+    """Async version of extract_ads_bulk()."""
+    records = await AD_EXTRACTOR.run_async(driver, mark=SEEN_ATTRIBUTE, stats=selector_stats,
+                                           accept=has_content)
+    return [ad for ad in (ad_record(fields, proxy) for fields in records) if ad]
 
-def human_interaction(driver: webdriver.Chrome):
-    """Simulate human-like browsing behavior."""
-    time.sleep(random.uniform(1.5, 3.5))
+async def human_interaction(page):
+    """Simulate human-like browsing behavior (page is a SyncPage or AsyncPage)."""
+    await page.sleep(random.uniform(1.5, 3.5))
     
     # Random scroll
-    scroll_height = driver.execute_script("return document.body.scrollHeight")
+    scroll_height = await page.execute_script("return document.body.scrollHeight")
     scroll_positions = [random.randint(200, min(1000, scroll_height)) for _ in range(3)]
     
     for pos in scroll_positions:
-        driver.execute_script(f"window.scrollTo({{top: {pos}, behavior: 'smooth'}})")
-        time.sleep(random.uniform(0.5, 1.2))
+        await page.execute_script(f"window.scrollTo({{top: {pos}, behavior: 'smooth'}})")
+        await page.sleep(random.uniform(0.5, 1.2))
     
     # Random mouse movements (via JavaScript)
-    driver.execute_script("""
+    await page.execute_script("""
         var event = new MouseEvent('mousemove', {
             'view': window,
             'bubbles': true,
@@ -209,153 +473,218 @@ def human_interaction(driver: webdriver.Chrome):
         document.dispatchEvent(event);
     """)
     
-    time.sleep(random.uniform(0.8, 2.0))
+    await page.sleep(random.uniform(0.8, 2.0))
 
-def extract_ad_data(ad_element, proxy: str) -> Optional[Dict]:
-    """Extract data from a single ad element."""
-    try:
-        ad_data = {
-            'advertiser': '',
-            'text': '',
-            'media': [],
-            'cta_text': '',
-            'sponsor_info': '',
-            'date_scraped': datetime.now().isoformat(),
-            'proxy': proxy,
-            'timestamp': int(time.time())
-        }
-        
-        # Advertiser name
-        try:
-            ad_data['advertiser'] = ad_element.find_element(
-                By.XPATH, './/div[contains(@class, "_7jwu") or contains(@class, "x1lliihq")]'
-            ).text
-        except:
-            pass
-        
-        # Ad text content
-        try:
-            ad_data['text'] = ad_element.find_element(
-                By.XPATH, './/div[contains(@class, "_7jyu") or contains(@class, "x1iorvi4")]'
-            ).text
-        except:
-            pass
-        
-        # Media (images/videos)
-        try:
-            media_elements = ad_element.find_elements(By.TAG_NAME, 'img')
-            ad_data['media'] = [
-                img.get_attribute('src') for img in media_elements 
-                if img.get_attribute('src') and 'http' in img.get_attribute('src')
-            ]
-        except:
-            pass
-        
-        # Call to action
-        try:
-            ad_data['cta_text'] = ad_element.find_element(
-                By.XPATH, './/div[contains(@class, "_7jyr") or contains(@role, "button")]'
-            ).text
-        except:
-            pass
-        
-        # Sponsor information
+class SyncPage:
+    """Page operations of one scrape session on a blocking driver (own browser or context).
+    
+    The methods are coroutines only so scrape_session() can drive either
+    page type; they block, on the private event loop of scrape_with_proxy().
+    """
+    
+    def __init__(self, proxy: str, fetch_profile: str = FETCH_PROFILE):
+        self.proxy = proxy
+        self.fetch_profile = fetch_profile
+        self.session: Optional[RecyclingSession] = None
+    
+    async def open(self):
+        self.session = open_session(self.proxy, self.fetch_profile)
+    
+    async def navigate(self, url: str):
+        self.session.get(url)
+    
+    async def execute_script(self, script: str, *args):
+        return self.session.execute_script(script, *args)
+    
+    async def sleep(self, seconds: float):
+        time.sleep(seconds)
+    
+    async def settle(self, network: NetworkTracker, fetch_stats: FetchStats):
+        settle_page(self.session, self.proxy, network, fetch_stats)
+    
+    async def probe(self, network: NetworkTracker):
+        return PAGE_PROBE.check(self.session, network)
+    
+    async def wait_for_cards(self, name: str, url: str):
+        AdaptiveWait(self.session, name, default_timeout=15, url=url).until(
+            presence_of_all_elements_located(AD_CARD_LOCATOR)
+        )
+    
+    async def extract_bulk(self, selector_stats: SelectorStats) -> List[Dict]:
+        return extract_ads_bulk(self.session, self.proxy, selector_stats)
+    
+    async def new_cards(self) -> List:
+        return self.session.find_elements(By.XPATH, new_card_xpath())
+    
+    async def extract_card(self, card) -> Optional[Dict]:
+        return extract_ad_data(card, self.proxy)
+    
+    async def mark_seen(self, cards: List):
+        self.session.execute_script(MARK_SCRIPT, SEEN_ATTRIBUTE, *cards)
+    
+    async def add_page_ads(self, ads_data: List[Dict], seen_ads: Deduplicator, page_ads: List[Optional[Dict]]) -> int:
+        return add_page_ads(ads_data, seen_ads, page_ads, self.proxy)
+    
+    async def drain_log(self, fetch_stats: FetchStats):
+        fetch_stats.update(self.session)
+    
+    async def check(self):
+        self.session.check()
+    
+    async def save_screenshot(self, path: str):
+        self.session.save_screenshot(path)
+    
+    async def close(self, fetch_stats: FetchStats):
+        if self.session:
+            fetch_stats.update(self.session)
+            stats.add_fetch_stats(fetch_stats.summary())
+            release(self.session.driver)
+            logger.debug(f"[{self.proxy}] Driver released")
+
+class AsyncPage:
+    """Page operations of one scrape session on the event loop.
+    
+    Chrome launch, the occasional recycle check and release run in a thread;
+    every page command is a non-blocking AsyncDriver call, so one loop can
+    drive many browsers.
+    """
+    
+    def __init__(self, proxy: str, fetch_profile: str = FETCH_PROFILE):
+        self.proxy = proxy
+        self.fetch_profile = fetch_profile
+        self.session: Optional[RecyclingSession] = None
+        self.driver: Optional[AsyncDriver] = None
+    
+    async def open(self):
+        self.session = await asyncio.to_thread(open_session, self.proxy, self.fetch_profile)
+        self.driver = AsyncDriver(self.session)
+    
+    async def navigate(self, url: str):
+        # AsyncDriver bypasses the driver.get() hook that times first_get
+        with first_get_span(self.session.driver):
+            await self.driver.navigate(url)
+    
+    async def execute_script(self, script: str, *args):
+        return await self.driver.execute_script(script, *args)
+    
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+    
+    async def settle(self, network: NetworkTracker, fetch_stats: FetchStats):
+        await async_settle_page(self.driver, self.proxy, network, fetch_stats)
+    
+    async def probe(self, network: NetworkTracker):
+        return await PAGE_PROBE.check_async(self.driver, network)
+    
+    async def wait_for_cards(self, name: str, url: str):
+        await AdaptiveWait(self.driver, name, default_timeout=15, url=url).until_async(
+            presence_of_all_elements_located(AD_CARD_LOCATOR)
+        )
+    
+    async def extract_bulk(self, selector_stats: SelectorStats) -> List[Dict]:
+        return await async_extract_ads_bulk(self.driver, self.proxy, selector_stats)
+    
+    async def new_cards(self) -> List[AsyncElement]:
+        return await self.driver.find_elements(By.XPATH, new_card_xpath())
+    
+    async def extract_card(self, card: AsyncElement) -> Optional[Dict]:
+        return await async_extract_ad_data(card, self.proxy)
+    
+    async def mark_seen(self, cards: List[AsyncElement]):
+        await self.driver.execute_script(MARK_SCRIPT, SEEN_ATTRIBUTE, *cards)
+    
+    async def add_page_ads(self, ads_data: List[Dict], seen_ads: Deduplicator, page_ads: List[Optional[Dict]]) -> int:
+        # The index lookup is blocking SQLite, so it runs off the event loop
+        return await asyncio.to_thread(add_page_ads, ads_data, seen_ads, page_ads, self.proxy)
+    
+    async def drain_log(self, fetch_stats: FetchStats):
+        fetch_stats.add_entries(await self.driver.get_log('performance'))
+    
+    async def check(self):
+        await asyncio.to_thread(self.session.check)
+    
+    async def save_screenshot(self, path: str):
+        await self.driver.save_screenshot(path)
+    
+    async def close(self, fetch_stats: FetchStats):
         try:
-            ad_data['sponsor_info'] = ad_element.find_element(
-                By.XPATH, './/div[contains(@class, "_7jys")]'
-            ).text
-        except:
+            if self.driver:
+                # Same final drain as SyncPage.close, so the last page is counted
+                await self.drain_log(fetch_stats)
+        except Exception:
             pass
-        
-        # Only return if we got meaningful data
-        if ad_data['advertiser'] or ad_data['text']:
-            return ad_data
-        return None
-        
-    except Exception as e:
-        logger.debug(f"Failed to extract ad data: {e}")
-        return None
-
+        finally:
+            if self.driver:
+                await self.driver.aclose()
+            if self.session:
+                stats.add_fetch_stats(fetch_stats.summary())
+                # Shielded so a second cancellation can't leak the browser
+                await asyncio.shield(asyncio.to_thread(release, self.session.driver))
+                logger.debug(f"[{self.proxy}] Driver released")
 
-
-def scrape_with_proxy(proxy: str) -> List[Dict]:
-    """Scrape Facebook ads using a single proxy."""
-    driver = None
+async def scrape_session(page) -> List[Dict]:
+    """Scrape Facebook ads through one proxy; page is a SyncPage or AsyncPage.
+    
+    The one copy of the scrape loop: everything that touches the browser
+    goes through page, so the blocking and asyncio paths can't drift apart.
+    """
+    proxy = page.proxy
     ads_data = []
+    fetch_stats = FetchStats()
+    network = NetworkTracker()
+    selector_stats = SelectorStats(AD_EXTRACTOR)  # Selector hit counts for this session
     
     try:
         logger.info(f"[{proxy}] Starting scrape session")
-        driver = init_driver(proxy)
-        
-        # Build URL
-        base_url = "https://www.facebook.com/ads/library/"
-        params = []
+        await page.open()
+        url = build_search_url(proxy)
         
-        if SEARCH_TERM:
-            params.append(f"q={SEARCH_TERM}")
-            logger.info(f"[{proxy}] Searching for: {SEARCH_TERM}")
-        
-        if COUNTRY_CODE:
-            params.append(f"country={COUNTRY_CODE}")
-            logger.info(f"[{proxy}] Country filter: {COUNTRY_CODE}")
-        
-        params.append("active_status=active")
-        params.append("ad_type=all")
-        
-        url = base_url + "?" + "&".join(params) if params else base_url
-        
-        driver.get(url)
+        await page.navigate(url)
         logger.info(f"[{proxy}] Page loaded")
         
-        # Initial wait and human interaction
-        time.sleep(random.uniform(3, 5))
-        human_interaction(driver)
+        # Wait for the page to settle, then interact like a human
+        if uses_network_idle(page.fetch_profile):
+            await page.settle(network, fetch_stats)
+        else:
+            await page.sleep(random.uniform(3, 5))
+        await human_interaction(page)
         
         scroll_count = 0
         no_new_ads_count = 0
-        seen_ad_texts = set()
+        seen_ads = new_dedup()
         
         while len(ads_data) < MAX_ADS_PER_PROXY and scroll_count < SCROLL_ATTEMPTS:
             try:
-                # Check for Cloudflare or blocking
-                page_source = driver.page_source.lower()
-                if any(keyword in page_source for keyword in ['checking your browser', 'cloudflare', 'security check']):
-                    logger.warning(f"[{proxy}] Detected bot protection")
+                # Check for Cloudflare or blocking (small in-page probe, not the whole page_source)
+                page_state = await page.probe(network)
+                if page_state.blocked:
+                    logger.warning(f"[{proxy}] Detected bot protection ({', '.join(page_state.signals)})")
                     stats.add_result(proxy, len(ads_data), 'cloudflare')
                     break
                 
-                # Wait for ads to load
-                WebDriverWait(driver, 15).until(
-                    lambda d: d.find_elements(By.XPATH, '//div[contains(@class, "_7jyr") or contains(@class, "x1yc453h")]')
-                )
-                
-                # Find all ad cards
-                ad_cards = driver.find_elements(
-                    By.XPATH, 
-                    '//div[contains(@class, "_7jyr") or contains(@class, "x1yc453h") or contains(@data-testid, "ad-card")]'
-                )
-                
-                logger.info(f"[{proxy}] Found {len(ad_cards)} ad elements on page")
+                # Wait for ads to load (in-page, wakes on the DOM mutation;
+                # timeout learned from past runs on this URL pattern, kept
+                # apart for the first load and the near-instant scroll waits)
+                await page.wait_for_cards("ad_cards_first" if scroll_count == 0 else "ad_cards_scroll", url)
                 
-                initial_count = len(ads_data)
-                
-                # Extract data from each ad
-                for ad in ad_cards:
-                    if len(ads_data) >= MAX_ADS_PER_PROXY:
-                        break
-                    
-                    ad_data = extract_ad_data(ad, proxy)
-                    
-                    if ad_data:
-                        # Check for duplicates using text as identifier
-                        ad_identifier = ad_data.get('text', '')[:100]
-                        if ad_identifier and ad_identifier not in seen_ad_texts:
-                            ads_data.append(ad_data)
-                            seen_ad_texts.add(ad_identifier)
-                            logger.debug(f"[{proxy}] Extracted ad from: {ad_data.get('advertiser', 'Unknown')}")
+                if BULK_EXTRACTION:
+                    # All cards in one round trip
+                    page_ads = await page.extract_bulk(selector_stats)
+                    logger.info(f"[{proxy}] Found {len(page_ads)} new ads on page")
+                else:
+                    # Find the cards not seen yet, then query each one field by field
+                    ad_cards = await page.new_cards()
+                    logger.info(f"[{proxy}] Found {len(ad_cards)} new ad elements on page")
+                    page_ads = [await page.extract_card(ad) for ad in ad_cards]
+                    # Tag only cards that yielded an ad; empty placeholders are read again
+                    extracted = [card for card, ad in zip(ad_cards, page_ads) if ad]
+                    if extracted:
+                        await page.mark_seen(extracted)
+                session_new = await page.add_page_ads(ads_data, seen_ads, page_ads)
                 
-                # Check if we got new ads
-                if len(ads_data) == initial_count:
+                # Check if the feed is still yielding ads (new to this session,
+                # whether or not an earlier run already saved them)
+                if not session_new:
                     no_new_ads_count += 1
                     logger.info(f"[{proxy}] No new ads found (attempt {no_new_ads_count})")
                     if no_new_ads_count >= 3:
@@ -366,100 +695,113 @@ def scrape_with_proxy(proxy: str) -> List[Dict]:
                     logger.info(f"[{proxy}] Total ads collected: {len(ads_data)}")
                 
                 # Scroll down for more ads
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(random.uniform(2, 4))
+                await page.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                await page.sleep(random.uniform(2, 4))
                 
                 # Human interaction
                 if scroll_count % 2 == 0:
-                    human_interaction(driver)
+                    await human_interaction(page)
                 
                 scroll_count += 1
                 
+                # Drain network events, then restart the browser if the feed has bloated it
+                await page.drain_log(fetch_stats)
+                await page.check()
+                
             except Exception as e:
                 logger.error(f"[{proxy}] Error during scraping: {str(e)[:200]}")
                 if HEADLESS_MODE:
                     try:
                         screenshot_path = OUTPUT_DIR / f"error_{proxy.replace(':', '_').replace('.', '_')}.png"
-                        driver.save_screenshot(str(screenshot_path))
+                        await page.save_screenshot(str(screenshot_path))
                         logger.info(f"[{proxy}] Screenshot saved: {screenshot_path}")
-                    except:
+                    except Exception:
                         pass
                 break
         
         logger.info(f"[{proxy}] Completed: {len(ads_data)} ads collected")
+        if BULK_EXTRACTION:
+            logger.info(f"[{proxy}] Selector hit rates: {selector_stats.summary()}")
         stats.add_result(proxy, len(ads_data), 'success' if ads_data else 'failed')
         return ads_data
     
+    except asyncio.CancelledError:
+        logger.warning(f"[{proxy}] Scrape cancelled with {len(ads_data)} ads collected")
+        stats.add_result(proxy, len(ads_data), 'cancelled')
+        raise
+    
     except Exception as e:
         logger.error(f"[{proxy}] Fatal error: {str(e)[:200]}")
         stats.add_result(proxy, 0, 'error')
         return []
     
     finally:
-        if driver:
-            try:
-                driver.quit()
-                logger.debug(f"[{proxy}] Driver closed")
-            except:
-                pass
-
+        await page.close(fetch_stats)
 
-
-def save_to_json(ads: List[Dict], filename: str):
-    """Save ads data to JSON file."""
-    filepath = OUTPUT_DIR / filename
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(ads, f, ensure_ascii=False, indent=2)
-    logger.info(f"JSON saved: {filepath}")
-    return filepath
-
-def save_to_csv(ads: List[Dict], filename: str):
-    """Save ads data to CSV file."""
-    if not ads:
-        logger.warning("No ads to save to CSV")
-        return None
-    
-    filepath = OUTPUT_DIR / filename
-    
-    # Define CSV columns
-    fieldnames = [
-        'advertiser', 'text', 'cta_text', 'sponsor_info', 
-        'media_count', 'media_urls', 'date_scraped', 'proxy', 'timestamp'
-    ]
+def scrape_with_proxy(proxy: str, fetch_profile: str = FETCH_PROFILE) -> List[Dict]:
+    """Scrape Facebook ads using a single proxy on a blocking driver.
     
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for ad in ads:
-            row = {
-                'advertiser': ad.get('advertiser', ''),
-                'text': ad.get('text', '').replace('\n', ' '),
-                'cta_text': ad.get('cta_text', ''),
-                'sponsor_info': ad.get('sponsor_info', ''),
-                'media_count': len(ad.get('media', [])),
-                'media_urls': ' | '.join(ad.get('media', [])),
-                'date_scraped': ad.get('date_scraped', ''),
-                'proxy': ad.get('proxy', ''),
-                'timestamp': ad.get('timestamp', '')
-            }
-            writer.writerow(row)
-    
-    logger.info(f"CSV saved: {filepath}")
-    return filepath
+    Runs scrape_session() on a private event loop, so call it from a worker
+    thread (thread pool, asyncio.to_thread), never from inside a running loop.
+    """
+    return asyncio.run(scrape_session(SyncPage(proxy, fetch_profile)))
+
+async def async_scrape_with_proxy(proxy: str, fetch_profile: str = FETCH_PROFILE) -> List[Dict]:
+    """Scrape Facebook ads on the event loop (AsyncDriver page commands)."""
+    return await scrape_session(AsyncPage(proxy, fetch_profile))
 
 async def async_scrape_wrapper(proxy: str) -> List[Dict]:
-    """Async wrapper for scraping (runs in thread pool)."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, scrape_with_proxy, proxy)
+    """Run one scrape job on the event loop."""
+    if CONTEXT_MODE:
+        # Context drivers switch windows per command, which only the sync driver does
+        return await asyncio.to_thread(scrape_with_proxy, proxy)
+    return await async_scrape_with_proxy(proxy)
 
 async def async_scrape_all(proxies: List[str]) -> List[List[Dict]]:
-    """Run all scraping tasks concurrently."""
-    tasks = [async_scrape_wrapper(proxy) for proxy in proxies]
-    return await asyncio.gather(*tasks)
+    """Run all scraping tasks concurrently, at most MAX_WORKERS at a time."""
+    # Each running task borrows a worker name, which is its timeline track
+    workers = [f"async-worker-{i}" for i in reversed(range(MAX_WORKERS))]
+    
+    async def run(proxy: str) -> List[Dict]:
+        worker = workers.pop()
+        try:
+            with tracer.track(worker), tracer.span("scrape", "worker", proxy=proxy):
+                return await async_scrape_wrapper(proxy)
+        finally:
+            workers.append(worker)
+    
+    return await gather_bounded(
+        [functools.partial(run, proxy) for proxy in proxies],
+        limit=MAX_WORKERS
+    )
+
+def scrape_worker(proxy: str) -> List[Dict]:
+    """scrape_with_proxy() as one span on the calling thread's timeline track."""
+    with tracer.span("scrape", "worker", proxy=proxy):
+        return scrape_with_proxy(proxy)
 
-def main():
-    """Main execution function."""
+def main(search_term: Optional[str] = None, country_code: Optional[str] = None) -> Optional[Dict]:
+    """Main execution function.
+    
+    search_term/country_code override the module settings for this run (the
+    fbads_jobs workers call it once per job). Returns the run summary, or
+    None if no proxies were usable.
+    """
+    global SEARCH_TERM, COUNTRY_CODE, stats, AD_EXTRACTOR, DATA_TO_SCRAPE, seen_index
+    if search_term is not None:
+        SEARCH_TERM = search_term
+    if country_code is not None:
+        COUNTRY_CODE = country_code
+    stats = ScraperStats()
+    startup_timings.reset()
+    # Compile the extraction schema once per job, honouring data_to_scrape
+    AD_EXTRACTOR, DATA_TO_SCRAPE = load_extraction()
+    auditor = current_auditor()  # Set when run under sleep_audit.py
+    if auditor is not None:
+        auditor.reset()
+    if TRACE_TIMELINE:
+        tracer.start()
+    
     logger.info("="*60)
     logger.info("FACEBOOK ADS SCRAPER - Starting")
     logger.info("="*60)
@@ -470,6 +812,9 @@ def main():
     logger.info(f"  - Max Ads Per Proxy: {MAX_ADS_PER_PROXY}")
     logger.info(f"  - Headless Mode: {HEADLESS_MODE}")
     logger.info(f"  - Scroll Attempts: {SCROLL_ATTEMPTS}")
+    logger.info(f"  - Context Mode: {CONTEXT_MODE}")
+    logger.info(f"  - Fetch Profile: {FETCH_PROFILE or 'full'}")
+    logger.info(f"  - Fields: {', '.join(AD_EXTRACTOR.spec.fields)}")
     logger.info("="*60)
     
     # Get proxies
@@ -504,6 +849,9 @@ def main():
     logger.info(f"Using {len(working_proxies)} working proxies")
     logger.info("="*60)
     
+    # Cross-run index of saved ads; each main() call is one run in it
+    seen_index = SeenIndex(label=f"{SEARCH_TERM or '*'}|{COUNTRY_CODE or '*'}") if SEEN_INDEX else None
+    
     # Start scraping with asyncio
     logger.info("Starting parallel scraping...")
     
@@ -517,20 +865,22 @@ def main():
         logger.error(f"Async scraping error: {e}")
         # Fallback to thread pool
         logger.info("Falling back to thread pool execution...")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            results = list(executor.map(scrape_with_proxy, working_proxies))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS,
+                                                   thread_name_prefix="scrape-worker") as executor:
+            results = list(executor.map(scrape_worker, working_proxies))
+    finally:
+        if CONTEXT_MODE:
+            context_host.close()
     
     # Combine results
     all_ads = []
-    seen_texts = set()
+    seen_ads = new_dedup(DEDUP_MODE)
     
     for proxy_ads in results:
         for ad in proxy_ads:
-            # Deduplicate by text
-            ad_text = ad.get('text', '')[:100]
-            if ad_text and ad_text not in seen_texts:
+            if seen_ads.add(ad):
                 all_ads.append(ad)
-                seen_texts.add(ad_text)
+    logger.info(f"Dedup ({', '.join(seen_ads.fields)}): {seen_ads.stats()}")
     
     logger.info("="*60)
     logger.info(stats.get_summary())
@@ -548,6 +898,37 @@ def main():
     csv_filename = f"fb_ads{search_part}{country_part}_{timestamp}.csv"
     csv_path = save_to_csv(all_ads, csv_filename)
     
+    # Only now that they're written do this run's ads count as seen for later runs
+    seen_counts = None
+    if seen_index is not None:
+        seen_index.add([seen_ads.fingerprint(ad) for ad in all_ads])
+        seen_counts = seen_index.finish_run()
+        logger.info(f"Seen index: {seen_counts['new']} new, {seen_counts['repeat']} repeat ads "
+                    f"(run {seen_counts['run_id']}, {seen_index.path})")
+    
+    # Driver startup phase timings (p50/p95/max) for spotting Chrome/Selenium regressions
+    startup_path = OUTPUT_DIR / f"startup{search_part}{country_part}_{timestamp}.json"
+    startup_report = startup_timings.write_report(startup_path)
+    for phase, timing in startup_report['phases'].items():
+        logger.info(f"Startup {phase}: p50={timing['p50']}s p95={timing['p95']}s max={timing['max']}s")
+    logger.info(f"Startup timings saved: {startup_path}")
+    
+    # Where the run's time went (sleep vs WebDriver vs I/O vs Python), if audited
+    audit_path = None
+    if auditor is not None:
+        audit_path = OUTPUT_DIR / f"sleep_audit{search_part}{country_part}_{timestamp}.json"
+        audit_report = auditor.write_report(audit_path)
+        logger.info(f"Sleep share: {audit_report['share']['sleep']:.1%} of "
+                    f"{audit_report['thread_seconds']}s thread time, saved: {audit_path}")
+    
+    # Per-worker span timeline; open in chrome://tracing or ui.perfetto.dev
+    trace_path = None
+    if TRACE_TIMELINE:
+        trace_path = OUTPUT_DIR / f"trace{search_part}{country_part}_{timestamp}.json"
+        tracer.write(trace_path)
+        tracer.stop()
+        logger.info(f"Timeline trace saved: {trace_path}")
+    
     # Save detailed log summary
     summary = {
         'scrape_date': datetime.now().isoformat(),
@@ -559,11 +940,20 @@ def main():
         'successful_proxies': stats.successful_proxies,
         'failed_proxies': stats.failed_proxies,
         'cloudflare_blocks': stats.cloudflare_blocks,
+        'fetch_profile': FETCH_PROFILE or 'full',
+        'requests_blocked': stats.requests_blocked,
+        'bytes_transferred': stats.bytes_transferred,
+        'estimated_bytes_saved': stats.bytes_saved,
         'duration_seconds': time.time() - stats.start_time,
+        'new_ads': seen_counts['new'] if seen_counts else None,
+        'repeat_ads': seen_counts['repeat'] if seen_counts else None,
         'files_generated': {
             'json': str(json_path),
             'csv': str(csv_path),
-            'log': str(log_filename)
+            'log': str(log_filename),
+            'startup_timings': str(startup_path),
+            'sleep_audit': str(audit_path) if audit_path else None,
+            'trace': str(trace_path) if trace_path else None
         }
     }
     
@@ -579,6 +969,8 @@ def main():
     logger.info(f"✓ Unique advertisers: {summary['unique_advertisers']}")
     logger.info(f"✓ Files saved in: {OUTPUT_DIR}")
     logger.info("="*60)
+    
+    return summary
 
 if __name__ == "__main__":
     try:
@@ -2,41 +2,22 @@
 Form Automation Example with Selenium Stealth
 Demonstrates filling forms, handling dropdowns, checkboxes, and file uploads
 """
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
-from selenium_stealth import stealth
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_factory import build_chrome_options, create_driver, checkout, release
 import time
 import os
 
 
 def setup_stealth_driver():
-    """Setup Chrome driver with stealth settings"""
-    options = webdriver.ChromeOptions()
-    options.add_argument("start-maximized")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_argument('--log-level=3')
-    
-    s = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=s, options=options)
-    
-    stealth(driver,
-            languages=["en-US", "en"],
-            vendor="Google Inc.",
-            platform="Win32",
-            webgl_vendor="Intel Inc.",
-            renderer="Intel Iris OpenGL Engine",
-            fix_hairline=True,
+    """Borrow a warm stealth Chrome driver from the shared pool"""
+    return checkout(
+        "stealth",
+        lambda: create_driver(build_chrome_options()),
     )
-    
-    return driver
 
 
 def fill_basic_form():
@@ -90,7 +71,7 @@ def fill_basic_form():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def fill_form_with_delays():
@@ -130,7 +111,7 @@ def fill_form_with_delays():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def handle_multi_step_form():
@@ -177,7 +158,7 @@ def handle_multi_step_form():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def handle_dynamic_form():
@@ -210,7 +191,7 @@ def handle_dynamic_form():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def fill_form_with_validation():
@@ -251,7 +232,7 @@ def fill_form_with_validation():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+"""
+Offline HTML Parsing
+Parses page HTML fetched once from the browser in a process pool with lxml and
+precompiled selectors, using the same record definitions as live extraction
+"""
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import atexit
+import logging
+import re
+import threading
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # Offline parsing is unavailable without lxml
+    etree = lxml_html = None
+
+try:
+    from cssselect import GenericTranslator
+except ImportError:  # Only needed for By.CSS_SELECTOR fields
+    GenericTranslator = None
+
+logger = logging.getLogger(__name__)
+
+PARSER_WORKERS = None  # Processes in the shared parser pool (None = CPU count)
+
+
+class Field(NamedTuple):
+    """One value of a record: the first match's text, an attribute, or all matches.
+
+    post names POST_PROCESSORS applied in order to the extracted value.
+    """
+    by: str
+    value: str
+    many: bool = False
+    attribute: Optional[str] = None
+    post: Tuple[str, ...] = ()
+
+
+class RecordSpec(NamedTuple):
+    """Records are the elements matching item; fields are located relative to each."""
+    item: Tuple[str, str]
+    fields: Dict[str, Field]
+
+
+def _each(function: Callable[[str], Any]) -> Callable[[Any], Any]:
+    """Apply a per-string function to a scalar value or every item of a list."""
+    return lambda value: [function(v) for v in value] if isinstance(value, list) else function(value)
+
+
+def _number(text: str, cast: Callable[[str], Any]):
+    cleaned = re.sub(r"[^\d.\-]", "", text)
+    try:
+        return cast(cleaned)
+    except ValueError:
+        return None
+
+
+# Named value transforms for Field.post (lists are handled item by item,
+# except the list-level ones: http_only filters, unique, count)
+POST_PROCESSORS: Dict[str, Callable[[Any], Any]] = {
+    "strip": _each(lambda v: v.strip()),
+    "collapse": _each(lambda v: " ".join(v.split())),
+    "lower": _each(lambda v: v.lower()),
+    "int": _each(lambda v: _number(v, int)),
+    "float": _each(lambda v: _number(v, float)),
+    "http_only": lambda v: [x for x in v if x and "http" in x] if isinstance(v, list)
+                           else (v if v and "http" in v else ""),
+    "unique": lambda v: list(dict.fromkeys(v)),
+    "count": len,
+}
+
+
+def finish_record(record: Dict, spec: 'RecordSpec') -> Dict:
+    """Run each field's post-processing on a raw record (in place)."""
+    for name, field in spec.fields.items():
+        for post in field.post:
+            record[name] = POST_PROCESSORS[post](record[name])
+    return record
+
+
+def available() -> bool:
+    return lxml_html is not None
+
+
+def to_xpath(by: str, value: str, axis: str = "descendant::") -> str:
+    """Translate a Selenium locator into an XPath for lxml."""
+    if by == By.XPATH:
+        return value
+    if by == By.CLASS_NAME:
+        return f"{axis}*[contains(concat(' ', normalize-space(@class), ' '), ' {value} ')]"
+    if by == By.TAG_NAME:
+        return f"{axis}{value}"
+    if by == By.ID:
+        return f"{axis}*[@id='{value}']"
+    if by == By.NAME:
+        return f"{axis}*[@name='{value}']"
+    if by == By.CSS_SELECTOR:
+        if GenericTranslator is None:
+            raise ImportError("CSS selector fields need the cssselect package")
+        return GenericTranslator().css_to_xpath(value, prefix=axis)
+    raise ValueError(f"Unsupported locator strategy for offline parsing: {by}")
+
+
+# Per-process cache of compiled selectors, so each worker compiles a spec once
+_compiled: Dict[Tuple[str, str, str], 'etree.XPath'] = {}
+
+
+def _xpath(by: str, value: str, axis: str = "descendant::"):
+    key = (by, value, axis)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = _compiled[key] = etree.XPath(to_xpath(by, value, axis))
+    return compiled
+
+
+def _text(node) -> str:
+    """Whitespace-collapsed text, close to WebElement.text for inline content."""
+    return " ".join(node.text_content().split())
+
+
+def _field_value(node, field: Field):
+    matches = _xpath(field.by, field.value)(node)
+    if field.attribute:
+        values = [match.get(field.attribute, "") for match in matches]
+    else:
+        values = [_text(match) for match in matches]
+    if field.many:
+        return values
+    return values[0] if values else ""
+
+
+def parse_records(html: str, spec: RecordSpec) -> List[Dict]:
+    """Parse every record in an HTML document or fragment (runs in the pool)."""
+    root = lxml_html.fromstring(html)
+    # descendant-or-self, so a record's own outerHTML parses as one record
+    items = _xpath(*spec.item, axis="descendant-or-self::")(root)
+    return [
+        finish_record({name: _field_value(item, field) for name, field in spec.fields.items()}, spec)
+        for item in items
+    ]
+
+
+def extract_live(root, spec: RecordSpec, limit: Optional[int] = None) -> List[Dict]:
+    """The same records read element by element over WebDriver.
+
+    root is a driver or WebElement. This is the one-command-per-field path
+    the offline parser replaces; it's kept for when lxml isn't installed.
+    """
+    return [read_fields(item, spec) for item in root.find_elements(*spec.item)[:limit]]
+
+
+def read_fields(item, spec: RecordSpec) -> Dict:
+    """One record's fields from a live WebElement."""
+    record = {}
+    for name, field in spec.fields.items():
+        elements = item.find_elements(field.by, field.value)
+        if not field.many:
+            elements = elements[:1]
+        if field.attribute:
+            values = [element.get_attribute(field.attribute) or "" for element in elements]
+        else:
+            values = [element.text for element in elements]
+        record[name] = values if field.many else (values[0] if values else "")
+    return finish_record(record, spec)
+
+
+async def async_read_fields(item, spec: RecordSpec) -> Dict:
+    """read_fields() for an async_driver.AsyncElement."""
+    record = {}
+    for name, field in spec.fields.items():
+        elements = await item.find_elements(field.by, field.value)
+        if not field.many:
+            elements = elements[:1]
+        if field.attribute:
+            values = [await element.get_attribute(field.attribute) or "" for element in elements]
+        else:
+            values = [await element.text for element in elements]
+        record[name] = values if field.many else (values[0] if values else "")
+    return finish_record(record, spec)
+
+
+def page_html(driver, locator: Optional[Tuple[str, str]] = None) -> str:
+    """The page's HTML, or just the outerHTML of the element at locator."""
+    if locator is None:
+        return driver.page_source
+    try:
+        return driver.find_element(*locator).get_attribute("outerHTML")
+    except NoSuchElementException:
+        return ""
+
+
+class HtmlParserPool:
+    """Process pool that turns HTML snapshots into records.
+
+    submit() returns immediately, so the browser can navigate to the next
+    page while earlier pages are parsed on other cores.
+    """
+
+    def __init__(self, max_workers: Optional[int] = PARSER_WORKERS):
+        if not available():
+            raise ImportError("Offline HTML parsing needs lxml (pip install lxml)")
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(self, html: str, spec: RecordSpec) -> Future:
+        return self._executor.submit(parse_records, html, spec)
+
+    def parse(self, html: str, spec: RecordSpec) -> List[Dict]:
+        return self.submit(html, spec).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_pool: Optional[HtmlParserPool] = None
+_pool_lock = threading.Lock()
+
+
+def parser_pool() -> HtmlParserPool:
+    """The shared parser pool, started on first use and shut down at exit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HtmlParserPool()
+            atexit.register(_pool.close)
+        return _pool
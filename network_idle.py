@@ -0,0 +1,200 @@
+"""
+Network-Idle Readiness Detection
+Tracks in-flight requests from the CDP Network events in Chrome's performance
+log and waits until the page has been quiet for a configurable window
+"""
+from selenium.common.exceptions import TimeoutException
+from fnmatch import fnmatch
+from trace_timeline import tracer
+from typing import Callable, Dict, Iterable, List, Optional
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Requests that never settle (long-poll, beacons, analytics) and shouldn't
+# hold up readiness. '*' is a wildcard, as in driver_factory's URL patterns.
+DEFAULT_IGNORE_PATTERNS = [
+    "data:*",
+    "blob:*",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*facebook.com/tr*",
+    "*/ajax/bz*",
+    "*/ajax/webstorage/*",
+    "*/pull?*",
+    "*edge-chat.facebook.com*",
+    "*/realtime*",
+]
+
+QUIET_WINDOW = 0.5        # Seconds with no network activity that count as idle
+LONG_POLL_AFTER = 10      # Requests in flight longer than this are treated as long-poll
+IDLE_POLL = 0.1           # Seconds between performance log drains
+
+
+class NetworkTracker:
+    """In-flight request bookkeeping fed by performance log entries.
+
+    Activity is any Network event for a tracked request, timed by the
+    event's own CDP timestamp rather than when the log was drained.
+    Requests matching ignore_patterns are never tracked, and requests open
+    longer than long_poll_after stop counting, for pending() and for
+    activity alike, so streaming endpoints can't block idle. HTTP statuses
+    of document responses are kept for status_for().
+    """
+
+    def __init__(self, ignore_patterns: Iterable[str] = DEFAULT_IGNORE_PATTERNS,
+                 long_poll_after: Optional[float] = LONG_POLL_AFTER):
+        self.ignore_patterns = list(ignore_patterns)
+        self.long_poll_after = long_poll_after
+        self.inflight: Dict[str, Dict] = {}
+        self.last_activity = time.monotonic()
+        self.requests_seen = 0
+        self.document_statuses: Dict[str, int] = {}
+        self._clock_offset: Optional[float] = None
+
+    def _ignored(self, url: str) -> bool:
+        return any(fnmatch(url, pattern) for pattern in self.ignore_patterns)
+
+    def reset(self):
+        """Forget in-flight requests (e.g. after navigating elsewhere)."""
+        self.inflight.clear()
+        self.document_statuses.clear()
+        self.last_activity = time.monotonic()
+
+    def _calibrate(self, events: List[Dict], drained_at: float):
+        """Update the offset from Chrome's monotonic clock (CDP timestamps) to time.monotonic().
+
+        Chrome's clock has its own origin. No event is drained before it
+        happens, so the smallest drain time minus event time seen so far is
+        the closest estimate.
+        """
+        timestamps = [p['timestamp'] for _, p in events if isinstance(p.get('timestamp'), (int, float))]
+        if timestamps:
+            offset = drained_at - max(timestamps)
+            if self._clock_offset is None or offset < self._clock_offset:
+                self._clock_offset = offset
+
+    def _event_time(self, params: Dict, drained_at: float) -> float:
+        timestamp = params.get('timestamp')
+        if self._clock_offset is None or not isinstance(timestamp, (int, float)):
+            return drained_at
+        return min(timestamp + self._clock_offset, drained_at)
+
+    def _long_poll(self, request: Dict, at: float) -> bool:
+        return self.long_poll_after is not None and at - request['started'] >= self.long_poll_after
+
+    def add_entries(self, entries: List[Dict]):
+        """Update in-flight state from raw performance log entries."""
+        drained_at = time.monotonic()
+        events = []
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method', '')
+            if method.startswith('Network.'):
+                events.append((method, message.get('params', {})))
+        self._calibrate(events, drained_at)
+
+        for method, params in events:
+            request_id = params.get('requestId')
+            at = self._event_time(params, drained_at)
+
+            if method == 'Network.responseReceived' and params.get('type') == 'Document':
+                response = params.get('response', {})
+                self.document_statuses[response.get('url', '')] = response.get('status')
+
+            if method == 'Network.requestWillBeSent':
+                url = params.get('request', {}).get('url', '')
+                if self._ignored(url):
+                    continue
+                if request_id not in self.inflight:
+                    self.requests_seen += 1
+                self.inflight[request_id] = {'url': url, 'started': at}
+                self.last_activity = max(self.last_activity, at)
+            elif request_id in self.inflight:
+                # Chunks of a long-poll or stream don't count as activity
+                if not self._long_poll(self.inflight[request_id], at):
+                    self.last_activity = max(self.last_activity, at)
+                if method in ('Network.loadingFinished', 'Network.loadingFailed'):
+                    del self.inflight[request_id]
+
+    def status_for(self, url: str) -> Optional[int]:
+        """HTTP status of the document last loaded from url (main frame or iframe), if seen."""
+        return self.document_statuses.get(url)
+
+    def pending(self) -> List[str]:
+        """URLs still in flight, excluding ones old enough to be long-poll."""
+        now = time.monotonic()
+        return [
+            request['url'] for request in self.inflight.values()
+            if self.long_poll_after is None or now - request['started'] < self.long_poll_after
+        ]
+
+    def is_idle(self, quiet_window: float = QUIET_WINDOW, max_inflight: int = 0) -> bool:
+        return (len(self.pending()) <= max_inflight
+                and time.monotonic() - self.last_activity >= quiet_window)
+
+    def _drained(self, entries: List[Dict], sink: Optional[Callable[[List[Dict]], None]]):
+        self.add_entries(entries)
+        if sink is not None:
+            sink(entries)
+
+    def _timeout_message(self, timeout: float) -> str:
+        pending = self.pending()
+        return (f"Network not idle after {timeout}s: {len(pending)} in flight"
+                + (f" (e.g. {pending[0][:120]})" if pending else ""))
+
+    def wait_for_idle(self, driver, quiet_window: float = QUIET_WINDOW, timeout: float = 15,
+                      max_inflight: int = 0,
+                      sink: Optional[Callable[[List[Dict]], None]] = None) -> float:
+        """Block until the network has been idle for quiet_window; returns seconds waited.
+
+        The performance log is drained while waiting; pass sink (e.g.
+        FetchStats.add_entries) to keep counting the same entries elsewhere.
+        Raises TimeoutException if the page never settles.
+        """
+        start = time.monotonic()
+        with tracer.span("network_idle", "wait", quiet_window=quiet_window, polls=0) as span:
+            while True:
+                span["polls"] += 1
+                self._drained(driver.get_log('performance'), sink)
+                if self.is_idle(quiet_window, max_inflight):
+                    return time.monotonic() - start
+                if time.monotonic() - start > timeout:
+                    raise TimeoutException(self._timeout_message(timeout))
+                time.sleep(IDLE_POLL)
+
+    async def async_wait_for_idle(self, driver, quiet_window: float = QUIET_WINDOW,
+                                  timeout: float = 15, max_inflight: int = 0,
+                                  sink: Optional[Callable[[List[Dict]], None]] = None) -> float:
+        """wait_for_idle() for an AsyncDriver."""
+        start = time.monotonic()
+        with tracer.span("network_idle", "wait", quiet_window=quiet_window, polls=0) as span:
+            while True:
+                span["polls"] += 1
+                self._drained(await driver.get_log('performance'), sink)
+                if self.is_idle(quiet_window, max_inflight):
+                    return time.monotonic() - start
+                if time.monotonic() - start > timeout:
+                    raise TimeoutException(self._timeout_message(timeout))
+                await asyncio.sleep(IDLE_POLL)
+
+
+def wait_for_network_idle(driver, quiet_window: float = QUIET_WINDOW, timeout: float = 15,
+                          ignore_patterns: Iterable[str] = DEFAULT_IGNORE_PATTERNS,
+                          max_inflight: int = 0,
+                          sink: Optional[Callable[[List[Dict]], None]] = None) -> float:
+    """One-off network-idle wait with a fresh tracker.
+
+    Needs the performance log (driver_factory fetch profiles enable it).
+    Entries drained before the call are not seen, so call it right after
+    the navigation or action whose requests you want to settle.
+    """
+    tracker = NetworkTracker(ignore_patterns)
+    return tracker.wait_for_idle(driver, quiet_window, timeout, max_inflight, sink)
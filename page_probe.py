@@ -0,0 +1,138 @@
+"""
+Page-State Probe
+Checks registered interstitial signals (title, sentinel selectors, a bounded
+text sample, HTTP status) with one small in-page script instead of pulling
+and scanning the whole page_source
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+TEXT_SAMPLE_CHARS = 2000  # Leading body text searched for text signals
+
+
+class PageSignal(NamedTuple):
+    """A page state, matched when any of its checks hits.
+
+    title and text are lowercase substrings of the title and of the first
+    TEXT_SAMPLE_CHARS of visible body text; selectors are CSS sentinels;
+    statuses are HTTP statuses of the current document.
+    """
+    name: str
+    title: Tuple[str, ...] = ()
+    selectors: Tuple[str, ...] = ()
+    text: Tuple[str, ...] = ()
+    statuses: Tuple[int, ...] = ()
+
+
+# Interstitials that end a scrape session
+DEFAULT_SIGNALS = [
+    PageSignal(
+        "cloudflare",
+        title=("just a moment", "attention required", "cloudflare"),
+        selectors=("#challenge-form", "#cf-challenge-running", "#cf-wrapper",
+                   ".cf-browser-verification", 'iframe[src*="challenges.cloudflare.com"]'),
+        text=("checking your browser", "cloudflare"),
+    ),
+    PageSignal(
+        "security_check",
+        title=("security check",),
+        selectors=('form[action*="/checkpoint"]',),
+        text=("security check",),
+    ),
+    PageSignal("http_error", statuses=(403, 429, 503)),
+]
+
+
+class PageState(NamedTuple):
+    url: str
+    title: str
+    ready_state: str
+    status: Optional[int]
+    signals: Tuple[str, ...]
+
+    @property
+    def blocked(self) -> bool:
+        return bool(self.signals)
+
+
+# arguments[0] = max text sample length; returns a few hundred bytes at most
+_PROBE_TEMPLATE = r"""
+var signals = %s, limit = arguments[0];
+var title = (document.title || '').toLowerCase(), sample = null;
+function textSample() {
+  if (sample !== null) return sample;
+  var root = document.body || document.documentElement, parts = [], size = 0;
+  if (root) {
+    var walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT, {acceptNode: function (n) {
+      var tag = n.parentNode && n.parentNode.nodeName;
+      return tag === 'SCRIPT' || tag === 'STYLE' || tag === 'NOSCRIPT'
+        ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT;
+    }});
+    var node;
+    while (size < limit && (node = walker.nextNode())) { parts.push(node.nodeValue); size += node.nodeValue.length; }
+  }
+  return sample = parts.join(' ').slice(0, limit).toLowerCase();
+}
+function some(list, test) { for (var i = 0; i < list.length; i++) if (test(list[i])) return true; return false; }
+var matched = signals.filter(function (s) {
+  return some(s[1], function (t) { return title.indexOf(t) !== -1; })
+      || some(s[2], function (c) { try { return !!document.querySelector(c); } catch (e) { return false; } })
+      || some(s[3], function (t) { return textSample().indexOf(t) !== -1; });
+}).map(function (s) { return s[0]; });
+var nav = performance.getEntriesByType ? performance.getEntriesByType('navigation')[0] : null;
+return {url: location.href, title: document.title, readyState: document.readyState,
+        status: nav && nav.responseStatus ? nav.responseStatus : null, signals: matched};
+"""
+
+
+class PageProbe:
+    """Checks the current page against registered PageSignals in one round trip.
+
+    The result is a PageState of a few hundred bytes however large the
+    page is. The HTTP status comes from a NetworkTracker fed with the CDP
+    performance log when one is passed, else from the page's navigation
+    timing entry.
+    """
+
+    def __init__(self, signals: Sequence[PageSignal] = DEFAULT_SIGNALS,
+                 text_sample: int = TEXT_SAMPLE_CHARS):
+        self.signals: List[PageSignal] = []
+        self.text_sample = text_sample
+        self.script = ""
+        for signal in signals:
+            self.register(signal)
+
+    def register(self, signal: PageSignal):
+        """Add a signal (replacing one with the same name)."""
+        self.signals = [s for s in self.signals if s.name != signal.name] + [signal]
+        plan = [
+            [s.name, [t.lower() for t in s.title], list(s.selectors), [t.lower() for t in s.text]]
+            for s in self.signals
+        ]
+        self.script = _PROBE_TEMPLATE % json.dumps(plan)
+
+    def _state(self, result: Optional[Dict], network) -> PageState:
+        result = result or {}
+        url = result.get("url", "")
+        status = network.status_for(url) if network is not None else None
+        if status is None:
+            status = result.get("status")
+        signals = list(result.get("signals") or [])
+        signals += [s.name for s in self.signals
+                    if status in s.statuses and s.name not in signals]
+        state = PageState(url, result.get("title", ""), result.get("readyState", ""), status,
+                          tuple(signals))
+        if state.blocked:
+            logger.debug(f"Page signals {state.signals} on {url} (status {status})")
+        return state
+
+    def check(self, driver, network=None) -> PageState:
+        """Probe the driver's current page (network: optional network_idle.NetworkTracker)."""
+        return self._state(driver.execute_script(self.script, self.text_sample), network)
+
+    async def check_async(self, driver, network=None) -> PageState:
+        """check() for an AsyncDriver."""
+        return self._state(await driver.execute_script(self.script, self.text_sample), network)
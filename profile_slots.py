@@ -0,0 +1,268 @@
+"""
+Persistent Chrome Profile Slots
+Hands out locked, reusable user-data-dirs per worker so the HTTP disk cache
+(and DNS/TLS warm state) survives across runs, with size caps and LRU pruning
+"""
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+import os
+import shutil
+import threading
+import time
+
+if os.name == "nt":
+    import msvcrt
+    fcntl = None
+else:
+    import fcntl
+    msvcrt = None
+
+logger = logging.getLogger(__name__)
+
+# Slot root (override with PROFILE_SLOTS_DIR)
+PROFILE_ROOT = Path(os.environ.get(
+    "PROFILE_SLOTS_DIR",
+    Path(__file__).resolve().parent / "profiles"
+))
+
+PROFILE_MAX_SLOTS = 16      # Slots per namespace; busy beyond this = temporary profile
+PROFILE_MAX_SLOT_MB = 250   # Trim a slot's caches above this size
+PROFILE_MAX_TOTAL_MB = 2000 # Delete least-recently-used slots above this namespace total
+
+# Cache directories inside a user-data-dir, safe to trim while Chrome is down
+CACHE_DIRS = [
+    "Default/Cache",
+    "Default/Code Cache",
+    "Default/GPUCache",
+    "GrShaderCache",
+    "ShaderCache",
+]
+
+# Identity state wiped before each launch unless keep_cookies=True
+PRIVATE_STATE = [
+    "Default/Cookies",
+    "Default/Cookies-journal",
+    "Default/Network/Cookies",
+    "Default/Network/Cookies-journal",
+    "Default/Local Storage",
+    "Default/Session Storage",
+    "Default/IndexedDB",
+    "Default/Service Worker",
+    "Default/Sessions",
+    "Default/Current Session",
+    "Default/Last Session",
+]
+
+# Left behind by a crashed Chrome; stale once we hold the slot lock
+SINGLETON_FILES = ["SingletonLock", "SingletonSocket", "SingletonCookie"]
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if msvcrt is not None:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int):
+    try:
+        if msvcrt is not None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    except OSError:
+        pass
+
+
+def _remove(path: Path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def dir_size_mb(path: Path) -> float:
+    """Total size of the files under path, in MB."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+class ProfileSlot:
+    """One locked user-data-dir. Held until ProfileSlotManager.release()."""
+
+    def __init__(self, namespace: str, index: int, path: Path, lock_path: Path, fd: int):
+        self.namespace = namespace
+        self.index = index
+        self.path = path
+        self.lock_path = lock_path
+        self._fd = fd
+
+    def apply(self, options, disk_cache_mb: float):
+        """Point ChromeOptions at this slot and cap Chrome's own disk cache."""
+        options.add_argument(f"--user-data-dir={self.path}")
+        options.add_argument(f"--disk-cache-size={int(disk_cache_mb * 1024 * 1024)}")
+        return options
+
+    def __repr__(self):
+        return f"ProfileSlot({self.namespace}/{self.path.name})"
+
+
+class ProfileSlotManager:
+    """Cross-process pool of persistent user-data-dirs, grouped by namespace.
+
+    Each slot is guarded by an OS file lock, so two workers (threads or
+    processes) never launch Chrome on the same profile, and a crashed
+    worker's lock is dropped by the OS. acquire() prefers the most recently
+    used free slot, since its cache is the warmest.
+    """
+
+    def __init__(self, root: Path = PROFILE_ROOT,
+                 max_slots: int = PROFILE_MAX_SLOTS,
+                 max_slot_mb: float = PROFILE_MAX_SLOT_MB,
+                 max_total_mb: float = PROFILE_MAX_TOTAL_MB,
+                 keep_cookies: bool = False):
+        self.root = Path(root)
+        self.max_slots = max_slots
+        self.max_slot_mb = max_slot_mb
+        self.max_total_mb = max_total_mb
+        self.keep_cookies = keep_cookies
+        self._lock = threading.Lock()
+
+    def _lock_path(self, namespace: str, index: int) -> Path:
+        return self.root / namespace / f"slot-{index}.lock"
+
+    def _slot_path(self, namespace: str, index: int) -> Path:
+        return self.root / namespace / f"slot-{index}"
+
+    def _indexes_by_recency(self, namespace: str) -> List[int]:
+        """Slot indexes, most recently released first (unused ones last)."""
+        def last_used(index):
+            try:
+                return self._lock_path(namespace, index).stat().st_mtime
+            except OSError:
+                return 0.0
+        return sorted(range(self.max_slots), key=last_used, reverse=True)
+
+    def _try_slot(self, namespace: str, index: int) -> Optional[ProfileSlot]:
+        lock_path = self._lock_path(namespace, index)
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+        if not _try_lock(fd):
+            os.close(fd)
+            return None
+        return ProfileSlot(namespace, index, self._slot_path(namespace, index), lock_path, fd)
+
+    def _prepare(self, slot: ProfileSlot):
+        slot.path.mkdir(parents=True, exist_ok=True)
+        for name in SINGLETON_FILES:
+            _remove(slot.path / name)
+        if not self.keep_cookies:
+            for name in PRIVATE_STATE:
+                _remove(slot.path / name)
+
+    def acquire(self, namespace: str, timeout: float = 0.0) -> Optional[ProfileSlot]:
+        """Lock a free slot in namespace, or return None if all are busy."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                for index in self._indexes_by_recency(namespace):
+                    slot = self._try_slot(namespace, index)
+                    if slot is not None:
+                        self._prepare(slot)
+                        logger.debug(f"Acquired profile {slot}")
+                        return slot
+            if time.monotonic() >= deadline:
+                logger.info(f"All {self.max_slots} '{namespace}' profile slots busy, "
+                            f"using a temporary profile")
+                return None
+            time.sleep(0.5)
+
+    def release(self, slot: ProfileSlot):
+        """Unlock a slot (call after Chrome has quit), then enforce size caps."""
+        if slot._fd is None:
+            return
+        try:
+            os.utime(slot.lock_path, None)
+        except OSError:
+            pass
+        self.trim(slot)
+        _unlock(slot._fd)
+        os.close(slot._fd)
+        slot._fd = None
+        self.prune(slot.namespace)
+
+    def trim(self, slot: ProfileSlot):
+        """Delete the slot's least recently used cache files above max_slot_mb."""
+        size_mb = dir_size_mb(slot.path)
+        if size_mb <= self.max_slot_mb:
+            return
+
+        files = []
+        for cache_dir in CACHE_DIRS:
+            for dirpath, _, filenames in os.walk(slot.path / cache_dir):
+                for name in filenames:
+                    file_path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(file_path)
+                    except OSError:
+                        continue
+                    files.append((max(st.st_atime, st.st_mtime), st.st_size, file_path))
+
+        excess = (size_mb - self.max_slot_mb * 0.8) * 1024 * 1024
+        freed = 0
+        for _, size, file_path in sorted(files):
+            if freed >= excess:
+                break
+            try:
+                os.remove(file_path)
+                freed += size
+            except OSError:
+                pass
+        logger.info(f"Trimmed {freed / (1024 * 1024):.0f}MB of cache from {slot}")
+
+    def prune(self, namespace: str):
+        """Delete whole least-recently-used free slots above max_total_mb."""
+        sizes = self.slot_sizes(namespace)
+        total = sum(sizes.values())
+        for index in reversed(self._indexes_by_recency(namespace)):
+            if total <= self.max_total_mb:
+                break
+            if index not in sizes:
+                continue
+            slot = self._try_slot(namespace, index)
+            if slot is None:
+                continue
+            try:
+                shutil.rmtree(slot.path, ignore_errors=True)
+                total -= sizes[index]
+                logger.info(f"Pruned least recently used profile {slot} ({sizes[index]:.0f}MB)")
+            finally:
+                _unlock(slot._fd)
+                os.close(slot._fd)
+
+    def slot_sizes(self, namespace: str) -> Dict[int, float]:
+        """Size in MB of every existing slot in namespace."""
+        return {
+            index: dir_size_mb(self._slot_path(namespace, index))
+            for index in range(self.max_slots)
+            if self._slot_path(namespace, index).is_dir()
+        }
+
+
+# Process-wide slot manager used by driver_factory.create_driver(profile_slot=...)
+profile_slots = ProfileSlotManager()
@@ -0,0 +1,155 @@
+"""
+Record Deduplication
+Stable 128-bit fingerprints of normalized record fields, checked against an
+exact set of 64-bit hashes or a fixed-size Bloom filter for very large runs
+"""
+from typing import Dict, Iterable, Sequence
+from urllib.parse import urlsplit
+import hashlib
+import logging
+import math
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+DEDUP_MODES = ("exact", "bloom")
+DEFAULT_ERROR_RATE = 0.001  # Bloom filter false-positive rate (new records wrongly dropped)
+
+_FIELD_SEPARATOR = "\x1f"
+_VALUE_SEPARATOR = "\x1e"
+
+
+def normalize(value) -> str:
+    """Canonical text for hashing: NFKC, casefolded, whitespace collapsed.
+
+    URLs keep only their path: CDN signatures in the query change per load,
+    and the same asset is served from region-specific edge hosts
+    (scontent-lax3-1.xx.fbcdn.net vs scontent-fra5-2.xx.fbcdn.net). Lists
+    are normalized item by item and sorted.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return _VALUE_SEPARATOR.join(sorted(normalize(item) for item in value))
+    text = str(value)
+    if text.startswith(("http://", "https://")):
+        text = urlsplit(text).path
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def fingerprint(record: Dict, fields: Sequence[str]) -> bytes:
+    """16-byte BLAKE2b digest of the normalized fields (missing and empty hash the same)."""
+    canonical = _FIELD_SEPARATOR.join(normalize(record.get(name)) for name in fields)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+class ExactSeen:
+    """Seen set of 64-bit hashes (the first half of each fingerprint).
+
+    Memory grows with the number of records, but a few dozen bytes each
+    instead of the text itself.
+    """
+
+    def __init__(self):
+        self._hashes = set()
+
+    def add(self, digest: bytes) -> bool:
+        key = int.from_bytes(digest[:8], "little")
+        if key in self._hashes:
+            return False
+        self._hashes.add(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._hashes) * 64  # Rough: int object + set slot
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for capacity records at error_rate.
+
+    Memory is allocated up front and never grows. Beyond capacity the
+    false-positive rate rises. A false positive drops a new record as a
+    duplicate; a real duplicate is never kept.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, digest: bytes) -> Iterable[int]:
+        # Double hashing (Kirsch-Mitzenmacher) from the two halves of the digest
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, digest: bytes) -> bool:
+        new = False
+        for position in self._positions(digest):
+            byte, bit = divmod(position, 8)
+            if not self._array[byte] & (1 << bit):
+                self._array[byte] |= 1 << bit
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._array)
+
+
+class Deduplicator:
+    """Keeps the first record per fingerprint of fields.
+
+    mode "exact" never drops a distinct record (barring a 64-bit
+    collision); "bloom" holds memory flat at the cost of error_rate.
+    Not thread-safe: use one per worker and merge afterwards.
+    """
+
+    def __init__(self, fields: Sequence[str], mode: str = "exact",
+                 capacity: int = 1_000_000, error_rate: float = DEFAULT_ERROR_RATE):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode '{mode}' (use {', '.join(DEDUP_MODES)})")
+        self.fields = tuple(fields)
+        self.mode = mode
+        self._seen = ExactSeen() if mode == "exact" else BloomFilter(capacity, error_rate)
+        self.duplicates = 0
+
+    def fingerprint(self, record: Dict) -> bytes:
+        return fingerprint(record, self.fields)
+
+    def add(self, record: Dict) -> bool:
+        """True if record is new (and now remembered), False for a duplicate."""
+        return self.add_fingerprint(self.fingerprint(record))
+
+    def add_fingerprint(self, digest: bytes) -> bool:
+        """add() for a record already fingerprinted."""
+        if self._seen.add(digest):
+            return True
+        self.duplicates += 1
+        return False
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "unique": len(self),
+            "duplicates": self.duplicates,
+            "memory_kb": round(self._seen.memory_bytes / 1024, 1),
+        }
+
@@ -1,6 +1,6 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_resolver import resolve_chromedriver
 from selenium.webdriver.common.by import By
 from selenium_stealth import stealth
 import time
@@ -15,7 +15,7 @@ options.add_argument('log-level=3')
 options.add_experimental_option("excludeSwitches", ["enable-automation"])
 options.add_experimental_option('useAutomationExtension', False)
 
-s=Service(ChromeDriverManager().install())
+s=Service(resolve_chromedriver())
 driver = webdriver.Chrome(service=s, options=options)
 
 stealth(driver,
@@ -2,56 +2,36 @@
 Screenshot and PDF Generation with Selenium Stealth
 Demonstrates taking screenshots, generating PDFs, and saving page content
 """
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium_stealth import stealth
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_factory import build_chrome_options, create_driver, checkout, release
 import time
 import os
 import base64
 import json
 
 
+# Enable downloads in headless mode
+DOWNLOAD_PREFS = {
+    "download.default_directory": os.getcwd(),
+    "download.prompt_for_download": False,
+    "download.directory_upgrade": True,
+    "safebrowsing.enabled": True,
+    "plugins.always_open_pdf_externally": True
+}
+
+
 def setup_stealth_driver(headless=False):
-    """Setup Chrome driver with stealth settings"""
-    options = webdriver.ChromeOptions()
-    
-    if not headless:
-        options.add_argument("start-maximized")
-    else:
-        options.add_argument("--headless")
-        options.add_argument("--window-size=1920,1080")
-    
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_argument('--log-level=3')
-    
-    # Enable downloads in headless mode
-    options.add_experimental_option("prefs", {
-        "download.default_directory": os.getcwd(),
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True,
-        "plugins.always_open_pdf_externally": True
-    })
-    
-    s = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=s, options=options)
-    
-    stealth(driver,
-            languages=["en-US", "en"],
-            vendor="Google Inc.",
-            platform="Win32",
-            webgl_vendor="Intel Inc.",
-            renderer="Intel Iris OpenGL Engine",
-            fix_hairline=True,
+    """Borrow a warm stealth Chrome driver from the shared pool"""
+    launch_profile = "screenshot-fidelity" if headless else "headed"
+    return checkout(
+        f"screenshot_pdf:{launch_profile}",
+        lambda: create_driver(
+            build_chrome_options(launch_profile, prefs=DOWNLOAD_PREFS),
+            profile_slot="screenshot_pdf",
+        ),
     )
-    
-    return driver
 
 
 def take_full_page_screenshot():
@@ -84,7 +64,7 @@ def take_full_page_screenshot():
         return screenshot_path
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 def take_element_screenshot():
@@ -110,7 +90,7 @@ def take_element_screenshot():
         return screenshot_path
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 def take_screenshots_at_different_resolutions():
@@ -136,7 +116,7 @@ def take_screenshots_at_different_resolutions():
             print(f"Screenshot saved for {device}: {screenshot_path}")
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 def generate_pdf_from_page():
@@ -172,7 +152,7 @@ def generate_pdf_from_page():
         return pdf_path
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 def capture_page_content():
@@ -210,7 +190,7 @@ def capture_page_content():
         print("Metadata saved: page_metadata.json")
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 def take_screenshot_after_scroll():
@@ -251,7 +231,7 @@ def take_screenshot_after_scroll():
         print(f"Total screenshots taken: {screenshot_count}")
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 def capture_before_after_action():
@@ -289,7 +269,7 @@ def capture_before_after_action():
             print(f"Action failed: {e}")
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 if __name__ == "__main__":
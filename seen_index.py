@@ -0,0 +1,165 @@
+"""
+Cross-Run Seen Index
+SQLite file of record fingerprints (record_dedup) with first/last seen times,
+so scheduled re-scrapes keep only records no earlier run has saved
+
+Usage:
+    python seen_index.py            # Recent runs with new vs. repeat counts
+    python seen_index.py --runs 50
+"""
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+import argparse
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# Index location (override with SEEN_INDEX_PATH)
+SEEN_INDEX_PATH = Path(os.environ.get(
+    "SEEN_INDEX_PATH",
+    Path(__file__).resolve().parent / "index" / "seen_index.db"
+))
+
+BATCH_SIZE = 500  # Fingerprints per IN (...) lookup (SQLite caps bound variables)
+
+
+class SeenIndex:
+    """Fingerprints saved by earlier runs, shared by every process on this host.
+
+    A run calls known() on each batch it extracts, which returns the
+    fingerprints already indexed and bumps their last_seen, then add()
+    for the records it actually saved, then finish_run(). Records only
+    become known once saved, so a crashed run doesn't hide its ads from
+    the next one.
+    """
+
+    def __init__(self, path: Path = SEEN_INDEX_PATH, label: str = "", start_run: bool = True):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS seen (
+                    fingerprint BLOB PRIMARY KEY,
+                    first_seen TEXT NOT NULL,
+                    last_seen TEXT NOT NULL,
+                    first_run INTEGER NOT NULL,
+                    last_run INTEGER NOT NULL,
+                    times_seen INTEGER NOT NULL DEFAULT 1
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS seen_last_run ON seen (last_run);
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    label TEXT,
+                    started_at TEXT NOT NULL,
+                    finished_at TEXT,
+                    new INTEGER,
+                    repeat INTEGER
+                );
+            """)
+            self.run_id = conn.execute(
+                "INSERT INTO runs (label, started_at) VALUES (?, ?)",
+                (label, datetime.now().isoformat())
+            ).lastrowid if start_run else None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _write(self, statements):
+        """Run statements(conn) in one write transaction."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = statements(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def known(self, fingerprints: Sequence[bytes]) -> Set[bytes]:
+        """The fingerprints already indexed; their last_seen moves to now."""
+        fingerprints = list(dict.fromkeys(fingerprints))
+        if not fingerprints:
+            return set()
+
+        def touch(conn: sqlite3.Connection) -> Set[bytes]:
+            found = set()
+            for i in range(0, len(fingerprints), BATCH_SIZE):
+                batch = fingerprints[i:i + BATCH_SIZE]
+                found.update(row[0] for row in conn.execute(
+                    f"SELECT fingerprint FROM seen WHERE fingerprint IN ({','.join('?' * len(batch))})",
+                    batch
+                ))
+            conn.executemany(
+                """UPDATE seen SET last_seen = ?, last_run = ?,
+                   times_seen = times_seen + (last_run != ?) WHERE fingerprint = ?""",
+                [(datetime.now().isoformat(), self.run_id, self.run_id, fp) for fp in found]
+            )
+            return found
+
+        return self._write(touch)
+
+    def add(self, fingerprints: Sequence[bytes]):
+        """Index saved records (first seen in this run unless another run got there first)."""
+        now = datetime.now().isoformat()
+        self._write(lambda conn: conn.executemany(
+            """INSERT INTO seen (fingerprint, first_seen, last_seen, first_run, last_run)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (fingerprint) DO UPDATE SET last_seen = excluded.last_seen,
+                   last_run = excluded.last_run""",
+            [(fp, now, now, self.run_id, self.run_id) for fp in dict.fromkeys(fingerprints)]
+        ))
+
+    def finish_run(self) -> Dict:
+        """Record and return this run's new vs. repeat counts."""
+        def count(conn: sqlite3.Connection) -> Dict:
+            new, repeat = conn.execute(
+                """SELECT COALESCE(SUM(first_run = ?), 0), COALESCE(SUM(first_run != ?), 0)
+                   FROM seen WHERE last_run = ?""",
+                (self.run_id, self.run_id, self.run_id)
+            ).fetchone()
+            conn.execute("UPDATE runs SET finished_at = ?, new = ?, repeat = ? WHERE id = ?",
+                         (datetime.now().isoformat(), new, repeat, self.run_id))
+            return {"run_id": self.run_id, "new": new, "repeat": repeat}
+
+        return self._write(count)
+
+    def runs(self, limit: int = 10) -> List[Dict]:
+        """Most recent runs first."""
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            return [dict(row) for row in rows]
+
+    def size(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Show recent runs recorded in the seen index")
+    parser.add_argument("--path", default=str(SEEN_INDEX_PATH), help="Index file")
+    parser.add_argument("--runs", type=int, default=10, help="Runs to list")
+    args = parser.parse_args(argv)
+
+    if not Path(args.path).exists():
+        print(f"No index at {args.path}")
+        return
+    index = SeenIndex(args.path, start_run=False)
+    print(f"{index.size()} fingerprints in {args.path}\n")
+    print(f"{'Run':>5}  {'Started':<20}{'New':>8}{'Repeat':>8}  Label")
+    for run in index.runs(args.runs):
+        print(f"{run['id']:>5}  {run['started_at'][:19]:<20}{run['new'] if run['new'] is not None else '-':>8}"
+              f"{run['repeat'] if run['repeat'] is not None else '-':>8}  {run['label'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
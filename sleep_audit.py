@@ -0,0 +1,307 @@
+"""
+Sleep-Budget Auditor
+Attributes wall-clock time per function to sleeping, WebDriver commands, I/O,
+blocking waits and Python work, to show how much of a run is spent in time.sleep
+
+Usage:
+    python sleep_audit.py fbads_scrapy.py
+    python sleep_audit.py --out audit.json wait_strategies_stealth.py
+
+Auditor options go before the script; everything after it is the script's own.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import runpy
+import selectors
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = str(Path(__file__).resolve().parent)
+CATEGORIES = ("sleep", "webdriver", "io", "wait")
+OUTSIDE = "<outside repo code>"
+
+_auditor: Optional['SleepAuditor'] = None
+
+
+def _function_key(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{Path(code.co_filename).stem}.{name}"
+
+
+class SleepAuditor:
+    """Per-function time breakdown for code under root.
+
+    A profile hook keeps each thread's stack of repo functions, so every
+    moment of a thread's wall time belongs to the innermost repo function
+    (its self time). Patched time.sleep, WebDriver.execute and I/O calls
+    charge their duration to that same function, as do blocking waits on
+    threads, futures and the idle event loop; what's left is Python
+    work. asyncio.sleep and AsyncDriver commands are reported as awaited
+    time, since other coroutines run while they're pending.
+    """
+
+    def __init__(self, root: str = REPO_ROOT):
+        self.root = root
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._functions: Dict[str, Dict[str, float]] = defaultdict(self._empty_row)
+        self._keys: Dict[object, Optional[str]] = {}
+        self._patches: List = []
+
+    @staticmethod
+    def _empty_row() -> Dict[str, float]:
+        return {"calls": 0, "wall": 0.0, "sleep": 0.0, "webdriver": 0.0, "io": 0.0, "wait": 0.0,
+                "awaited_sleep": 0.0, "awaited_webdriver": 0.0}
+
+    # Profile hook
+
+    def _key(self, code) -> Optional[str]:
+        try:
+            return self._keys[code]
+        except KeyError:
+            if code.co_filename.startswith("<"):
+                # <frozen runpy>, <string>, ...: not a file, even if the cwd is the repo
+                self._keys[code] = None
+                return None
+            filename = os.path.abspath(code.co_filename)
+            in_repo = filename.startswith(self.root) and Path(filename).name != Path(__file__).name
+            key = self._keys[code] = _function_key(code) if in_repo else None
+            return key
+
+    def _stack(self) -> List[list]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _profile(self, frame, event, arg):
+        if event != "call" and event != "return":
+            return
+        key = self._key(frame.f_code)
+        if key is None:
+            return
+        now = time.perf_counter()
+        stack = self._stack()
+        if event == "call":
+            if stack:
+                stack[-1][1] += now - stack[-1][2]
+            stack.append([key, 0.0, now])
+        elif stack and stack[-1][0] == key:
+            _, self_time, segment_start = stack.pop()
+            with self._lock:
+                row = self._functions[key]
+                row["calls"] += 1
+                row["wall"] += self_time + now - segment_start
+            if stack:
+                stack[-1][2] = now
+
+    def _owner(self) -> str:
+        stack = self._stack()
+        return stack[-1][0] if stack else OUTSIDE
+
+    def charge(self, category: str, seconds: float, owner: Optional[str] = None):
+        with self._lock:
+            self._functions[owner or self._owner()][category] += seconds
+
+    # Patching
+
+    def _timed(self, category: str, original: Callable) -> Callable:
+        auditor = self
+
+        def timed(*args, **kwargs):
+            # Nested measured calls (e.g. ContextDriver.execute -> super) count once
+            if getattr(auditor._local, "measuring", False):
+                return original(*args, **kwargs)
+            owner = auditor._owner()
+            auditor._local.measuring = True
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                auditor._local.measuring = False
+                auditor.charge(category, time.perf_counter() - start, owner)
+
+        return timed
+
+    def _timed_async(self, category: str, original: Callable) -> Callable:
+        auditor = self
+
+        async def timed(*args, **kwargs):
+            owner = auditor._owner()
+            start = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                auditor.charge(category, time.perf_counter() - start, owner)
+
+        return timed
+
+    def _patch(self, owner, name: str, wrapper: Callable):
+        original = getattr(owner, name)
+        self._patches.append((owner, name, original))
+        setattr(owner, name, wrapper(original))
+
+    def _install_patches(self):
+        self._patch(time, "sleep", lambda f: self._timed("sleep", f))
+        self._patch(asyncio, "sleep", lambda f: self._timed_async("awaited_sleep", f))
+        self._patch(json, "dump", lambda f: self._timed("io", f))
+        self._patch(json, "load", lambda f: self._timed("io", f))
+        self._patch(csv.DictWriter, "writerow", lambda f: self._timed("io", f))
+        self._patch(csv.DictWriter, "writerows", lambda f: self._timed("io", f))
+        # Condition.wait covers Event.wait, Future.result, as_completed and Queue.get
+        self._patch(threading.Condition, "wait", lambda f: self._timed("wait", f))
+        self._patch(threading.Thread, "join", lambda f: self._timed("wait", f))
+        self._patch(selectors.DefaultSelector, "select", lambda f: self._timed("wait", f))
+        try:
+            from selenium.webdriver.remote.webdriver import WebDriver
+            self._patch(WebDriver, "execute", lambda f: self._timed("webdriver", f))
+        except ImportError:
+            pass
+        try:
+            from async_driver import AsyncDriver
+            self._patch(AsyncDriver, "command", lambda f: self._timed_async("awaited_webdriver", f))
+        except ImportError:
+            pass
+        try:
+            import requests
+            self._patch(requests.Session, "send", lambda f: self._timed("io", f))
+        except ImportError:
+            pass
+
+    def start(self):
+        global _auditor
+        self._install_patches()
+        sys.setprofile(self._profile)
+        threading.setprofile(self._profile)
+        _auditor = self
+
+    def stop(self):
+        global _auditor
+        sys.setprofile(None)
+        threading.setprofile(None)
+        for owner, name, original in reversed(self._patches):
+            setattr(owner, name, original)
+        self._patches = []
+        if _auditor is self:
+            _auditor = None
+
+    def reset(self):
+        """Start a new run: forget totals (stacks of running threads are kept)."""
+        with self._lock:
+            self._functions.clear()
+            self.started = time.time()
+
+    # Reporting
+
+    def report(self) -> Dict:
+        with self._lock:
+            rows = {key: dict(row) for key, row in self._functions.items()}
+
+        functions = []
+        totals = self._empty_row()
+        for key, row in rows.items():
+            row["python"] = max(0.0, row["wall"] - sum(row[name] for name in CATEGORIES))
+            for name in totals:
+                totals[name] += row[name]
+            functions.append(dict({"function": key}, **{k: round(v, 4) for k, v in row.items()}))
+        totals["python"] = max(0.0, totals["wall"] - sum(totals[name] for name in CATEGORIES))
+
+        functions.sort(key=lambda r: r["wall"] + r["awaited_sleep"] + r["awaited_webdriver"],
+                       reverse=True)
+        thread_seconds = totals["wall"]
+        return {
+            "started_at": datetime.fromtimestamp(self.started).isoformat(),
+            "run_seconds": round(time.time() - self.started, 3),
+            "thread_seconds": round(thread_seconds, 3),
+            "totals": {k: round(v, 3) for k, v in totals.items()},
+            "share": {
+                name: round(totals[name] / thread_seconds, 4) if thread_seconds else 0.0
+                for name in CATEGORIES + ("python",)
+            },
+            "functions": functions,
+        }
+
+    def write_report(self, path) -> Dict:
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+
+def current_auditor() -> Optional[SleepAuditor]:
+    """The running auditor, if this process is being audited."""
+    return _auditor
+
+
+@contextmanager
+def audit(root: str = REPO_ROOT):
+    """Audit everything run inside the with block."""
+    auditor = SleepAuditor(root)
+    auditor.start()
+    try:
+        yield auditor
+    finally:
+        auditor.stop()
+
+
+def format_report(report: Dict, top: int = 20) -> str:
+    totals = report["totals"]
+    share = report["share"]
+    lines = [
+        f"Run: {report['run_seconds']:.1f}s wall, {report['thread_seconds']:.1f}s across threads",
+        f"  sleep     {totals['sleep']:>9.1f}s  {share['sleep']:>6.1%}",
+        f"  webdriver {totals['webdriver']:>9.1f}s  {share['webdriver']:>6.1%}",
+        f"  io        {totals['io']:>9.1f}s  {share['io']:>6.1%}",
+        f"  wait      {totals['wait']:>9.1f}s  {share['wait']:>6.1%}",
+        f"  python    {totals['python']:>9.1f}s  {share['python']:>6.1%}",
+        f"  awaited: sleep {totals['awaited_sleep']:.1f}s, webdriver {totals['awaited_webdriver']:.1f}s",
+        "",
+        f"{'Function':<44}{'Calls':>7}{'Wall':>9}{'Sleep':>9}{'WebDrv':>9}{'IO':>8}{'Wait':>8}{'Python':>9}",
+    ]
+    for row in report["functions"][:top]:
+        lines.append(
+            f"{row['function'][:43]:<44}{row['calls']:>7}{row['wall']:>9.2f}{row['sleep']:>9.2f}"
+            f"{row['webdriver']:>9.2f}{row['io']:>8.2f}{row['wait']:>8.2f}{row['python']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a script and report where its time goes")
+    parser.add_argument("script", help="Python script to run as __main__")
+    parser.add_argument("args", nargs=argparse.REMAINDER,
+                        help="Arguments for the script (auditor options must come before the script)")
+    parser.add_argument("--out", default=None, help="JSON report path")
+    parser.add_argument("--top", type=int, default=20, help="Functions to print")
+    args = parser.parse_args()
+
+    out = args.out or f"sleep_audit_{Path(args.script).stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+
+    with audit() as auditor:
+        try:
+            runpy.run_path(args.script, run_name="__main__")
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            report = auditor.write_report(out)
+            print("\n" + format_report(report, args.top))
+            print(f"\nSleep audit saved: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,7 @@
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_factory import create_driver
+from driver_recycling import RecyclingSession, RecyclePolicy
 from selenium.webdriver.common.by import By
-from selenium_stealth import stealth
 import time
 from windows_toasts import WindowsToaster, ToastText1
 
@@ -16,17 +15,12 @@ options.add_argument('log-level=3')
 options.add_experimental_option("excludeSwitches", ["enable-automation"])
 options.add_experimental_option('useAutomationExtension', False)
 
-s=Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=s, options=options)
+def make_driver():
+    # Persistent profile slot: refresh cycles and recycles reuse the disk cache
+    return create_driver(options, label="supreme", profile_slot="supreme")
 
-stealth(driver,
-        languages=["en-US", "en"],
-        vendor="Google Inc.",
-        platform="Win32",
-        webgl_vendor="Intel Inc.",
-        renderer="Intel Iris OpenGL Engine",
-        fix_hairline=True,
-)
+# Restart Chrome (keeping URL and cookies) when it grows too big or every 100 refreshes
+driver = RecyclingSession(make_driver, RecyclePolicy(max_rss_mb=1000, max_js_heap_mb=256, max_navigations=100, sample_every=1), name="supreme")
 
 driver.get("https://eu.supreme.com/products/evtprddlyebvjmqy?variant=42719354028236")
 # print(driver.find_element(By.XPATH, "/html/body").text)
@@ -0,0 +1,182 @@
+"""
+Columnar Table Extraction
+Reads a whole <table> or repeated-row structure with one in-page script as
+column arrays, with numeric and date columns typed in the page and returned
+as NumPy arrays or a pandas DataFrame
+"""
+from typing import Dict, List, Optional
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # Typed arrays are unavailable without numpy
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:  # Only needed for ColumnTable.frame()
+    pd = None
+
+logger = logging.getLogger(__name__)
+
+# Column types: str as read, int/float parsed from the digits (thousands
+# separators and units dropped), date via Date.parse (epoch ms)
+COLUMN_TYPES = ("str", "int", "float", "date")
+
+# arguments[0] = {"table": css} or {"rows": css, "cells": [[name, css], ...]},
+# arguments[1] = {column name: type}, arguments[2] = max rows
+_COLUMNS_SCRIPT = r"""
+var plan = arguments[0], types = arguments[1] || {}, limit = arguments[2];
+var slice = Array.prototype.slice;
+// textContent, not innerText, so thousands of cells don't each force a layout
+function text(node) { return node ? (node.textContent || '').replace(/\s+/g, ' ').trim() : ''; }
+var names = [], rows = [];
+if (plan.table) {
+  var table = document.querySelector(plan.table);
+  if (!table) return null;
+  var header = null, head = table.tHead, foot = table.tFoot, all = slice.call(table.rows);
+  if (head && head.rows.length) header = head.rows[head.rows.length - 1];
+  else if (all.length && all[0].querySelector('th') && !all[0].querySelector('td')) header = all[0];
+  if (header) names = slice.call(header.cells).map(text);
+  for (var i = 0; i < all.length; i++) {
+    var row = all[i];
+    if (row === header || (head && row.parentNode === head) || (foot && row.parentNode === foot)) continue;
+    if (limit && rows.length >= limit) break;
+    rows.push(slice.call(row.cells).map(text));
+  }
+} else {
+  var items = document.querySelectorAll(plan.rows);
+  names = plan.cells.map(function (c) { return c[0]; });
+  for (var i = 0; i < items.length; i++) {
+    if (limit && rows.length >= limit) break;
+    rows.push(plan.cells.map(function (c) { return text(items[i].querySelector(c[1])); }));
+  }
+}
+var width = names.length;
+rows.forEach(function (r) { if (r.length > width) width = r.length; });
+var used = {};
+for (var k = 0; k < width; k++) {
+  var name = names[k] || 'column_' + k;
+  while (used[name]) name += '_' + k;
+  used[name] = true;
+  names[k] = name;
+}
+function convert(values, type) {
+  if (type === 'int' || type === 'float') {
+    return values.map(function (v) { var n = parseFloat(v.replace(/[^\d.\-]/g, '')); return isNaN(n) ? null : n; });
+  }
+  if (type === 'date') {
+    return values.map(function (v) { var t = Date.parse(v); return isNaN(t) ? null : t; });
+  }
+  return values;
+}
+var columns = names.map(function (name, k) {
+  return convert(rows.map(function (r) { return k < r.length ? r[k] : ''; }), types[name]);
+});
+return {names: names, columns: columns};
+"""
+
+
+def _array(values: List, column_type: str):
+    if column_type in ("int", "float"):
+        numbers = np.array(values, dtype=float)  # None -> NaN
+        # int only if lossless: a missing or fractional value (12.7) keeps the column float
+        if column_type == "int" and np.array_equal(numbers, np.trunc(numbers)):
+            return numbers.astype(np.int64)
+        return numbers
+    if column_type == "date":
+        epoch_ms = np.array(values, dtype=float)
+        dates = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[ms]")
+        present = ~np.isnan(epoch_ms)
+        dates[present] = epoch_ms[present].astype(np.int64).astype("datetime64[ms]")
+        return dates
+    return np.array(values, dtype=object)
+
+
+class ColumnTable:
+    """Columns as read by one script: lists of str, numbers or epoch ms (None if unparsed).
+
+    arrays() turns them into typed NumPy arrays in one conversion per
+    column; int columns with a missing (NaN) or fractional value stay float.
+    """
+
+    def __init__(self, names: List[str], columns: List[List], types: Dict[str, str]):
+        self.names = names
+        self.columns = dict(zip(names, columns))
+        self.types = {name: types.get(name, "str") for name in names}
+
+    def __len__(self) -> int:
+        return len(self.columns[self.names[0]]) if self.names else 0
+
+    def records(self, limit: Optional[int] = None) -> List[Dict]:
+        """Row dicts (dates stay epoch ms), for JSON output."""
+        rows = len(self) if limit is None else min(limit, len(self))
+        return [{name: self.columns[name][i] for name in self.names} for i in range(rows)]
+
+    def arrays(self) -> Dict[str, 'np.ndarray']:
+        if np is None:
+            raise ImportError("Typed columns need numpy (pip install numpy)")
+        return {name: _array(self.columns[name], self.types[name]) for name in self.names}
+
+    def frame(self) -> 'pd.DataFrame':
+        if pd is None:
+            raise ImportError("DataFrames need pandas (pip install pandas)")
+        return pd.DataFrame(self.arrays(), columns=self.names)
+
+
+def _check_types(types: Optional[Dict[str, str]]) -> Dict[str, str]:
+    types = types or {}
+    unknown = {name: t for name, t in types.items() if t not in COLUMN_TYPES}
+    if unknown:
+        raise ValueError(f"Unknown column types {unknown} (use {', '.join(COLUMN_TYPES)})")
+    return types
+
+
+def _table(result: Optional[Dict], types: Dict[str, str], source: str) -> ColumnTable:
+    if result is None:
+        raise ValueError(f"No table matches {source}")
+    table = ColumnTable(result["names"], result["columns"], types)
+    logger.debug(f"Read {len(table)} rows x {len(table.names)} columns from {source}")
+    return table
+
+
+def _rows_plan(rows: str, cells: Dict[str, str]) -> Dict:
+    return {"rows": rows, "cells": [[name, css] for name, css in cells.items()]}
+
+
+def read_table(driver, table: str = "table", types: Optional[Dict[str, str]] = None,
+               limit: Optional[int] = None) -> ColumnTable:
+    """Every body row of the <table> matching the CSS selector table.
+
+    Column names come from the header row (thead, or a leading row of th
+    cells); unnamed columns are called column_<index>.
+    """
+    types = _check_types(types)
+    result = driver.execute_script(_COLUMNS_SCRIPT, {"table": table}, types, limit)
+    return _table(result, types, table)
+
+
+def read_rows(driver, rows: str, cells: Dict[str, str], types: Optional[Dict[str, str]] = None,
+              limit: Optional[int] = None) -> ColumnTable:
+    """Repeated rows (div cards, list items): one column per cell CSS selector,
+    read from the first match inside each element matching rows."""
+    types = _check_types(types)
+    result = driver.execute_script(_COLUMNS_SCRIPT, _rows_plan(rows, cells), types, limit)
+    return _table(result, types, rows)
+
+
+async def async_read_table(driver, table: str = "table", types: Optional[Dict[str, str]] = None,
+                           limit: Optional[int] = None) -> ColumnTable:
+    """read_table() for an AsyncDriver."""
+    types = _check_types(types)
+    result = await driver.execute_script(_COLUMNS_SCRIPT, {"table": table}, types, limit)
+    return _table(result, types, table)
+
+
+async def async_read_rows(driver, rows: str, cells: Dict[str, str],
+                          types: Optional[Dict[str, str]] = None,
+                          limit: Optional[int] = None) -> ColumnTable:
+    """read_rows() for an AsyncDriver."""
+    types = _check_types(types)
+    result = await driver.execute_script(_COLUMNS_SCRIPT, _rows_plan(rows, cells), types, limit)
+    return _table(result, types, rows)
@@ -0,0 +1,236 @@
+"""
+Wait/Command Timeline Tracing
+Records navigations, waits, element lookups, scripts and file writes as spans
+and exports them in Chrome trace-event format (chrome://tracing, Perfetto),
+one track per worker thread or async task
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAX_EVENTS = 200000     # Spans kept per run; later ones are counted as dropped
+MAX_ARG_CHARS = 120     # Long args (scripts, URLs) are cut to this length
+
+# Track name for the current async task (threads default to their own name)
+_track: ContextVar[Optional[str]] = ContextVar("trace_track", default=None)
+
+# WebDriver command names -> (span name, category)
+_COMMANDS = {
+    "get": ("navigate", "navigation"),
+    "refresh": ("refresh", "navigation"),
+    "goBack": ("back", "navigation"),
+    "findElement": ("find_element", "find"),
+    "findElements": ("find_elements", "find"),
+    "findChildElement": ("find_element", "find"),
+    "findChildElements": ("find_elements", "find"),
+    "w3cExecuteScript": ("execute_script", "script"),
+    "w3cExecuteScriptAsync": ("execute_async_script", "script"),
+    "executeCdpCommand": ("cdp", "command"),
+}
+
+# AsyncDriver request paths (after /session/<id>) -> (span name, category)
+_ASYNC_PATHS = {
+    "/url": ("navigate", "navigation"),
+    "/refresh": ("refresh", "navigation"),
+    "/element": ("find_element", "find"),
+    "/elements": ("find_elements", "find"),
+    "/execute/sync": ("execute_script", "script"),
+    "/execute/async": ("execute_async_script", "script"),
+}
+
+
+def _short(value) -> str:
+    text = str(value)
+    return text if len(text) <= MAX_ARG_CHARS else text[:MAX_ARG_CHARS] + "..."
+
+
+def _command_args(params: Optional[Dict]) -> Dict:
+    """The interesting parts of a command's parameters (URL, locator, script)."""
+    if not params:
+        return {}
+    args = {}
+    for key in ("url", "using", "value", "script", "cmd"):
+        if key in params and isinstance(params[key], (str, int, float)):
+            args[key] = _short(params[key])
+    return args
+
+
+class TraceRecorder:
+    """Collects complete ("X") trace events while enabled.
+
+    span() is a no-op until start(), so instrumented code pays almost
+    nothing when tracing is off. start() also wraps WebDriver.execute and
+    AsyncDriver.command, so every navigation, find and script shows up
+    without touching call sites. Nested spans on one track (a wait and the
+    scripts it runs) render as a flame stack.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events: List[Dict] = []
+        self._tracks: Dict[str, int] = {}
+        self._patches: List = []
+        self.dropped = 0
+        self.started = time.time()
+        self._origin = time.perf_counter()
+
+    def _tid(self) -> int:
+        track = _track.get() or threading.current_thread().name
+        tid = self._tracks.get(track)
+        if tid is None:
+            with self._lock:
+                tid = self._tracks.setdefault(track, len(self._tracks) + 1)
+        return tid
+
+    def _add(self, name: str, category: str, tid: int, start: float, end: float, args: Dict):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": args,
+        }
+        with self._lock:
+            if len(self._events) < MAX_EVENTS:
+                self._events.append(event)
+            else:
+                self.dropped += 1
+
+    @contextmanager
+    def span(self, name: str, category: str, **args) -> Iterator[Dict]:
+        """Time the with block as one span; the yielded dict becomes its args.
+
+        outcome is set to "ok", or to the exception's class name (e.g.
+        "TimeoutException") if the block raised.
+        """
+        if not self.enabled:
+            yield args
+            return
+        tid = self._tid()
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args["outcome"] = type(e).__name__
+            raise
+        else:
+            args.setdefault("outcome", "ok")
+        finally:
+            self._add(name, category, tid, start, time.perf_counter(), args)
+
+    @contextmanager
+    def track(self, name: str):
+        """Put spans from the current async task on their own named track."""
+        token = _track.set(name)
+        try:
+            yield
+        finally:
+            _track.reset(token)
+
+    # Command instrumentation
+
+    def _patch(self, owner, name: str, wrapper):
+        original = getattr(owner, name)
+        self._patches.append((owner, name, original))
+        setattr(owner, name, wrapper(original))
+
+    def _traced_execute(self, original):
+        recorder = self
+
+        def execute(driver, driver_command, params=None):
+            name, category = _COMMANDS.get(driver_command, (driver_command, "command"))
+            with recorder.span(name, category, **_command_args(params)):
+                return original(driver, driver_command, params)
+
+        return execute
+
+    def _traced_command(self, original):
+        recorder = self
+
+        async def command(driver, method, path, payload=None):
+            if path in _ASYNC_PATHS:
+                name, category = _ASYNC_PATHS[path]
+            elif path.startswith("/element/"):
+                name, category = f"element {path.rsplit('/', 1)[-1]}", "command"
+            else:
+                name, category = f"{method} {path}", "command"
+            with recorder.span(name, category, **_command_args(payload)):
+                return await original(driver, method, path, payload)
+
+        return command
+
+    def _install_patches(self):
+        try:
+            from selenium.webdriver.remote.webdriver import WebDriver
+            self._patch(WebDriver, "execute", self._traced_execute)
+        except ImportError:
+            pass
+        try:
+            from async_driver import AsyncDriver
+            self._patch(AsyncDriver, "command", self._traced_command)
+        except ImportError:
+            pass
+
+    def start(self):
+        """Begin a new trace (drops any previous events)."""
+        with self._lock:
+            self._events = []
+            self._tracks = {}
+            self.dropped = 0
+            self.started = time.time()
+            self._origin = time.perf_counter()
+        if not self._patches:
+            self._install_patches()
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        for owner, name, original in reversed(self._patches):
+            setattr(owner, name, original)
+        self._patches = []
+
+    # Export
+
+    def trace(self) -> Dict:
+        """The trace as a Chrome trace-event JSON object."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            tracks = dict(self._tracks)
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                     "args": {"name": f"selenium run {datetime.fromtimestamp(self.started):%H:%M:%S}"}}]
+        for track, tid in tracks.items():
+            metadata.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                             "args": {"name": track}})
+            metadata.append({"name": "thread_sort_index", "ph": "M", "pid": pid, "tid": tid,
+                             "args": {"sort_index": tid}})
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "started_at": datetime.fromtimestamp(self.started).isoformat(),
+                "dropped_events": self.dropped,
+            },
+        }
+
+    def write(self, path) -> Dict:
+        trace = self.trace()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+        return trace
+
+
+# Process-wide recorder used by the wait helpers and fbads_scrapy
+tracer = TraceRecorder()
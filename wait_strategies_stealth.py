@@ -2,39 +2,29 @@
 Wait Strategies with Selenium Stealth
 Demonstrates different waiting techniques for handling dynamic content
 """
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium_stealth import stealth
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_factory import build_chrome_options, create_driver, checkout, release
+from dom_waits import DomWait
+from network_idle import wait_for_network_idle
+from adaptive_waits import AdaptiveWait, url_pattern, wait_history
+import dom_waits as DC
 import time
 
 
-def setup_stealth_driver():
-    """Setup Chrome driver with stealth settings"""
-    options = webdriver.ChromeOptions()
-    options.add_argument("start-maximized")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_argument('--log-level=3')
-    
-    s = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=s, options=options)
-    
-    stealth(driver,
-            languages=["en-US", "en"],
-            vendor="Google Inc.",
-            platform="Win32",
-            webgl_vendor="Intel Inc.",
-            renderer="Intel Iris OpenGL Engine",
-            fix_hairline=True,
+def setup_stealth_driver(fetch_profile=None):
+    """Borrow a warm stealth Chrome driver from the shared pool
+
+    Any fetch_profile (e.g. "full") also turns on the network events
+    that wait_for_network_idle reads.
+    """
+    return checkout(
+        f"stealth:profile={fetch_profile}" if fetch_profile else "stealth",
+        lambda: create_driver(
+            build_chrome_options(fetch_profile=fetch_profile),
+            fetch_profile=fetch_profile,
+        ),
     )
-    
-    return driver
 
 
 def explicit_wait_examples():
@@ -44,36 +34,28 @@ def explicit_wait_examples():
     try:
         driver.get("https://www.selenium.dev/selenium/web/dynamic.html")
         
-        wait = WebDriverWait(driver, 10)
+        wait = DomWait(driver, 10)
         
-        # Wait for element to be present
-        print("1. Waiting for element presence...")
+        # Wait for presence and clickability together (one in-page check)
+        print("1. Waiting for element presence and a clickable button...")
         try:
-            element = wait.until(
-                EC.presence_of_element_located((By.ID, "adder"))
+            element, button = wait.until(
+                DC.all_of(
+                    DC.presence_of_element_located((By.ID, "adder")),
+                    DC.element_to_be_clickable((By.ID, "reveal")),
+                )
             )
             print("✓ Element found")
-        except TimeoutException:
-            print("✗ Element not found within timeout")
-        
-        time.sleep(1)
-        
-        # Wait for element to be clickable
-        print("\n2. Waiting for element to be clickable...")
-        try:
-            button = wait.until(
-                EC.element_to_be_clickable((By.ID, "reveal"))
-            )
-            print("✓ Element is clickable")
+            print("✓ Button is clickable")
             button.click()
-        except TimeoutException:
-            print("✗ Element not clickable within timeout")
+        except TimeoutException as e:
+            print(f"✗ Conditions not met within timeout {e.msg}")
         
         # Wait for element to be visible after click
-        print("\n3. Waiting for revealed element...")
+        print("\n2. Waiting for revealed element...")
         try:
             revealed = wait.until(
-                EC.visibility_of_element_located((By.ID, "revealed"))
+                DC.visibility_of_element_located((By.ID, "revealed"))
             )
             print("✓ Revealed element is visible")
             print(f"   Text: {revealed.text}")
@@ -82,7 +64,7 @@ def explicit_wait_examples():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def wait_for_text_conditions():
@@ -92,13 +74,13 @@ def wait_for_text_conditions():
     try:
         driver.get("https://www.selenium.dev/selenium/web/dynamic.html")
         
-        wait = WebDriverWait(driver, 10)
+        wait = DomWait(driver, 10)
         
         # Wait for specific text to be present in element
         print("1. Waiting for text in element...")
         try:
             wait.until(
-                EC.text_to_be_present_in_element(
+                DC.text_to_be_present_in_element(
                     (By.ID, "adder"),
                     "Add"
                 )
@@ -110,14 +92,14 @@ def wait_for_text_conditions():
         # Wait for title to contain text
         print("\n2. Waiting for title...")
         try:
-            wait.until(EC.title_contains("Dynamic"))
+            wait.until(DC.title_contains("Dynamic"))
             print(f"✓ Title contains expected text: {driver.title}")
         except TimeoutException:
             print("✗ Title doesn't contain expected text")
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def wait_for_element_state_changes():
@@ -127,11 +109,11 @@ def wait_for_element_state_changes():
     try:
         driver.get("https://www.selenium.dev/selenium/web/dynamic.html")
         
-        wait = WebDriverWait(driver, 10)
+        wait = DomWait(driver, 10)
         
         # Click to reveal element
         reveal_button = wait.until(
-            EC.element_to_be_clickable((By.ID, "reveal"))
+            DC.element_to_be_clickable((By.ID, "reveal"))
         )
         
         print("Clicking reveal button...")
@@ -141,7 +123,7 @@ def wait_for_element_state_changes():
         print("1. Waiting for element to become visible...")
         try:
             wait.until(
-                EC.visibility_of_element_located((By.ID, "revealed"))
+                DC.visibility_of_element_located((By.ID, "revealed"))
             )
             print("✓ Element is now visible")
         except TimeoutException:
@@ -152,19 +134,20 @@ def wait_for_element_state_changes():
         driver.get("https://www.selenium.dev/selenium/web/web-form.html")
         
         checkbox = driver.find_element(By.ID, "my-check-1")
+        expected = not checkbox.is_selected()  # The state the click should produce
         checkbox.click()
         
         try:
             wait.until(
-                EC.element_to_be_selected(checkbox)
+                DC.element_selection_state_to_be(checkbox, expected)
             )
-            print("✓ Checkbox is selected")
+            print(f"✓ Checkbox is {'selected' if expected else 'not selected'}")
         except TimeoutException:
-            print("✗ Checkbox not selected")
+            print("✗ Checkbox selection didn't change")
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def implicit_wait_example():
@@ -191,7 +174,7 @@ def implicit_wait_example():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def custom_wait_condition():
@@ -202,31 +185,31 @@ def custom_wait_condition():
         driver.get("http://quotes.toscrape.com")
         
         # Custom condition: wait until minimum number of quotes loaded
-        class minimum_elements_present:
-            def __init__(self, locator, minimum):
-                self.locator = locator
-                self.minimum = minimum
-            
-            def __call__(self, driver):
-                elements = driver.find_elements(*self.locator)
-                if len(elements) >= self.minimum:
-                    return elements
-                return False
+        # (evaluated in the page and re-checked on every DOM mutation)
+        wait = DomWait(driver, 10)
         
-        wait = WebDriverWait(driver, 10)
-        
-        print("Waiting for at least 5 quotes to load...")
+        print("Waiting for at least 5 quotes and the next-page link...")
         try:
-            quotes = wait.until(
-                minimum_elements_present((By.CLASS_NAME, "quote"), 5)
+            result = wait.until(
+                DC.any_of(
+                    DC.all_of(
+                        DC.minimum_elements_present((By.CLASS_NAME, "quote"), 5),
+                        DC.visibility_of_element_located((By.CSS_SELECTOR, "li.next a")),
+                    ),
+                    DC.text_to_be_present_in_element((By.TAG_NAME, "body"), "No quotes found"),
+                )
             )
-            print(f"✓ Found {len(quotes)} quotes (minimum 5)")
-        except TimeoutException:
-            print("✗ Minimum quotes not found")
+            if result.index == 0:
+                quotes, next_link = result.value
+                print(f"✓ Found {len(quotes)} quotes (minimum 5), next page: {next_link.get_attribute('href')}")
+            else:
+                print("✗ Page has no quotes")
+        except TimeoutException as e:
+            print(f"✗ Minimum quotes not found {e.msg}")
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def wait_with_polling():
@@ -236,66 +219,67 @@ def wait_with_polling():
     try:
         driver.get("https://www.selenium.dev/selenium/web/dynamic.html")
         
-        # Custom wait with 0.5 second polling interval
-        wait = WebDriverWait(
+        # DOM waits wake on mutations; poll_frequency is only the in-page
+        # fallback for changes no mutation reports (e.g. CSS transitions)
+        wait = DomWait(
             driver,
             timeout=10,
             poll_frequency=0.5,
             ignored_exceptions=[NoSuchElementException]
         )
         
-        print("Waiting with custom polling (0.5s interval)...")
+        print("Waiting with custom fallback polling (0.5s interval)...")
         
         reveal_button = wait.until(
-            EC.element_to_be_clickable((By.ID, "reveal"))
+            DC.element_to_be_clickable((By.ID, "reveal"))
         )
         reveal_button.click()
         
         revealed = wait.until(
-            EC.visibility_of_element_located((By.ID, "revealed"))
+            DC.visibility_of_element_located((By.ID, "revealed"))
         )
         print(f"✓ Element revealed: {revealed.text}")
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def wait_for_ajax_completion():
     """Wait for AJAX/JavaScript operations to complete"""
-    driver = setup_stealth_driver()
+    driver = setup_stealth_driver(fetch_profile="full")
     
     try:
-        driver.get("http://quotes.toscrape.com")
+        driver.get("http://quotes.toscrape.com/scroll")
         
-        wait = WebDriverWait(driver, 10)
+        wait = DomWait(driver, 10)
         
-        # Wait for jQuery to load (if page uses jQuery)
         print("1. Waiting for page to be ready...")
-        wait.until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
+        wait.until(DC.document_ready())
         print("✓ Page is ready")
         
-        # Wait for specific number of AJAX requests to complete (example)
-        print("\n2. Checking for active AJAX requests...")
-        
-        # Custom wait for jQuery AJAX to complete
-        def jquery_inactive(driver):
-            try:
-                return driver.execute_script("return jQuery.active == 0")
-            except:
-                return True  # jQuery not present
-        
+        # readyState and jQuery.active miss fetch(), non-jQuery XHR and late
+        # SPA requests; CDP network events see all of them
+        print("\n2. Waiting for network idle (500ms without requests)...")
+        try:
+            waited = wait_for_network_idle(driver, quiet_window=0.5, timeout=10)
+            print(f"✓ Network idle after {waited:.2f}s")
+        except TimeoutException as e:
+            print(f"✗ {e.msg}")
+        
+        # Requests triggered by an action settle the same way
+        print("\n3. Scrolling to load more quotes, then waiting for idle...")
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
         try:
-            wait.until(jquery_inactive)
-            print("✓ No active AJAX requests")
-        except:
-            print("✓ jQuery not present or AJAX complete")
+            waited = wait_for_network_idle(driver, quiet_window=0.5, timeout=10)
+            count = len(driver.find_elements(By.CLASS_NAME, "quote"))
+            print(f"✓ Network idle after {waited:.2f}s, {count} quotes loaded")
+        except TimeoutException as e:
+            print(f"✗ {e.msg}")
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def wait_for_element_to_disappear():
@@ -305,12 +289,12 @@ def wait_for_element_to_disappear():
     try:
         driver.get("https://www.selenium.dev/selenium/web/dynamic.html")
         
-        wait = WebDriverWait(driver, 10)
+        wait = DomWait(driver, 10)
         
         # Find and click remove button
         try:
             remove_button = wait.until(
-                EC.element_to_be_clickable((By.ID, "reveal"))
+                DC.element_to_be_clickable((By.ID, "reveal"))
             )
             
             print("Element present initially")
@@ -319,7 +303,7 @@ def wait_for_element_to_disappear():
             # Here we'll just demonstrate the wait condition
             
             # Wait for element to be invisible
-            # wait.until(EC.invisibility_of_element_located((By.ID, "some-element")))
+            # wait.until(DC.invisibility_of_element_located((By.ID, "some-element")))
             print("(This would wait for element to disappear)")
             
         except TimeoutException:
@@ -327,7 +311,7 @@ def wait_for_element_to_disappear():
         
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 def fluent_wait_example():
@@ -337,29 +321,27 @@ def fluent_wait_example():
     try:
         driver.get("https://www.selenium.dev/selenium/web/dynamic.html")
         
-        # Fluent wait with custom configuration
-        wait = WebDriverWait(
-            driver,
-            timeout=15,
-            poll_frequency=1,
-            ignored_exceptions=[
-                NoSuchElementException,
-                TimeoutException
-            ]
-        )
+        # Named wait: timeout (p99 x 1.5) and poll backoff come from the
+        # durations recorded for this URL pattern on previous runs;
+        # 15 seconds is only used until there is enough history
+        wait = AdaptiveWait(driver, "adder_present", default_timeout=15)
         
-        print("Using fluent wait pattern...")
+        print("Using self-tuning fluent wait...")
         
         element = wait.until(
-            EC.presence_of_element_located((By.ID, "adder")),
+            DC.presence_of_element_located((By.ID, "adder")),
             message="Element was not found within the timeout period"
         )
         
         print(f"✓ Element found: {element.get_attribute('id')}")
         
+        key = f"{url_pattern(driver.current_url)}::adder_present"
+        print(f"   History: {wait_history.stats(key)}, "
+              f"next timeout: {wait_history.timeout_for(key, 15, wait.floor):.2f}s")
+        
     finally:
         time.sleep(2)
-        driver.quit()
+        release(driver)
 
 
 if __name__ == "__main__":
@@ -2,52 +2,78 @@
 Web Scraping Example with Selenium Stealth
 Demonstrates extracting data from websites while avoiding detection
 """
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium_stealth import stealth
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_factory import build_chrome_options, create_driver, checkout, release, FetchStats
+from extraction_schema import compile_extractor
+from html_parsing import available, page_html, parser_pool
+from table_extraction import read_rows
 import time
 import json
 
+# Multi-page crawls hand each page's HTML to a process pool (lxml) and navigate
+# on while it parses; a one-shot page is cheaper to read with the in-page extractor
+OFFLINE_PARSING = available()
 
-def setup_stealth_driver(headless=False):
-    """Setup Chrome driver with stealth settings"""
-    options = webdriver.ChromeOptions()
-    options.add_argument("start-maximized")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    
-    if headless:
-        options.add_argument("--headless")
-        options.add_argument("--window-size=1920,1080")
-    
-    # Disable logging
-    options.add_argument('--log-level=3')
-    options.add_argument('--disable-notifications')
-    
-    s = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=s, options=options)
-    
-    # Apply stealth settings
-    stealth(driver,
-            languages=["en-US", "en"],
-            vendor="Google Inc.",
-            platform="Win32",
-            webgl_vendor="Intel Inc.",
-            renderer="Intel Iris OpenGL Engine",
-            fix_hairline=True,
+# Record schemas (extraction_schema format), compiled once at import
+QUOTE_EXTRACTOR = compile_extractor({
+    "item": {"class": "quote"},
+    "fields": {
+        "quote": {"class": "text"},
+        "author": {"class": "author"},
+        "tags": {"class": "tag", "many": True},
+    },
+})
+
+QUOTE_PAGE_EXTRACTOR = compile_extractor({
+    "item": {"class": "quote"},
+    "fields": {
+        "text": {"class": "text"},
+        "author": {"class": "author"},
+    },
+})
+
+# Country cards read as columns (table_extraction), numbers typed in the page
+COUNTRY_CELLS = {
+    "name": ".country-name",
+    "capital": ".country-capital",
+    "population": ".country-population",
+    "area": ".country-area",
+}
+COUNTRY_TYPES = {"population": "int", "area": "float"}
+
+
+def setup_stealth_driver(headless=False, fetch_profile=None):
+    """Borrow a warm stealth Chrome driver from the shared pool
+
+    fetch_profile names a driver_factory.FETCH_PROFILES entry, e.g. "scrape"
+    to skip images, fonts, media and trackers on text-only jobs.
+    """
+    launch_profile = "throughput" if headless else "headed"
+    return checkout(
+        f"web_scraping:{launch_profile}:profile={fetch_profile}",
+        lambda: create_driver(
+            build_chrome_options(launch_profile, ['--disable-notifications'], fetch_profile=fetch_profile),
+            fetch_profile=fetch_profile,
+        ),
     )
-    
-    return driver
+
+
+def report_fetch_savings(driver):
+    """Print requests/bytes saved by the driver's fetch profile"""
+    fetch_stats = FetchStats()
+    fetch_stats.update(driver)
+    summary = fetch_stats.summary()
+    print(f"Blocked {summary['requests_blocked']} requests "
+          f"(~{summary['estimated_bytes_saved'] / 1024:.0f} KB saved, "
+          f"{summary['bytes_transferred'] / 1024:.0f} KB transferred)")
+    return summary
 
 
 def scrape_quotes():
     """Example: Scrape quotes from a demo website"""
-    driver = setup_stealth_driver()
+    driver = setup_stealth_driver(fetch_profile="scrape")
     
     try:
         driver.get("http://quotes.toscrape.com/")
@@ -57,35 +83,26 @@ def scrape_quotes():
             EC.presence_of_all_elements_located((By.CLASS_NAME, "quote"))
         )
         
-        quotes = driver.find_elements(By.CLASS_NAME, "quote")
-        
-        scraped_data = []
-        for quote in quotes:
-            text = quote.find_element(By.CLASS_NAME, "text").text
-            author = quote.find_element(By.CLASS_NAME, "author").text
-            tags = [tag.text for tag in quote.find_elements(By.CLASS_NAME, "tag")]
-            
-            scraped_data.append({
-                "quote": text,
-                "author": author,
-                "tags": tags
-            })
+        # One page: a single in-page script beats shipping page_source to a parser process
+        scraped_data = QUOTE_EXTRACTOR.run(driver)
         
         print(f"Scraped {len(scraped_data)} quotes")
+        report_fetch_savings(driver)
         print(json.dumps(scraped_data[:3], indent=2))  # Print first 3 quotes
         
         return scraped_data
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 def scrape_with_pagination():
     """Example: Scrape multiple pages with pagination"""
-    driver = setup_stealth_driver()
+    driver = setup_stealth_driver(fetch_profile="scrape")
     
     try:
         all_quotes = []
+        pending = []  # (page, parse future) while the browser moves on
         page = 1
         max_pages = 3
         
@@ -98,22 +115,27 @@ def scrape_with_pagination():
                 EC.presence_of_all_elements_located((By.CLASS_NAME, "quote"))
             )
             
-            quotes = driver.find_elements(By.CLASS_NAME, "quote")
-            
-            for quote in quotes:
-                text = quote.find_element(By.CLASS_NAME, "text").text
-                author = quote.find_element(By.CLASS_NAME, "author").text
-                all_quotes.append({"text": text, "author": author})
-            
-            print(f"Scraped page {page}: {len(quotes)} quotes")
+            if OFFLINE_PARSING:
+                # Hand the HTML to the parser pool and navigate on immediately
+                pending.append((page, parser_pool().submit(page_html(driver), QUOTE_PAGE_EXTRACTOR.spec)))
+            else:
+                quotes = QUOTE_PAGE_EXTRACTOR.run(driver)
+                all_quotes.extend(quotes)
+                print(f"Scraped page {page}: {len(quotes)} quotes")
             page += 1
             time.sleep(1)  # Be polite
         
+        for parsed_page, future in pending:
+            quotes = future.result()
+            all_quotes.extend(quotes)
+            print(f"Scraped page {parsed_page}: {len(quotes)} quotes")
+        
         print(f"\nTotal quotes scraped: {len(all_quotes)}")
+        report_fetch_savings(driver)
         return all_quotes
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 def check_bot_detection():
@@ -138,12 +160,12 @@ def check_bot_detection():
             print(f"Screenshot saved: {screenshot_name}")
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 def extract_table_data():
     """Example: Extract data from HTML tables"""
-    driver = setup_stealth_driver()
+    driver = setup_stealth_driver(fetch_profile="scrape")
     
     try:
         driver.get("https://www.scrapethissite.com/pages/simple/")
@@ -153,26 +175,22 @@ def extract_table_data():
             EC.presence_of_all_elements_located((By.CLASS_NAME, "country"))
         )
         
-        countries = driver.find_elements(By.CLASS_NAME, "country")
-        
-        country_data = []
-        for country in countries[:5]:  # First 5 countries
-            name = country.find_element(By.CLASS_NAME, "country-name").text
-            capital = country.find_element(By.CLASS_NAME, "country-capital").text
-            population = country.find_element(By.CLASS_NAME, "country-population").text
-            
-            country_data.append({
-                "name": name.strip(),
-                "capital": capital.strip(),
-                "population": population.strip()
-            })
+        # Every country in one script, as typed columns
+        countries = read_rows(driver, ".country", COUNTRY_CELLS, COUNTRY_TYPES)
         
-        print("\nCountry Data:")
-        print(json.dumps(country_data, indent=2))
-        return country_data
+        print(f"\nCountry Data ({len(countries)} countries, first 5):")
+        print(json.dumps(countries.records(limit=5), indent=2))
+        try:
+            frame = countries.frame()
+            print("\nMost populous:")
+            print(frame.nlargest(5, "population")[["name", "population", "area"]].to_string(index=False))
+        except ImportError as e:
+            print(f"(Skipping DataFrame summary: {e})")
+        report_fetch_savings(driver)
+        return countries
         
     finally:
-        driver.quit()
+        release(driver)
 
 
 if __name__ == "__main__":